@@ -0,0 +1,83 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Time `es_serializer.serialize_model` on a large vehiclelang model.
+
+The model has objects with TTCs and defenses, an association per pair of objects and
+a view with groups. Prints one JSON object with the best time of `--repeat` runs.
+
+    python benchmarks/es_serializer.py --objects 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from securicad.langspec import Lang, TtcDistribution, TtcFunction
+from securicad.model import Model, es_serializer
+
+VEHICLELANG = (
+    Path(__file__).parent.parent
+    / "tests"
+    / "model"
+    / "org.mal-lang.vehiclelang-1.0.0.mar"
+)
+
+
+def build_model(lang: Lang, objects: int) -> Model:
+    model = Model("benchmark", lang=lang)
+    view = model.create_view("view")
+    model.create_icon("group", "png", b"", "MIT")
+    group = view.create_group("group", "group")
+    ttcs = [TtcFunction(TtcDistribution.EXPONENTIAL, [rate]) for rate in (0.1, 0.5, 1)]
+    for i in range(objects // 2):
+        ecu = model.create_object("ECU", f"ECU {i}")
+        firmware = model.create_object("Firmware", f"Firmware {i}")
+        ecu.field("firmware").connect(firmware.field("hardware"))
+        ecu.attack_step("access").ttc = ttcs[i % len(ttcs)]
+        firmware.defense("firmwareValidation").probability = 0.5
+        (group if i % 10 == 0 else view).add_object(ecu, i % 100 * 50, i // 100 * 50)
+    return model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--objects", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = build_model(Lang(VEHICLELANG), args.objects)
+    build = time.perf_counter() - start
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        es_serializer.serialize_model(model)
+        best = min(best, time.perf_counter() - start)
+    result = {
+        "benchmark": "es_serialize",
+        "objects": args.objects,
+        "associations": len(model._associations),
+        "build_seconds": round(build, 4),
+        "seconds": round(best, 4),
+    }
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
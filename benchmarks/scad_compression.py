@@ -0,0 +1,104 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Throughput of `scad_serializer.serialize_model` for every compression mode.
+
+Prints one JSON object per engine and mode with the write time, the size of the file
+and the throughput in uncompressed XMI bytes per second.
+
+    python benchmarks/scad_compression.py --objects 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from io import BytesIO
+from pathlib import Path
+from zipfile import ZipFile
+
+from securicad.langspec import Lang
+from securicad.model import Model, scad_serializer
+
+VEHICLELANG = (
+    Path(__file__).parent.parent
+    / "tests"
+    / "model"
+    / "org.mal-lang.vehiclelang-1.0.0.mar"
+)
+
+MODES = [
+    ("stored", None),
+    ("deflated", 1),
+    ("deflated", None),
+    ("deflated", 9),
+    ("bzip2", None),
+    ("lzma", None),
+]
+
+
+def build_model(lang: Lang, objects: int) -> Model:
+    model = Model("benchmark", lang=lang)
+    view = model.create_view("view")
+    for i in range(objects // 2):
+        ecu = model.create_object("ECU", f"ECU {i}")
+        firmware = model.create_object("Firmware", f"Firmware {i}")
+        ecu.field("firmware").connect(firmware.field("hardware"))
+        ecu.defense("operationModeProtection").probability = 0.5
+        view.add_object(ecu, i % 100 * 50, i // 100 * 50)
+    return model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--objects", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engine", choices=["fast", "pyecore"], action="append")
+    args = parser.parse_args()
+
+    model = build_model(Lang(VEHICLELANG), args.objects)
+    for engine in args.engine or ["fast"]:
+        for compression, compresslevel in MODES:
+            best = float("inf")
+            for _ in range(args.repeat):
+                scad = BytesIO()
+                start = time.perf_counter()
+                scad_serializer.serialize_model(
+                    model,
+                    scad,
+                    engine=engine,
+                    compression=compression,
+                    compresslevel=compresslevel,
+                )
+                best = min(best, time.perf_counter() - start)
+            with ZipFile(scad) as zf:
+                raw = sum(info.file_size for info in zf.infolist())
+            result = {
+                "benchmark": "scad_serialize",
+                "objects": args.objects,
+                "engine": engine,
+                "compression": compression,
+                "compresslevel": compresslevel,
+                "seconds": round(best, 4),
+                "bytes": scad.getbuffer().nbytes,
+                "xmi_bytes": raw,
+                "mb_per_second": round(raw / best / 1e6, 2),
+            }
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
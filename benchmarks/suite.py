@@ -0,0 +1,298 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Time the hot paths of the SDK on synthetic vehiclelang and securilang models.
+
+Covers loading the language, creating and connecting objects, validation, serializing
+and deserializing with every serializer, building views, and `Layout.build`. Prints
+one JSON object per benchmark, language, and size with the best time of `--repeat`
+runs, and appends them to `--output` to track results across releases.
+
+    python benchmarks/suite.py --sizes 1000 10000 100000 --output results.jsonl
+    python benchmarks/suite.py --lang vehiclelang --only build json_deserialize
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from securicad.langspec import Lang, TtcDistribution, TtcFunction
+from securicad.model import (
+    ForceLayout,
+    GridLayout,
+    Model,
+    Object,
+    __version__,
+    es_serializer,
+    json_serializer,
+    scad_serializer,
+)
+from securicad.model.generator import generate_model
+
+MODELS = Path(__file__).parent.parent / "tests" / "model"
+LANGS = {
+    "vehiclelang": MODELS / "org.mal-lang.vehiclelang-1.0.0.mar",
+    "securilang": MODELS / "com.foreseeti.securilang-2.1.9.mar",
+}
+SIZES = [1_000, 10_000, 100_000]
+# Objects per group in views and layouts
+GROUP_SIZE = 100
+# ForceLayout is quadratic in the worst case, skip it above this size
+FORCE_LAYOUT_MAX = 10_000
+
+TTCS = [TtcFunction(TtcDistribution.EXPONENTIAL, [rate]) for rate in (0.1, 0.5, 1)]
+
+
+def connect(a: Object, field: str, b: Object) -> None:
+    lang = a._model._lang
+    assert lang is not None
+    a.field(field).connect(b.field(lang.assets[a.asset_type].fields[field].target.name))
+
+
+def build_vehiclelang(lang: Lang, objects: int) -> Model:
+    """ECUs with firmware on CAN networks, every ECU is also on the previous network."""
+    model = Model("vehiclelang", lang=lang)
+    previous: Optional[Object] = None
+    for i in range(objects // 3):
+        ecu = model.create_object("ECU", f"ECU {i}")
+        firmware = model.create_object("Firmware", f"Firmware {i}")
+        network = model.create_object("CANNetwork", f"CAN {i}")
+        connect(ecu, "firmware", firmware)
+        connect(ecu, "vehiclenetworks", network)
+        if previous is not None:
+            connect(ecu, "vehiclenetworks", previous)
+        ecu.attack_step("access").ttc = TTCS[i % len(TTCS)]
+        firmware.defense("firmwareValidation").probability = 0.5
+        previous = network
+    attacker = model.create_attacker()
+    attacker.connect(model.objects(asset_type="ECU")[0].attack_step("access"))
+    return model
+
+
+def build_securilang(lang: Lang, objects: int) -> Model:
+    """
+    Hosts with a client and a service on networks, every host is also on the previous
+    network. Software products are shared, one per kind of object.
+    """
+    model = Model("securilang", lang=lang)
+    products = {
+        kind: model.create_object("SoftwareProduct", kind)
+        for kind in ("Host", "Client", "Service")
+    }
+    previous: Optional[Object] = None
+    for i in range(objects // 4):
+        host = model.create_object("Host", f"Host {i}")
+        client = model.create_object("Client", f"Client {i}")
+        service = model.create_object("Service", f"Service {i}")
+        network = model.create_object("Network", f"Network {i}")
+        for obj in (host, client, service):
+            connect(obj, "softwareProduct", products[obj.asset_type])
+        connect(client, "rootHost", host)
+        connect(service, "rootApplicationHost", host)
+        connect(host, "networks", network)
+        if previous is not None:
+            connect(host, "networks", previous)
+        host.defense("patched").probability = 0.5
+        previous = network
+    attacker = model.create_attacker()
+    attacker.connect(model.objects(asset_type="Host")[0].attack_step("physicalAccess"))
+    return model
+
+
+GENERATORS: Dict[str, Callable[[Lang, int], Model]] = {
+    "vehiclelang": build_vehiclelang,
+    "securilang": build_securilang,
+}
+
+
+class Context:
+    """The language, model and serialized forms shared by the benchmarks of a size."""
+
+    def __init__(self, lang_name: str, lang: Lang, objects: int) -> None:
+        self.lang_name = lang_name
+        self.lang = lang
+        self.objects = objects
+        self._model: Optional[Model] = None
+        self._data: Dict[str, Any] = {}
+
+    @property
+    def model(self) -> Model:
+        if self._model is None:
+            self._model = GENERATORS[self.lang_name](self.lang, self.objects)
+        return self._model
+
+    def data(self, format: str) -> Any:
+        if format not in self._data:
+            self._data[format] = SERIALIZE[format](self.model)
+        return self._data[format]
+
+
+def write_scad(model: Model) -> bytes:
+    scad = BytesIO()
+    scad_serializer.serialize_model(model, scad)
+    return scad.getvalue()
+
+
+SERIALIZE: Dict[str, Callable[[Model], Any]] = {
+    "json": json_serializer.serialize_model,
+    "es": es_serializer.serialize_model,
+    "scad": write_scad,
+}
+
+
+def deserialize(ctx: Context, format: str) -> Callable[[], Any]:
+    data = ctx.data(format)
+    if format == "json":
+        return lambda: json_serializer.deserialize_model(data, lang=ctx.lang)
+    if format == "es":
+        return lambda: es_serializer.deserialize_model(data, lang=ctx.lang)
+    return lambda: scad_serializer.deserialize_model(BytesIO(data), lang=ctx.lang)
+
+
+def validate(ctx: Context) -> Callable[[], Any]:
+    model = ctx.model
+
+    def run() -> list[str]:
+        for obj in model._objects.values():
+            model._validator.validate_multiplicity(obj)
+        return model.validation_errors
+
+    return run
+
+
+def build_view(ctx: Context) -> Callable[[], Any]:
+    model = ctx.model
+    if "group" not in model._icons:
+        model.create_icon("group", "png", b"", "MIT")
+    objects = model.objects()
+
+    def run() -> None:
+        view = model.create_view("benchmark")
+        groups = view.create_groups(
+            [
+                (f"Group {i}", "group", i % 100 * 1000, i // 100 * 1000)
+                for i in range(0, len(objects), GROUP_SIZE)
+            ]
+        )
+        for i, group in enumerate(groups):
+            group.add_objects(
+                (obj, j % 10 * 90, j // 10 * 90)
+                for j, obj in enumerate(objects[i * GROUP_SIZE : (i + 1) * GROUP_SIZE])
+            )
+        view.delete()
+
+    return run
+
+
+def layout(ctx: Context, force: bool) -> Callable[[], Any]:
+    model = ctx.model
+    if "group" not in model._icons:
+        model.create_icon("group", "png", b"", "MIT")
+    objects = model.objects()
+
+    def run() -> None:
+        root = ForceLayout("benchmark") if force else GridLayout("benchmark")
+        for i in range(0, len(objects), GROUP_SIZE):
+            group = GridLayout(f"Group {i}", icon="group")
+            for obj in objects[i : i + GROUP_SIZE]:
+                group.add_item(obj)
+            root.add_item(group)
+        root.build(model).delete()
+
+    return run
+
+
+# name -> setup, which returns the function to time
+BENCHMARKS: Dict[str, Callable[[Context], Callable[[], Any]]] = {
+    "lang_load": lambda ctx: lambda: Lang(LANGS[ctx.lang_name]),
+    "build": lambda ctx: lambda: GENERATORS[ctx.lang_name](ctx.lang, ctx.objects),
+    "generate": lambda ctx: lambda: generate_model(
+        ctx.lang, ctx.objects, associations=3 * ctx.objects, seed=1
+    ),
+    "validate": validate,
+    **{
+        f"{format}_serialize": (
+            lambda format: lambda ctx: lambda: SERIALIZE[format](ctx.model)
+        )(format)
+        for format in SERIALIZE
+    },
+    **{
+        f"{format}_deserialize": (lambda format: lambda ctx: deserialize(ctx, format))(
+            format
+        )
+        for format in SERIALIZE
+    },
+    "view": build_view,
+    "grid_layout": lambda ctx: layout(ctx, force=False),
+    "force_layout": lambda ctx: layout(ctx, force=True),
+}
+
+
+def measure(run: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--lang", choices=list(LANGS), action="append")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--only", choices=list(BENCHMARKS), nargs="+")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="append results to this file")
+    args = parser.parse_args()
+
+    environment = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+    for lang_name in args.lang or list(LANGS):
+        lang = Lang(LANGS[lang_name])
+        for objects in args.sizes:
+            ctx = Context(lang_name, lang, objects)
+            for name in args.only or list(BENCHMARKS):
+                if name == "force_layout" and objects > FORCE_LAYOUT_MAX:
+                    continue
+                # Only the language load itself doesn't depend on the size
+                if name == "lang_load" and objects != args.sizes[0]:
+                    continue
+                result: Dict[str, Any] = {
+                    "benchmark": name,
+                    "lang": lang_name,
+                    "objects": objects,
+                    "seconds": round(measure(BENCHMARKS[name](ctx), args.repeat), 4),
+                    "associations": len(ctx.model._associations),
+                    **environment,
+                }
+                line = json.dumps(result)
+                print(line, flush=True)
+                if args.output:
+                    with open(args.output, "a", encoding="utf-8") as f:
+                        f.write(line + "\n")
+
+
+if __name__ == "__main__":
+    main()
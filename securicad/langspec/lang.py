@@ -15,7 +15,7 @@
 from __future__ import annotations
 
 from os import PathLike
-from typing import IO, Any, Dict, List, Optional, Tuple, Union
+from typing import IO, Any, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
 
 from .lang_types import (
     Asset,
@@ -54,6 +54,9 @@ from .ttc_types import (
     TtcSubtraction,
 )
 
+ATTACK_TYPES = frozenset({AttackStepType.AND, AttackStepType.OR})
+DEFENSE_TYPES = frozenset({AttackStepType.DEFENSE})
+
 
 class Lang:
     def __init__(self, file: Union[str, PathLike[Any], IO[bytes]]) -> None:
@@ -64,8 +67,65 @@ class Lang:
         self.associations: List[Association] = []
         self.license: Optional[str] = self._reader.license
         self.notice: Optional[str] = self._reader.notice
+        # (asset, attack step types) -> {lowercase attack step name: attack step name}
+        self._step_names: Dict[
+            Tuple[str, FrozenSet[AttackStepType]], Dict[str, str]
+        ] = {}
+        self._subtypes: Dict[str, Tuple[str, ...]] = {}
+        # (asset, field) -> association name
+        self._link_names: Optional[Dict[Tuple[str, str], str]] = None
         self._create_lang()
         del self._reader
+        for asset_name in self.assets:
+            self.step_names(asset_name, ATTACK_TYPES)
+            self.step_names(asset_name, DEFENSE_TYPES)
+
+    def step_names(self, asset: str, types: Iterable[AttackStepType]) -> Dict[str, str]:
+        """
+        Return the names of the attack steps of `asset` with one of `types`, including
+        inherited attack steps, by their lowercase names.
+
+        The tables for attack steps and defenses are built when the language is
+        loaded, others on first use.
+        """
+        key = (asset, frozenset(types))
+        names = self._step_names.get(key)
+        if names is None:
+            names = {
+                name.lower(): name
+                for name, attack_step in self.assets[asset].attack_steps.items()
+                if attack_step.type in key[1]
+            }
+            self._step_names[key] = names
+        return names
+
+    def link_names(self) -> Dict[Tuple[str, str], str]:
+        """
+        Return the association name of every field of every asset, including inherited
+        fields, by (asset, field). The table is built on first use.
+        """
+        if self._link_names is None:
+            self._link_names = {
+                (asset_name, field_name): field.association.name
+                for asset_name, asset in self.assets.items()
+                for field_name, field in asset.fields.items()
+            }
+        return self._link_names
+
+    def subtypes(self, asset: str) -> Tuple[str, ...]:
+        """Return the names of `asset` and of all assets that extend it."""
+        subtypes = self._subtypes.get(asset)
+        if subtypes is None:
+            target = self.assets[asset]
+            result: List[str] = []
+            for name, asset_ in self.assets.items():
+                super_asset: Optional[Asset] = asset_
+                while super_asset is not None and super_asset is not target:
+                    super_asset = super_asset.super_asset
+                if super_asset is not None:
+                    result.append(name)
+            subtypes = self._subtypes[asset] = tuple(result)
+        return subtypes
 
     def _create_lang(self) -> None:
         for category in self._reader.langspec["categories"]:
@@ -16,18 +16,26 @@
 
 __version__ = "1.2.0"
 
+import importlib
+from typing import TYPE_CHECKING, Any
+
+from . import diff as diff
 from . import es_serializer as es_serializer
 from . import json_serializer as json_serializer
-from . import scad_serializer as scad_serializer
+from . import tracing as tracing
 from .association import Association as Association
 from .attacker import Attacker as Attacker
 from .attackstep import AttackStep as AttackStep
 from .defense import Defense as Defense
 from .icon import Icon as Icon
+from .journal import Journal as Journal
 from .model import Model as Model
 from .object import Object as Object
+from .scenario import Scenario as Scenario
+from .scenario import Scenarios as Scenarios
 from .visual.container import Container as Container
 from .visual.group import Group as Group
+from .visual.layout import ForceLayout as ForceLayout
 from .visual.layout import GridLayout as GridLayout
 from .visual.layout import HorizontalLayout as HorizontalLayout
 from .visual.layout import Layout as Layout
@@ -36,3 +44,18 @@ from .visual.layout import VerticalLayout as VerticalLayout
 from .visual.view import View as View
 from .visual.viewitem import ViewItem as ViewItem
 from .visual.viewobject import ViewObject as ViewObject
+
+if TYPE_CHECKING:  # pragma: no cover
+    from . import aio as aio
+    from . import scad_serializer as scad_serializer
+
+# Modules that are imported on first access, `scad_serializer` can import pyecore and the
+# generated Ecore packages, which services that don't read or write sCAD files shouldn't
+# pay for. `aio` imports asyncio.
+LAZY_MODULES = {"aio", "scad_serializer"}
+
+
+def __getattr__(name: str) -> Any:
+    if name in LAZY_MODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,115 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+from . import convert
+
+
+def run_convert(args: argparse.Namespace) -> int:
+    paths = convert.find_files(args.inputs)
+    start = time.perf_counter()
+    failures = 0
+    for result in convert.convert(
+        paths,
+        args.to,
+        source=args.source,
+        output_dir=args.output,
+        lang_paths=args.lang,
+        max_workers=args.jobs,
+    ):
+        if not result.ok:
+            failures += 1
+        if args.json:
+            print(
+                json.dumps(
+                    {
+                        "source": str(result.source),
+                        "target": None if result.target is None else str(result.target),
+                        "seconds": round(result.seconds, 4),
+                        "error": result.error,
+                    }
+                ),
+                flush=True,
+            )
+        elif result.ok:
+            print(
+                f"{result.seconds:8.3f}s {result.source} -> {result.target}", flush=True
+            )
+        else:
+            print(
+                f"  failed {result.source}: {result.error}", file=sys.stderr, flush=True
+            )
+    if not args.json:
+        print(
+            f"Converted {len(paths) - failures} of {len(paths)} files in {time.perf_counter() - start:.3f}s",
+            file=sys.stderr,
+        )
+    return 1 if failures else 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m securicad.model")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = commands.add_parser(
+        "convert", help="convert model files between formats"
+    )
+    convert_parser.add_argument(
+        "inputs", nargs="+", help="files, glob patterns or directories"
+    )
+    convert_parser.add_argument(
+        "--to", required=True, choices=list(convert.FORMATS), help="target format"
+    )
+    convert_parser.add_argument(
+        "--from",
+        dest="source",
+        choices=list(convert.FORMATS),
+        help="source format, detected from the file extension by default",
+    )
+    convert_parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="output directory, next to the inputs by default",
+    )
+    convert_parser.add_argument(
+        "-l",
+        "--lang",
+        action="append",
+        default=[],
+        help=".mar file to validate against, can be repeated",
+    )
+    convert_parser.add_argument(
+        "-j", "--jobs", type=int, help="number of worker processes, 1 to not use a pool"
+    )
+    convert_parser.add_argument(
+        "--json", action="store_true", help="report results as JSON lines"
+    )
+    convert_parser.set_defaults(func=run_convert)
+
+    args = parser.parse_args(argv)
+    func: Callable[[argparse.Namespace], int] = args.func
+    return func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Run the blocking parts of the SDK from asyncio code.
+
+Parsing and serialization are offloaded to an executor, the event loop's default
+thread pool unless another thread pool is configured. Process pools are not
+supported, since models and languages would be pickled for every call. Use `batch`
+to load many files in worker processes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import functools
+import os
+import weakref
+from typing import IO, Any, Callable, Optional, TypeVar, Union
+
+from securicad.langspec import Lang
+
+T = TypeVar("T")
+
+
+class Runner:
+    """
+    Runs functions in `executor` with at most `max_concurrency` of them submitted at
+    a time. `executor` must not be a process pool.
+
+    Calls waiting for a slot, or queued in the executor, are dropped when the awaiting
+    task is cancelled. A call that has already started runs to completion, but its
+    result is discarded.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[concurrent.futures.Executor] = None,
+        *,
+        max_concurrency: Optional[int] = None,
+    ) -> None:
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("'max_concurrency' must be at least 1")
+        if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+            raise ValueError("Process pools are not supported, use a thread pool")
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        # asyncio.Semaphore is bound to an event loop before Python 3.10
+        self._semaphores: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Semaphore
+        ] = weakref.WeakKeyDictionary()
+
+    def _semaphore(
+        self, loop: asyncio.AbstractEventLoop
+    ) -> Optional[asyncio.Semaphore]:
+        if self.max_concurrency is None:
+            return None
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        semaphore = self._semaphore(loop)
+        if semaphore is None:
+            return await loop.run_in_executor(self.executor, call)
+        async with semaphore:
+            return await loop.run_in_executor(self.executor, call)
+
+
+_runner = Runner()
+
+
+def configure(
+    executor: Optional[concurrent.futures.Executor] = None,
+    *,
+    max_concurrency: Optional[int] = None,
+) -> Runner:
+    """
+    Set the runner used by the async functions when none is passed, and return it.
+
+    The executor is not shut down when it is replaced.
+    """
+    global _runner
+    _runner = Runner(executor, max_concurrency=max_concurrency)
+    return _runner
+
+
+def get_runner() -> Runner:
+    return _runner
+
+
+async def run(
+    func: Callable[..., T], *args: Any, runner: Optional[Runner] = None, **kwargs: Any
+) -> T:
+    """Call `func(*args, **kwargs)` with `runner`, or the configured runner."""
+    return await (runner or _runner).run(func, *args, **kwargs)
+
+
+async def load_lang(
+    file: Union[str, os.PathLike[Any], IO[bytes]], *, runner: Optional[Runner] = None
+) -> Lang:
+    """Async version of `Lang(file)`."""
+    return await run(Lang, file, runner=runner)
@@ -15,9 +15,13 @@
 from __future__ import annotations
 
 import collections
-from typing import TYPE_CHECKING, Any, DefaultDict
+from typing import TYPE_CHECKING, Any, DefaultDict, Iterable
 
-from .exceptions import MissingAttackStepException
+from .exceptions import (
+    DuplicateAttackStepException,
+    InvalidAssetException,
+    MissingAttackStepException,
+)
 from .object import Object
 
 if TYPE_CHECKING:  # pragma: no cover
@@ -38,11 +42,49 @@ class Attacker(Object):
         self._model._validator.validate_attack_step(attack_step)
         self._model._add_connection(self, attack_step._object, attack_step.name)
 
+    def connect_many(self, attack_steps: Iterable[AttackStep]) -> None:
+        """
+        Connect to several attack steps. Every attack step is validated before any is
+        connected, so either all or none of them are connected.
+        """
+        steps = list(attack_steps)
+        seen: set[tuple[int, str]] = set()
+        for attack_step in steps:
+            self._model._check_connection(self, attack_step._object, attack_step)
+            self._model._validator.validate_attack_step(attack_step)
+            key = (attack_step._object.id, attack_step.name)
+            if key in seen:
+                raise DuplicateAttackStepException(self, attack_step)
+            seen.add(key)
+        with self._model._journal.batch():
+            for attack_step in steps:
+                self._model._add_connection(self, attack_step._object, attack_step.name)
+
+    def connect_all(self, asset_type: str, attack_step: str) -> list[AttackStep]:
+        """
+        Connect to `attack_step` of every object of `asset_type`, including assets
+        that extend it if the model has a language. Objects this attacker is already
+        connected to at `attack_step` are skipped.
+
+        Return the attack steps that were connected.
+        """
+        model = self._model
+        if model._lang:
+            if asset_type not in model._lang.assets:
+                raise InvalidAssetException(asset_type)
+            asset_types = model._lang.subtypes(asset_type)
+        else:
+            asset_types = (asset_type,)
+        steps = [
+            obj.attack_step(attack_step)
+            for type_ in asset_types
+            for obj in model._objects_by_type.get(type_, {}).values()
+            if attack_step not in self._first_steps.get(obj, {})
+        ]
+        self.connect_many(steps)
+        return steps
+
     def disconnect(self, attack_step: AttackStep) -> None:
         if not attack_step.name in self._first_steps[attack_step._object]:
             raise MissingAttackStepException(self, attack_step)
-        association = self._first_steps[attack_step._object][attack_step.name]
-        self._model._associations.remove(association)
-        del self._first_steps[attack_step._object][attack_step.name]
-        if not self._first_steps[attack_step._object]:
-            attack_step._object._attackers.remove(self)
+        self._model._remove_connection(self, attack_step._object, attack_step.name)
@@ -44,7 +44,15 @@ class AttackStep(Base):
 
     @ttc.setter
     def ttc(self, value: Optional[TtcValue]) -> None:  # type: ignore
-        self._ttc = value if value is None else langspec.wrap_ttc_expression(value)
+        self._set_ttc(value if value is None else langspec.wrap_ttc_expression(value))
+
+    def _set_ttc(self, ttc: Optional[TtcExpression]) -> None:
+        old_ttc = self._ttc
+        self._ttc = ttc
+        self._object._model._fingerprint.invalidate("object", self._object.id)
+        journal = self._object._model._journal
+        if journal.recording:
+            journal.record(lambda: self._set_ttc(old_ttc), lambda: self._set_ttc(ttc))
 
     @property
     def is_default(self) -> bool:
@@ -0,0 +1,331 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Load many model files in worker processes that share their languages.
+
+Every worker loads each language once. Models are either sent back as snapshots,
+which skip schema validation and don't include the language, or kept in the worker
+that loaded them and used through handles, so that only results are sent back.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import itertools
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional, TypeVar
+
+from . import diff, json_serializer
+from .convert import (
+    FORMATS,
+    Converter,
+    LangPaths,
+    detect_format,
+    input_root,
+    list_lang_paths,
+    output_path,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .model import Model
+
+T = TypeVar("T")
+
+
+def snapshot(model: Model) -> dict[str, Any]:
+    """Return a picklable copy of `model` without its language."""
+    return {
+        "model": json_serializer.serialize_model(model, validate=False),
+        "validate_icons": model._validator.validate_icons,
+    }
+
+
+def restore(data: dict[str, Any], converter: Converter) -> Model:
+    """Rebuild a snapshot with the matching language of `converter`."""
+    meta = data["model"]["meta"]
+    return json_serializer.deserialize_model(
+        data["model"],
+        lang=converter.lang((meta["langId"], meta["langVersion"])),
+        validate_icons=data["validate_icons"],
+        validate=False,
+    )
+
+
+def load_models(
+    paths: Iterable[str | os.PathLike[str]],
+    lang_paths: LangPaths = (),
+    *,
+    source: Optional[str] = None,
+    workers: Optional[int] = None,
+) -> list[Model]:
+    """
+    Read `paths` in a pool of `workers` processes and return the models in order.
+
+    The format of each file is detected from its extension unless `source` is given.
+    Models use the language of `lang_paths`, one file or several, with their ID and
+    version, which is loaded once per worker and once in this process. Models are
+    rebuilt in this process as their snapshots arrive, while the workers read the
+    remaining files. With `workers=1` the files are read in the current process. The
+    first error is raised.
+    """
+    files = [Path(path) for path in paths]
+    lang_files = list_lang_paths(lang_paths)
+    converter = Converter(lang_files)
+    if workers == 1:
+        return [converter.read(path, source) for path in files]
+    models: list[Optional[Model]] = [None] * len(files)
+    with concurrent.futures.ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(lang_files,)
+    ) as executor:
+        futures = {
+            executor.submit(_load_snapshot, path, source): i
+            for i, path in enumerate(files)
+        }
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                models[futures[future]] = restore(future.result(), converter)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return models  # type: ignore
+
+
+@dataclass(frozen=True)
+class ModelHandle:
+    """A model kept in a worker of a `ModelPool`."""
+
+    worker: int
+    key: int
+    path: Path
+
+
+class ModelPool:
+    """
+    Worker processes that keep the models they load.
+
+    Files are spread over the workers by size. Operations on many handles send one
+    task to each worker involved, and return the results in the order of the
+    handles. Functions passed to `map` must be picklable.
+
+        with ModelPool([lang_path], workers=8) as pool:
+            handles = pool.load(paths)
+            errors = pool.validate(handles)
+            pool.serialize(handles, "json", output_dir=out)
+    """
+
+    def __init__(
+        self,
+        lang_paths: LangPaths = (),
+        *,
+        workers: Optional[int] = None,
+    ) -> None:
+        workers = workers or os.cpu_count() or 1
+        if workers < 1:
+            raise ValueError("'workers' must be at least 1")
+        self._lang_paths = list_lang_paths(lang_paths)
+        # One single process executor per worker, so tasks reach the worker that
+        # holds their models
+        self._executors = [
+            concurrent.futures.ProcessPoolExecutor(
+                1, initializer=_init_worker, initargs=(self._lang_paths,)
+            )
+            for _ in range(workers)
+        ]
+        # Bytes of the files loaded by each worker, and of the file of each key
+        self._bytes = [0] * workers
+        self._sizes: dict[int, int] = {}
+        self._keys = itertools.count(1)
+        self._converter: Optional[Converter] = None
+
+    def __enter__(self) -> ModelPool:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for executor in self._executors:
+            executor.shutdown()
+
+    @property
+    def workers(self) -> int:
+        return len(self._executors)
+
+    def _run(
+        self, func: Callable[..., list[T]], handles: Iterable[ModelHandle], *args: Any
+    ) -> list[T]:
+        by_worker: dict[int, list[int]] = {}
+        handles = list(handles)
+        for i, handle in enumerate(handles):
+            if not 0 <= handle.worker < self.workers:
+                raise ValueError(f"{handle} is not from this pool")
+            by_worker.setdefault(handle.worker, []).append(i)
+        futures = {
+            worker: self._executors[worker].submit(
+                func, [handles[i].key for i in indices], *args
+            )
+            for worker, indices in by_worker.items()
+        }
+        results: list[Any] = [None] * len(handles)
+        for worker, indices in by_worker.items():
+            for i, result in zip(indices, futures[worker].result()):
+                results[i] = result
+        return results
+
+    def load(
+        self, paths: Iterable[str | os.PathLike[str]], *, source: Optional[str] = None
+    ) -> list[ModelHandle]:
+        """Read `paths` into the workers, largest files first on the least loaded."""
+        files = [Path(path) for path in paths]
+        handles: list[Optional[ModelHandle]] = [None] * len(files)
+        sizes = [path.stat().st_size if path.is_file() else 0 for path in files]
+        for i in sorted(range(len(files)), key=lambda i: -sizes[i]):
+            worker = min(range(self.workers), key=self._bytes.__getitem__)
+            key = next(self._keys)
+            self._bytes[worker] += sizes[i]
+            self._sizes[key] = sizes[i]
+            handles[i] = ModelHandle(worker, key, files[i])
+        by_worker: dict[int, list[ModelHandle]] = {}
+        for handle in handles:
+            assert handle is not None
+            by_worker.setdefault(handle.worker, []).append(handle)
+        futures = [
+            self._executors[worker].submit(
+                _load_resident,
+                [(handle.key, handle.path) for handle in worker_handles],
+                source,
+            )
+            for worker, worker_handles in by_worker.items()
+        ]
+        for future in futures:
+            future.result()
+        return handles  # type: ignore
+
+    def map(
+        self, func: Callable[..., T], handles: Iterable[ModelHandle], *args: Any
+    ) -> list[T]:
+        """Return `func(model, *args)` for the model of each handle."""
+        return self._run(_map, handles, func, *args)
+
+    def validate(self, handles: Iterable[ModelHandle]) -> list[list[str]]:
+        """Return the validation errors of each model."""
+        return self._run(_validation_errors, handles)
+
+    def serialize(
+        self,
+        handles: Iterable[ModelHandle],
+        target: str,
+        *,
+        output_dir: Optional[Path] = None,
+    ) -> list[Path]:
+        """
+        Write each model in the `target` format next to the file it was read from, or
+        to the same directories in `output_dir`, and return the paths written.
+        """
+        if target not in FORMATS:
+            raise ValueError(f"format must be one of {list(FORMATS)}")
+        handles = list(handles)
+        root = input_root(h.path for h in handles) if output_dir is not None else None
+        targets = [
+            output_path(
+                handle.path,
+                detect_format(handle.path),
+                FORMATS[target],
+                output_dir,
+                root,
+            )
+            for handle in handles
+        ]
+        for directory in {path.parent for path in targets}:
+            directory.mkdir(parents=True, exist_ok=True)
+        self._run(_write, handles, target, dict(zip((h.key for h in handles), targets)))
+        return targets
+
+    def diff(self, a: ModelHandle, b: ModelHandle) -> dict[str, Any]:
+        """Return `diff.model_diff` of the models of `a` and `b`."""
+        if a.worker == b.worker:
+            return self._run(_diff, [a], b.key)[0]
+        return self._run(_diff_snapshot, [a], self._run(_snapshot, [b])[0])[0]
+
+    def fetch(self, handles: Iterable[ModelHandle]) -> list[Model]:
+        """Return copies of the models of `handles` in this process."""
+        if self._converter is None:
+            self._converter = Converter(self._lang_paths)
+        return [
+            restore(data, self._converter) for data in self._run(_snapshot, handles)
+        ]
+
+    def release(self, handles: Iterable[ModelHandle]) -> None:
+        """Drop the models of `handles` from the workers."""
+        handles = list(handles)
+        self._run(_release, handles)
+        for handle in handles:
+            self._bytes[handle.worker] -= self._sizes.pop(handle.key)
+
+
+_worker_converter: Optional[Converter] = None
+_worker_models: dict[int, Model] = {}
+
+
+def _init_worker(lang_paths: list[str | os.PathLike[str]]) -> None:
+    global _worker_converter
+    _worker_converter = Converter(lang_paths)
+    _worker_models.clear()
+
+
+def _load_snapshot(path: Path, source: Optional[str]) -> dict[str, Any]:
+    assert _worker_converter is not None
+    return snapshot(_worker_converter.read(path, source))
+
+
+def _load_resident(entries: list[tuple[int, Path]], source: Optional[str]) -> None:
+    assert _worker_converter is not None
+    for key, path in entries:
+        _worker_models[key] = _worker_converter.read(path, source)
+
+
+def _map(keys: list[int], func: Callable[..., T], *args: Any) -> list[T]:
+    return [func(_worker_models[key], *args) for key in keys]
+
+
+def _validation_errors(keys: list[int]) -> list[list[str]]:
+    return [_worker_models[key].validation_errors for key in keys]
+
+
+def _write(keys: list[int], target: str, paths: dict[int, Path]) -> list[None]:
+    return [FORMATS[target].write(_worker_models[key], paths[key]) for key in keys]
+
+
+def _snapshot(keys: list[int]) -> list[dict[str, Any]]:
+    return [snapshot(_worker_models[key]) for key in keys]
+
+
+def _diff(keys: list[int], other: int) -> list[dict[str, Any]]:
+    return [diff.model_diff(_worker_models[key], _worker_models[other]) for key in keys]
+
+
+def _diff_snapshot(keys: list[int], data: dict[str, Any]) -> list[dict[str, Any]]:
+    assert _worker_converter is not None
+    other = restore(data, _worker_converter)
+    return [diff.model_diff(_worker_models[key], other) for key in keys]
+
+
+def _release(keys: list[int]) -> list[None]:
+    for key in keys:
+        del _worker_models[key]
+    return [None] * len(keys)
@@ -0,0 +1,305 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Batch conversion of model files between the sCAD, JSON and ES formats.
+
+Files are converted in a process pool. Every worker loads each language once and
+writes its results directly to disk, only timings and errors are sent back.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import glob
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from securicad.langspec import Lang
+
+from . import es_serializer, json_serializer, scad_serializer, utility, xmi_reader
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .model import Model
+
+# (language ID, language version)
+LangKey = Tuple[str, str]
+# One language file or several
+LangPaths = Union[str, "os.PathLike[str]", Iterable[Union[str, "os.PathLike[str]"]]]
+
+
+class Format:
+    """
+    A file format. `load` parses a file once, `read_lang` and `read` take what it
+    returns.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        extension: str,
+        load: Callable[[Path], Any],
+        read_lang: Callable[[Any], LangKey],
+        read: Callable[[Any, Optional[Lang]], Model],
+        write: Callable[[Model, Path], None],
+    ) -> None:
+        self.name = name
+        self.extension = extension
+        self.load = load
+        self.read_lang = read_lang
+        self.read = read
+        self.write = write
+
+
+def json_lang(data: Any) -> LangKey:
+    meta = data["meta"]
+    return meta["langId"], meta["langVersion"]
+
+
+def es_lang(data: Any) -> LangKey:
+    meta = data["metadata"]
+    return meta["langID"], meta["langVersion"]
+
+
+FORMATS = {
+    format.name: format
+    for format in [
+        Format(
+            "scad",
+            ".sCAD",
+            lambda path: path,
+            xmi_reader.read_lang,
+            lambda path, lang: scad_serializer.deserialize_model(path, lang=lang),
+            scad_serializer.serialize_model,
+        ),
+        Format(
+            "es",
+            ".es.json",
+            utility.read_json,
+            es_lang,
+            lambda data, lang: es_serializer.deserialize_model(data, lang=lang),
+            lambda model, path: utility.write_json(
+                es_serializer.serialize_model(model), path
+            ),
+        ),
+        Format(
+            "json",
+            ".json",
+            utility.read_json,
+            json_lang,
+            lambda data, lang: json_serializer.deserialize_model(data, lang=lang),
+            lambda model, path: utility.write_json(
+                json_serializer.serialize_model(model), path
+            ),
+        ),
+    ]
+}
+
+
+def list_lang_paths(lang_paths: LangPaths) -> list[str | os.PathLike[str]]:
+    if isinstance(lang_paths, (str, os.PathLike)):
+        return [lang_paths]
+    return list(lang_paths)
+
+
+def detect_format(path: Path) -> Format:
+    """Return the format of `path` based on its extension, longest extension first."""
+    name = path.name.lower()
+    for format in sorted(FORMATS.values(), key=lambda f: -len(f.extension)):
+        if name.endswith(format.extension.lower()):
+            return format
+    raise ValueError(f"Unknown format of {path}")
+
+
+def input_root(paths: Iterable[Path]) -> Optional[Path]:
+    """Return the deepest directory that contains all of `paths`."""
+    parents = [os.path.abspath(path.parent) for path in paths]
+    return Path(os.path.commonpath(parents)) if parents else None
+
+
+def output_path(
+    path: Path,
+    source: Format,
+    target: Format,
+    output_dir: Optional[Path],
+    root: Optional[Path] = None,
+) -> Path:
+    """
+    Return where `path` is written in the `target` format. In `output_dir`, the
+    directories of `path` below `root` are kept.
+    """
+    stem = path.name[: len(path.name) - len(source.extension)]
+    if output_dir is None:
+        directory = path.parent
+    elif root is None:
+        directory = output_dir
+    else:
+        directory = output_dir / Path(os.path.abspath(path.parent)).relative_to(root)
+    return directory / f"{stem}{target.extension}"
+
+
+def find_files(patterns: Iterable[str]) -> list[Path]:
+    """
+    Expand glob patterns and directories. Directories are searched recursively for files
+    of any known format.
+    """
+    paths: dict[Path, None] = {}
+    for pattern in patterns:
+        for match in sorted(glob.glob(pattern, recursive=True)) or [pattern]:
+            path = Path(match)
+            if path.is_dir():
+                for child in sorted(path.rglob("*")):
+                    if child.is_file():
+                        try:
+                            detect_format(child)
+                        except ValueError:
+                            continue
+                        paths[child] = None
+            else:
+                paths[path] = None
+    return list(paths)
+
+
+@dataclass
+class Result:
+    source: Path
+    target: Optional[Path]
+    seconds: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class Converter:
+    """Converts files in the current process, with every language loaded once."""
+
+    def __init__(self, lang_paths: LangPaths = ()) -> None:
+        self.langs: dict[LangKey, Lang] = {}
+        for lang_path in list_lang_paths(lang_paths):
+            lang = Lang(lang_path)
+            self.langs[(lang.defines["id"], lang.defines["version"])] = lang
+
+    def lang(self, key: LangKey) -> Optional[Lang]:
+        if not self.langs:
+            return None
+        if key not in self.langs:
+            raise ValueError(f"No language loaded for {key[0]}@{key[1]}")
+        return self.langs[key]
+
+    def read(self, path: Path, source: Optional[str] = None) -> Model:
+        source_format = FORMATS[source] if source else detect_format(path)
+        document = source_format.load(path)
+        lang = self.lang(source_format.read_lang(document)) if self.langs else None
+        return source_format.read(document, lang)
+
+    def convert(
+        self,
+        path: Path,
+        target: str,
+        *,
+        source: Optional[str] = None,
+        output_dir: Optional[Path] = None,
+        root: Optional[Path] = None,
+    ) -> Result:
+        start = time.perf_counter()
+        output: Optional[Path] = None
+        try:
+            source_format = FORMATS[source] if source else detect_format(path)
+            target_format = FORMATS[target]
+            output = output_path(path, source_format, target_format, output_dir, root)
+            if output.resolve() == path.resolve():
+                raise ValueError(f"{path} would be overwritten")
+            model = self.read(path, source_format.name)
+            output.parent.mkdir(parents=True, exist_ok=True)
+            target_format.write(model, output)
+        except Exception as ex:  # pylint: disable=broad-except
+            return Result(
+                path, output, time.perf_counter() - start, f"{type(ex).__name__}: {ex}"
+            )
+        return Result(path, output, time.perf_counter() - start)
+
+
+def convert(
+    paths: Iterable[Path],
+    target: str,
+    *,
+    source: Optional[str] = None,
+    output_dir: Optional[Path] = None,
+    lang_paths: LangPaths = (),
+    max_workers: Optional[int] = None,
+) -> Iterator[Result]:
+    """
+    Convert `paths` to the `target` format and yield the results as they complete.
+
+    The source format is detected from the file extension unless `source` is given.
+    Results are written next to the source files, or to `output_dir` in the same
+    directories relative to the directory that contains all of `paths`. With
+    `max_workers=1` the files are converted in the current process.
+    """
+    if target not in FORMATS or (source is not None and source not in FORMATS):
+        raise ValueError(f"format must be one of {list(FORMATS)}")
+    paths = list(paths)
+    root = input_root(paths) if output_dir is not None else None
+    lang_files = list_lang_paths(lang_paths)
+    if max_workers == 1:
+        converter = Converter(lang_files)
+        for path in paths:
+            yield converter.convert(
+                path, target, source=source, output_dir=output_dir, root=root
+            )
+        return
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers, initializer=_init_worker, initargs=(lang_files,)
+    ) as executor:
+        futures = [
+            executor.submit(_convert, path, target, source, output_dir, root)
+            for path in paths
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+_worker_converter: Optional[Converter] = None
+
+
+def _init_worker(lang_paths: list[str | os.PathLike[str]]) -> None:
+    global _worker_converter
+    _worker_converter = Converter(lang_paths)
+
+
+def _convert(
+    path: Path,
+    target: str,
+    source: Optional[str],
+    output_dir: Optional[Path],
+    root: Optional[Path],
+) -> Result:
+    assert _worker_converter is not None
+    return _worker_converter.convert(
+        path, target, source=source, output_dir=output_dir, root=root
+    )
@@ -29,11 +29,27 @@ class Defense(Base):
         super().__init__(meta)
         self._object = obj
         self._name = name
-        self.probability = probability
+        self._probability = probability
 
     def __str__(self) -> str:
         return f"<{self._object}->{self.name}>"
 
+    @property
+    def probability(self) -> Optional[float]:
+        return self._probability
+
+    @probability.setter
+    def probability(self, value: Optional[float]) -> None:
+        old_value = self._probability
+        self._probability = value
+        self._object._model._fingerprint.invalidate("object", self._object.id)
+        journal = self._object._model._journal
+        if journal.recording:
+            journal.record(
+                lambda: setattr(self, "probability", old_value),
+                lambda: setattr(self, "probability", value),
+            )
+
     @property
     def is_default(self) -> bool:
         return self.probability is None and not self.meta
@@ -0,0 +1,343 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterable, Tuple
+
+from . import json_serializer, utility
+from .attacker import Attacker
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .association import Association
+    from .base import Base
+    from .model import Model
+
+AssociationKey = Tuple[int, str, int, str]
+
+
+def association_key(data: dict[str, Any]) -> AssociationKey:
+    return utility.association_key(
+        data["source_object_id"],
+        data["source_field"],
+        data["target_object_id"],
+        data["target_field"],
+    )
+
+
+def index_associations(
+    associations: Iterable[Association],
+) -> dict[AssociationKey, dict[str, Any]]:
+    index: dict[AssociationKey, dict[str, Any]] = {}
+    for association in associations:
+        data = json_serializer.serialize_association(association)
+        index[association_key(data)] = data
+    return index
+
+
+def diff_entries(
+    a: dict[Any, dict[str, Any]], b: dict[Any, dict[str, Any]]
+) -> tuple[list[Any], list[Any], list[Any]]:
+    added = [key for key in b if key not in a]
+    removed = [key for key in a if key not in b]
+    changed = [key for key in b if key in a and a[key] != b[key]]
+    return added, removed, changed
+
+
+def diff_steps(
+    a: list[dict[str, Any]], b: list[dict[str, Any]]
+) -> dict[str, list[Any]]:
+    a_steps = {step["name"]: step for step in a}
+    b_steps = {step["name"]: step for step in b}
+    added, removed, changed = diff_entries(a_steps, b_steps)
+    diff: dict[str, list[Any]] = {}
+    if added or changed:
+        diff["set"] = [b_steps[name] for name in added + changed]
+    if removed:
+        diff["reset"] = removed
+    return diff
+
+
+def diff_object(a: dict[str, Any], b: dict[str, Any]) -> dict[str, Any]:
+    diff: dict[str, Any] = {"id": b["id"]}
+    for key in ("name", "meta"):
+        if a[key] != b[key]:
+            diff[key] = b[key]
+    for key in ("attack_steps", "defenses"):
+        steps = diff_steps(a[key], b[key])
+        if steps:
+            diff[key] = steps
+    return diff
+
+
+def container_object_ids(data: dict[str, Any]) -> set[int]:
+    ids: set[int] = set()
+    for item in data["items"]:
+        if item["type"] == "object":
+            ids.add(item["id"])
+        else:
+            ids |= container_object_ids(item)
+    return ids
+
+
+def diff_section(
+    diff: dict[str, Any],
+    name: str,
+    added: list[Any],
+    removed: list[Any],
+    changed: list[Any],
+) -> None:
+    section = {
+        key: value
+        for key, value in (("added", added), ("removed", removed), ("changed", changed))
+        if value
+    }
+    if section:
+        diff[name] = section
+
+
+def model_diff(a: Model, b: Model) -> dict[str, Any]:
+    """
+    Compute the changes that turn model `a` into model `b`.
+
+    The diff is a JSON-compatible dictionary that only contains the sections that
+    changed, so identical models give an empty diff. Objects are compared per attack
+    step and defense, while changed views and icons are replaced as a whole.
+    """
+    diff: dict[str, Any] = {}
+    if a.name != b.name:
+        diff["name"] = b.name
+    if a.meta != b.meta:
+        diff["meta"] = b.meta
+
+    a_objects = {
+        id: json_serializer.serialize_object(obj) for id, obj in a._objects.items()
+    }
+    b_objects = {
+        id: json_serializer.serialize_object(obj) for id, obj in b._objects.items()
+    }
+    added, removed, changed = diff_entries(a_objects, b_objects)
+    # objects can't change asset type, so they are replaced instead
+    replaced = {
+        id
+        for id in changed
+        if a_objects[id]["asset_type"] != b_objects[id]["asset_type"]
+    }
+    diff_section(
+        diff,
+        "objects",
+        [b_objects[id] for id in added + [id for id in changed if id in replaced]],
+        removed + [id for id in changed if id in replaced],
+        [
+            object_diff
+            for id in changed
+            if id not in replaced
+            # attack steps and defenses may only differ in order
+            if len(object_diff := diff_object(a_objects[id], b_objects[id])) > 1
+        ],
+    )
+
+    # associations of removed or replaced objects are removed along with the object
+    gone = set(removed) | replaced
+    a_associations = index_associations(a._associations)
+    b_associations = index_associations(b._associations)
+    added = [key for key in b_associations if key not in a_associations]
+    removed = [key for key in a_associations if key not in b_associations]
+    changed = [
+        key
+        for key, data in b_associations.items()
+        if key in a_associations and a_associations[key]["meta"] != data["meta"]
+    ]
+    diff_section(
+        diff,
+        "associations",
+        [b_associations[key] for key in added]
+        + [
+            data
+            for key, data in b_associations.items()
+            if key in a_associations and (key[0] in replaced or key[2] in replaced)
+        ],
+        [
+            a_associations[key]
+            for key in removed
+            if key[0] not in gone and key[2] not in gone
+        ],
+        [
+            b_associations[key]
+            for key in changed
+            if key[0] not in replaced and key[2] not in replaced
+        ],
+    )
+
+    a_views = {
+        id: json_serializer.serialize_container(view) for id, view in a._views.items()
+    }
+    b_views = {
+        id: json_serializer.serialize_container(view) for id, view in b._views.items()
+    }
+    added, removed, changed = diff_entries(a_views, b_views)
+    if replaced:
+        # replaced objects are removed from all views along with the object
+        changed += [
+            id
+            for id in b_views
+            if id in a_views
+            and id not in changed
+            and replaced & container_object_ids(b_views[id])
+        ]
+    diff_section(
+        diff,
+        "views",
+        [b_views[id] for id in added],
+        removed,
+        [b_views[id] for id in changed],
+    )
+
+    a_icons = {
+        name: json_serializer.serialize_icon(icon) for name, icon in a._icons.items()
+    }
+    b_icons = {
+        name: json_serializer.serialize_icon(icon) for name, icon in b._icons.items()
+    }
+    added, removed, changed = diff_entries(a_icons, b_icons)
+    diff_section(
+        diff,
+        "icons",
+        [b_icons[name] for name in added],
+        removed,
+        [b_icons[name] for name in changed],
+    )
+
+    return diff
+
+
+def remove_association(model: Model, data: dict[str, Any]) -> None:
+    source_object = model.object(data["source_object_id"])
+    target_object = model.object(data["target_object_id"])
+    if isinstance(source_object, Attacker):
+        step = data["target_field"].split(".")[0]
+        source_object.disconnect(target_object.attack_step(step))
+    elif isinstance(target_object, Attacker):
+        step = data["source_field"].split(".")[0]
+        target_object.disconnect(source_object.attack_step(step))
+    else:
+        source_object.field(data["source_field"]).disconnect(target_object)
+
+
+def find_association(model: Model, data: dict[str, Any]) -> Association:
+    source_object = model.object(data["source_object_id"])
+    target_object = model.object(data["target_object_id"])
+    if isinstance(source_object, Attacker):
+        return source_object._first_steps[target_object][
+            data["target_field"].split(".")[0]
+        ]
+    if isinstance(target_object, Attacker):
+        return target_object._first_steps[source_object][
+            data["source_field"].split(".")[0]
+        ]
+    field = source_object.field(data["source_field"])
+    return field._targets[target_object.id].association
+
+
+def set_attribute(model: Model, item: Base, name: str, value: Any) -> None:
+    """
+    Set an attribute that the model doesn't record changes of, like the name of the
+    model and every `meta`, so that transactions and undo revert it.
+    """
+    old_value = getattr(item, name)
+
+    def apply(value: Any) -> None:
+        setattr(item, name, value)
+        if item is not model:
+            model.invalidate_fingerprint(item)
+
+    apply(value)
+    if model._journal.recording:
+        model._journal.record(lambda: apply(old_value), lambda: apply(value))
+
+
+def apply_steps(model: Model, o_data: dict[str, Any]) -> None:
+    obj = model.object(o_data["id"])
+    if "name" in o_data:
+        obj.name = o_data["name"]
+    if "meta" in o_data:
+        set_attribute(model, obj, "meta", o_data["meta"])
+    attack_steps = o_data.get("attack_steps", {})
+    for name in attack_steps.get("reset", []):
+        attack_step = obj.attack_step(name)
+        set_attribute(model, attack_step, "meta", {})
+        attack_step.ttc = None
+    for a_data in attack_steps.get("set", []):
+        attack_step = obj.attack_step(a_data["name"])
+        set_attribute(model, attack_step, "meta", a_data["meta"])
+        attack_step.ttc = (
+            None
+            if a_data["ttc"] is None
+            else json_serializer.deserialize_ttc(a_data["ttc"])
+        )
+    defenses = o_data.get("defenses", {})
+    for name in defenses.get("reset", []):
+        defense = obj.defense(name)
+        set_attribute(model, defense, "meta", {})
+        defense.probability = None
+    for d_data in defenses.get("set", []):
+        defense = obj.defense(d_data["name"])
+        set_attribute(model, defense, "meta", d_data["meta"])
+        defense.probability = d_data["probability"]
+
+
+def apply_diff(model: Model, diff: dict[str, Any]) -> None:
+    """
+    Apply a diff created by `model_diff()` to `model`.
+
+    The diff is applied in a transaction, so the model is left unchanged if any part
+    of it can't be applied.
+    """
+    objects = diff.get("objects", {})
+    associations = diff.get("associations", {})
+    views = diff.get("views", {})
+    icons = diff.get("icons", {})
+
+    with model.transaction():
+        if "name" in diff:
+            set_attribute(model, model, "name", diff["name"])
+        if "meta" in diff:
+            set_attribute(model, model, "meta", diff["meta"])
+
+        for a_data in associations.get("removed", []):
+            remove_association(model, a_data)
+        for id in objects.get("removed", []):
+            model.object(id).delete()
+        for id in views.get("removed", []):
+            model.view(id).delete()
+        for v_data in views.get("changed", []):
+            model.view(v_data["id"]).delete()
+        for i_data in icons.get("removed", []):
+            model.icon(i_data).delete()
+        for i_data in icons.get("changed", []):
+            model.icon(i_data["name"]).delete()
+
+        for i_data in icons.get("added", []) + icons.get("changed", []):
+            json_serializer.deserialize_icon(model, i_data)
+        for o_data in objects.get("added", []):
+            json_serializer.deserialize_object(model, o_data)
+        for o_data in objects.get("changed", []):
+            apply_steps(model, o_data)
+        json_serializer.deserialize_associations(model, associations.get("added", []))
+        for a_data in associations.get("changed", []):
+            set_attribute(
+                model, find_association(model, a_data), "meta", a_data["meta"]
+            )
+        for v_data in views.get("added", []) + views.get("changed", []):
+            json_serializer.deserialize_view(model, v_data)
@@ -16,12 +16,25 @@ from __future__ import annotations
 
 import json
 import random
+import threading
 from decimal import Decimal
-from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional
+from functools import lru_cache
+from os import PathLike
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
 from securicad.langspec import AttackStepType, TtcDistribution, TtcFunction
 
-from . import utility
+from . import tracing, utility
 from .attacker import Attacker
 from .exceptions import LangException
 from .meta import meta_validator
@@ -29,13 +42,20 @@ from .meta import meta_validator
 if TYPE_CHECKING:  # pragma: no cover
     from securicad.langspec import Lang
 
+    from .aio import Runner
     from .association import Association
     from .attackstep import AttackStep
     from .model import Model
+    from .object import Object
     from .visual.container import Container
     from .visual.group import Group
     from .visual.viewobject import ViewObject
 
+T = TypeVar("T")
+
+MID_MIN = 10**9
+MID_MAX = 10**25 - 1
+
 PARAMETERS: dict[TtcDistribution, Callable[[list[float]], list[float]]] = {
     TtcDistribution.EXPONENTIAL: lambda parameters: [1 / parameters[0]],
     TtcDistribution.TRUNCATED_NORMAL: lambda parameters: [parameters[1], parameters[0]],
@@ -48,49 +68,136 @@ PARAMETERS: dict[TtcDistribution, Callable[[list[float]], list[float]]] = {
 }
 
 
+class MidGenerator:
+    """
+    Thread-safe generator of random model IDs, independent of the global `random`
+    state.
+    """
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def seed(self, seed: Optional[int] = None) -> None:
+        with self._lock:
+            self._random.seed(seed)
+
+    def __call__(self) -> str:
+        with self._lock:
+            return str(self._random.randint(MID_MIN, MID_MAX))
+
+
+# Used when `serialize_model` isn't given a generator, `mids.seed()` makes it reproducible
+mids = MidGenerator()
+
+
+def fingerprint_mid(model: Model) -> str:
+    """Derive a model ID from the fingerprint of `model`."""
+    return str(MID_MIN + int(model.fingerprint(), 16) % (MID_MAX - MID_MIN + 1))
+
+
+class PaddedIds(Dict[int, str]):
+    """Padded string IDs of a model, each computed once."""
+
+    def __missing__(self, id: int) -> str:
+        padded = self[id] = str(utility.id_pad(id))
+        return padded
+
+
+@lru_cache(maxsize=4096)
+def distribution_string(
+    distribution: TtcDistribution, parameters: Tuple[str, ...]
+) -> str:
+    return ",".join(
+        [distribution.value]
+        + [format(Decimal(parameter), "f") for parameter in parameters]
+    )
+
+
+def serialize_distribution(ttc: TtcFunction) -> str:
+    # The parameters are keyed by their `str()` so that e.g. 1 and 1.0, which are
+    # formatted differently, don't share a cache entry.
+    return distribution_string(
+        ttc.distribution,
+        tuple(map(str, PARAMETERS[ttc.distribution](ttc.arguments))),
+    )
+
+
 def serialize_attack_step(attack_step: AttackStep):
+    meta = attack_step.meta
     data = {
         "name": utility.uc_first(attack_step.name),
-        "consequence": attack_step.meta.get("consequence", 0) or None,
-        "uppercost": attack_step.meta.get("costUpperLimit", 0) or None,
-        "lowercost": attack_step.meta.get("costLowerLimit", 0) or None,
+        "consequence": meta.get("consequence", 0) or None,
+        "uppercost": meta.get("costUpperLimit", 0) or None,
+        "lowercost": meta.get("costLowerLimit", 0) or None,
     }
     if attack_step.ttc is not None:
         assert isinstance(attack_step.ttc, TtcFunction)
-        data["distribution"] = ",".join(
-            [attack_step.ttc.distribution.value]
-            + [
-                format(Decimal(str(parameter)), "f")
-                for parameter in PARAMETERS[attack_step.ttc.distribution](
-                    attack_step.ttc.arguments
-                )
-            ]
-        )
+        data["distribution"] = serialize_distribution(attack_step.ttc)
     else:
         data["distribution"] = None
     return data
 
 
-def serialize_link(model: Model, association: Association) -> str | None:
+def serialize_link(
+    model: Model, association: Association, deterministic: bool = False
+) -> str | None:
+    """Return the association name of `association` from the side it's written from."""
     if not model._lang:
         return None
-    if association.source_object.asset_type == "Attacker":
+    source, source_field, _, _ = utility.association_ends(association, deterministic)
+    if source.asset_type == "Attacker":
         return None
-    return (
-        model._lang.assets[association.source_object.asset_type]
-        .fields[association.source_field]
-        .association.name
-    )
+    return model._lang.link_names()[(source.asset_type, source_field)]
+
 
+def serialize_nodes(
+    nodes: Iterable[ViewObject | Group], ids: Optional[PaddedIds] = None
+):
+    ids = PaddedIds() if ids is None else ids
+    return {ids[node.id]: {"x": int(node.x), "y": int(node.y)} for node in nodes}
 
-def serialize_nodes(nodes: Iterable[ViewObject | Group]):
+
+def serialize_object(obj: Object, deterministic: bool = False) -> dict[str, Any]:
     return {
-        str(utility.id_pad(node.id)): {"x": int(node.x), "y": int(node.y)}
-        for node in nodes
+        "name": obj.name,
+        "metaconcept": obj.asset_type,
+        "eid": obj.id,
+        "tags": obj.meta.get("tags", {}),
+        "attacksteps": [
+            serialize_attack_step(attack_step)
+            for attack_step in utility.by_name(
+                obj._attack_steps.values(), deterministic
+            )
+            if not attack_step.is_default
+        ],
+        "defenses": [
+            {
+                "name": utility.uc_first(defense.name),
+                "probability": defense.probability,
+            }
+            for defense in utility.by_name(obj._defenses.values(), deterministic)
+            if not defense.is_default
+        ],
     }
 
 
-def serialize_model(model: Model, *, sort: bool = False) -> dict[str, Any]:
+def serialize_model(
+    model: Model,
+    *,
+    sort: bool = False,
+    deterministic: bool = False,
+    mid_generator: Optional[MidGenerator] = None,
+) -> dict[str, Any]:
+    """
+    Serialize `model` in the ES format.
+
+    `sort` and `deterministic` order the output as in `json_serializer.serialize_model`.
+    The `mid` is taken from the model's meta if it's set. Otherwise it's derived from
+    `model.fingerprint()` in deterministic mode, or drawn from `mid_generator`, which
+    defaults to `mids`.
+    """
+
     def sort_dict_list(associations: list[dict[str, Any]]) -> list[dict[str, Any]]:
         return sorted(associations, key=json.dumps) if sort else associations
 
@@ -105,10 +212,39 @@ def serialize_model(model: Model, *, sort: bool = False) -> dict[str, Any]:
             meta["malVersion"] = "0.1.0-SNAPSHOT"
         return meta
 
+    def get_mid() -> str:
+        if "mid" in model.meta:
+            mid: str = model.meta["mid"]
+            return mid
+        if deterministic:
+            return fingerprint_mid(model)
+        return (mid_generator or mids)()
+
     meta_validator.validate_model(model)
+    ids = PaddedIds()
+
+    def by_id(items: Iterable[T]) -> Iterable[T]:
+        return utility.by_id(items, deterministic)
+
+    def serialize_association(association: Association) -> dict[str, Any]:
+        source, source_field, target, target_field = utility.association_ends(
+            association, deterministic
+        )
+        return {  # in ES the id1.type2 is connected to id2.type1
+            "id1": ids[source.id],
+            "id2": ids[target.id],
+            "link": serialize_link(model, association, deterministic),
+            "type2": source_field,
+            "type1": target_field,
+        }
+
+    associations = [
+        serialize_association(association)
+        for association in utility.by_association(model._associations, deterministic)
+    ]
     return {
         "formatversion": 1,
-        "mid": model.meta.get("mid", str(random.randint(10**9, 10**25 - 1))),
+        "mid": get_mid(),
         "name": model.name,
         "samples": model.meta.get("samples", 1000),
         "threshold": model.meta.get("warningThreshold", 100),
@@ -116,41 +252,12 @@ def serialize_model(model: Model, *, sort: bool = False) -> dict[str, Any]:
         "metadata": get_metadata(),
         "tags": model.meta.get("tags", {}),
         "objects": {
-            str(utility.id_pad(obj.id)): {
-                "name": obj.name,
-                "metaconcept": obj.asset_type,
-                "eid": obj.id,
-                "tags": obj.meta.get("tags", {}),
-                "attacksteps": [
-                    serialize_attack_step(attack_step)
-                    for attack_step in obj._attack_steps.values()
-                    if not attack_step.is_default
-                ],
-                "defenses": [
-                    {
-                        "name": utility.uc_first(defense.name),
-                        "probability": defense.probability,
-                    }
-                    for defense in obj._defenses.values()
-                    if not defense.is_default
-                ],
-            }
-            for obj in model._objects.values()
+            ids[obj.id]: serialize_object(obj, deterministic)
+            for obj in by_id(model._objects.values())
         },
-        "associations": sort_dict_list(
-            [
-                {  # in ES the id1.type2 is connected to id2.type1
-                    "id1": str(utility.id_pad(association.source_object.id)),
-                    "id2": str(utility.id_pad(association.target_object.id)),
-                    "link": serialize_link(model, association),
-                    "type2": association.source_field,
-                    "type1": association.target_field,
-                }
-                for association in model._associations
-            ]
-        ),
+        "associations": associations if deterministic else sort_dict_list(associations),
         "groups": {
-            str(utility.id_pad(group.id)): {
+            ids[group.id]: {
                 "name": group.name,
                 "description": group.meta.get("description", ""),
                 "icon": group.icon,
@@ -158,20 +265,22 @@ def serialize_model(model: Model, *, sort: bool = False) -> dict[str, Any]:
                 "expand": group.meta.get("expand", False),
                 "tags": group.meta.get("tags", {}),
                 "objects": serialize_nodes(
-                    [*group._objects.values(), *group._groups.values()]
+                    [*by_id(group._objects.values()), *by_id(group._groups.values())],
+                    ids,
                 ),
             }
-            for view in model._views.values()
-            for group in view.groups()
+            for group in by_id(
+                [group for view in model._views.values() for group in view.groups()]
+            )
         },
         "views": [
             {
                 "name": view.name,
-                "objects": serialize_nodes(view._objects.values()),
-                "groups": serialize_nodes(view._groups.values()),
+                "objects": serialize_nodes(by_id(view._objects.values()), ids),
+                "groups": serialize_nodes(by_id(view._groups.values()), ids),
                 "load_on_start": view.meta.get("loadOnStart", True),
             }
-            for view in model._views.values()
+            for view in by_id(model._views.values())
         ],
     }
 
@@ -273,6 +382,7 @@ def deserialize_model(
         last_exc: Optional[LangException] = None
         assoc_was_added = False
         assocs_added: list[dict[str, Any]] = []
+        tracing.add("es.association_passes")
 
         # first try to create any remaining to-be-created-assoc
         for que_obj in queue:
@@ -304,45 +414,111 @@ def deserialize_model(
         # last remove the created ones from the attempt queue
         for assoc in assocs_added:
             queue.remove(assoc)
-
-    def create_group(container: Container, group_id: int, x: float, y: float):
-        group_data = data["groups"][str(group_id)]
-        group = container.create_group(
-            group_data["name"],
-            group_data["icon"] or "Icon",
-            x,
-            y,
-            id=int(group_id),
+        if queue:
+            tracing.add("es.association_retries", len(queue))
+
+    def create_groups(container: Container, nodes: list[tuple[int, float, float]]):
+        groups_data = [data["groups"][str(group_id)] for group_id, _, _ in nodes]
+        groups = container.create_groups(
+            (group_data["name"], group_data["icon"] or "Icon", x, y, group_id)
+            for group_data, (group_id, x, y) in zip(groups_data, nodes)
         )
-        group.meta = {
-            "description": group_data["description"],
-            "expand": group_data["expand"],
-            "tags": group_data["tags"],
-        }
-        if group_data["color"]:
-            group.meta["color"] = group_data["color"]
-        for object_id, node_data in group_data["objects"].items():
-            if object_id in id_exported_id:
-                group.add_object(
-                    model.object(id_exported_id[object_id]),
-                    node_data["x"],
-                    node_data["y"],
-                )
-            else:
-                create_group(group, int(object_id), node_data["x"], node_data["y"])
+        for group, group_data in zip(groups, groups_data):
+            group.meta = {
+                "description": group_data["description"],
+                "expand": group_data["expand"],
+                "tags": group_data["tags"],
+            }
+            if group_data["color"]:
+                group.meta["color"] = group_data["color"]
+            objects: list[tuple[Object, float, float]] = []
+            sub_groups: list[tuple[int, float, float]] = []
+            for object_id, node_data in group_data["objects"].items():
+                if object_id in id_exported_id:
+                    objects.append(
+                        (
+                            model.object(id_exported_id[object_id]),
+                            node_data["x"],
+                            node_data["y"],
+                        )
+                    )
+                else:
+                    sub_groups.append((int(object_id), node_data["x"], node_data["y"]))
+            group.add_objects(objects)
+            create_groups(group, sub_groups)
 
     for view_data in data["views"]:
         view = model.create_view(view_data["name"])
         view.meta = {"loadOnStart": view_data.get("load_on_start", True)}
-        for object_id, node_data in view_data["objects"].items():
-            if object_id not in id_exported_id:
-                continue
-            view.add_object(
-                model.object(id_exported_id[object_id]),
-                node_data["x"],
-                node_data["y"],
-            )
-        for group_id, node_data in view_data["groups"].items():
-            create_group(view, int(group_id), node_data["x"], node_data["y"])
+        view.add_objects(
+            (model.object(id_exported_id[object_id]), node_data["x"], node_data["y"])
+            for object_id, node_data in view_data["objects"].items()
+            if object_id in id_exported_id
+        )
+        create_groups(
+            view,
+            [
+                (int(group_id), node_data["x"], node_data["y"])
+                for group_id, node_data in view_data["groups"].items()
+            ],
+        )
 
     return model
+
+
+# async
+
+
+def _load(
+    file: str | PathLike[Any] | IO[Any],
+    lang: Optional[Lang],
+    lowercase_attack_step: bool,
+    validate_icons: bool,
+) -> Model:
+    return deserialize_model(
+        utility.read_json(file),
+        lang=lang,
+        lowercase_attack_step=lowercase_attack_step,
+        validate_icons=validate_icons,
+    )
+
+
+def _dump(
+    model: Model, file: str | PathLike[Any] | IO[str], sort: bool, deterministic: bool
+) -> None:
+    utility.write_json(
+        serialize_model(model, sort=sort, deterministic=deterministic), file
+    )
+
+
+async def aload(
+    file: str | PathLike[Any] | IO[Any],
+    *,
+    lang: Optional[Lang] = None,
+    lowercase_attack_step: bool = True,
+    validate_icons: bool = True,
+    runner: Optional[Runner] = None,
+) -> Model:
+    """
+    Read an ES model from a path or file object in the executor of `runner`, or of
+    the runner set with `aio.configure`.
+    """
+    from . import aio
+
+    return await aio.run(
+        _load, file, lang, lowercase_attack_step, validate_icons, runner=runner
+    )
+
+
+async def adump(
+    model: Model,
+    file: str | PathLike[Any] | IO[str],
+    *,
+    sort: bool = False,
+    deterministic: bool = False,
+    runner: Optional[Runner] = None,
+) -> None:
+    """Write `model` in the ES format to a path or text file object, see `aload`."""
+    from . import aio
+
+    await aio.run(_dump, model, file, sort, deterministic, runner=runner)
@@ -108,6 +108,10 @@ class InvalidModelException(ModelException):
         super().__init__(f"Invalid model: {errors}")
 
 
+class JournalException(ModelException):
+    pass
+
+
 # LANG
 
 
@@ -0,0 +1,377 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+from typing import TYPE_CHECKING, Any, Hashable, Tuple
+
+from . import json_serializer, utility
+from .association import Association
+from .attackstep import AttackStep
+from .defense import Defense
+from .icon import Icon
+from .object import Object
+from .visual.container import Container
+from .visual.group import Group
+from .visual.view import View
+from .visual.viewobject import ViewObject
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .base import Base
+    from .model import Model
+    from .visual.viewitem import ViewItem
+
+MODULUS = 2**256
+
+# ("object" | "group" | "view", ID) of an item or container within a view
+ItemKey = Tuple[str, int]
+
+
+def digest(data: Any) -> int:
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+    return int.from_bytes(hashlib.blake2b(encoded, digest_size=32).digest(), "big")
+
+
+def hexdigest(value: int) -> str:
+    return value.to_bytes(32, "big").hex()
+
+
+def association_key(association: Association) -> tuple[int, str, int, str]:
+    return utility.association_key(
+        association.source_object.id,
+        association.source_field,
+        association.target_object.id,
+        association.target_field,
+    )
+
+
+def object_digest(obj: Object) -> int:
+    data = json_serializer.serialize_object(obj)
+    data["attack_steps"].sort(key=lambda attack_step: attack_step["name"])
+    data["defenses"].sort(key=lambda defense: defense["name"])
+    return digest(["object", data])
+
+
+def association_digest(association: Association) -> int:
+    return digest(["association", association_key(association), association.meta])
+
+
+def icon_digest(icon: Icon) -> int:
+    data = hashlib.blake2b(icon.data, digest_size=32).hexdigest()
+    return digest(["icon", icon.name, icon.format, icon.license, icon.meta, data])
+
+
+def item_digest(obj: ViewObject) -> int:
+    return digest(["item", obj.id, obj.x, obj.y, obj.meta])
+
+
+def container_digest(container: Container, total: int) -> int:
+    header: list[Any] = ["view"]
+    if isinstance(container, Group):
+        header = ["group", container.x, container.y, container.icon]
+    data = [*header, container.id, container.name, container.meta]
+    return digest([data, hexdigest(total % MODULUS)])
+
+
+def container_key(container: Container) -> ItemKey:
+    return ("group" if isinstance(container, Group) else "view", container.id)
+
+
+def item_key(item: ViewObject | Group) -> ItemKey:
+    return ("group" if isinstance(item, Group) else "object", item.id)
+
+
+class ViewDigests:
+    """
+    The digest of every item of a view, with the container it was summed into, and the
+    sum of the item digests of every container.
+    """
+
+    def __init__(self) -> None:
+        self.items: dict[ItemKey, tuple[ItemKey, int]] = {}
+        self.sums: dict[ItemKey, int] = {}
+
+    def copy(self) -> ViewDigests:
+        digests = ViewDigests()
+        digests.items = dict(self.items)
+        digests.sums = dict(self.sums)
+        return digests
+
+    def build(self, container: Container) -> int:
+        """Hash `container` and everything in it, and return its digest."""
+        key = container_key(container)
+        total = 0
+        for obj in container._objects.values():
+            value = item_digest(obj)
+            self.items[("object", obj.id)] = (key, value)
+            total += value
+        for group in container._groups.values():
+            value = self.build(group)
+            self.items[("group", group.id)] = (key, value)
+            total += value
+        self.sums[key] = total
+        return container_digest(container, total)
+
+    def discard(
+        self, key: ItemKey, item: ViewObject | Group, removed: bool
+    ) -> ItemKey | None:
+        """
+        Remove the digest of an item from the sum of its container, and return the key
+        of that container. The items of a `removed` group are dropped with it.
+        """
+        parent: ItemKey | None = None
+        entry = self.items.pop(key, None)
+        if entry is not None:
+            parent, value = entry
+            # the sums of removed groups are already dropped
+            if parent in self.sums:
+                self.sums[parent] -= value
+        if removed and isinstance(item, Group) and key in self.sums:
+            del self.sums[key]
+            children: list[ViewObject | Group] = [
+                *item._objects.values(),
+                *item._groups.values(),
+            ]
+            for child in children:
+                child_key = item_key(child)
+                child_entry = self.items.get(child_key)
+                if child_entry is not None and child_entry[0] == key:
+                    self.discard(child_key, child, removed)
+        return parent
+
+
+class Fingerprint:
+    """
+    Order-independent hash of a model.
+
+    Every object, association, view, and icon is hashed on its own and the element
+    hashes are summed, so that the order of the elements doesn't matter and an element
+    can be replaced without touching the others. Views are hashed as Merkle trees where
+    every group sums the hashes of its own items, so that changing an item only
+    rehashes the item and the groups it's in.
+
+    Nothing is hashed until the fingerprint is first requested. After that, the model
+    marks the elements it changes as dirty, so that only those are rehashed.
+    """
+
+    def __init__(self, model: Model) -> None:
+        self._model = model
+        self._active = False
+        self._total = 0
+        self._digests: dict[Hashable, int] = {}
+        self._views: dict[int, ViewDigests] = {}
+        self._dirty: set[tuple[str, Hashable]] = set()
+        self._dirty_associations: dict[Hashable, Association] = {}
+        # (view ID, item key) -> the changed item or container
+        self._dirty_items: dict[tuple[int, ItemKey], ViewItem | Container] = {}
+        # groups that were replaced by another group with the same ID
+        self._replaced: list[tuple[tuple[int, ItemKey], Group]] = []
+
+    def invalidate(self, kind: str, key: Hashable) -> None:
+        if self._active:
+            self._dirty.add((kind, key))
+
+    def invalidate_association(self, association: Association) -> None:
+        if self._active:
+            self._dirty_associations[association_key(association)] = association
+
+    def invalidate_view_item(self, item: ViewItem | Container) -> None:
+        """Rehash an item or the name, meta, and icon of a container."""
+        if self._active:
+            if isinstance(item, Container):
+                key = container_key(item)
+            else:
+                assert isinstance(item, ViewObject)
+                key = item_key(item)
+            dirty_key = (item._view.id, key)
+            previous = self._dirty_items.get(dirty_key)
+            if isinstance(previous, Group) and previous is not item:
+                self._replaced.append((dirty_key, previous))
+            self._dirty_items[dirty_key] = item
+
+    def invalidate_item(self, item: Base) -> None:
+        if isinstance(item, Object):
+            self.invalidate("object", item.id)
+        elif isinstance(item, (AttackStep, Defense)):
+            self.invalidate("object", item._object.id)
+        elif isinstance(item, Association):
+            self.invalidate_association(item)
+        elif isinstance(item, Icon):
+            self.invalidate("icon", item.name)
+        elif isinstance(item, (Container, ViewObject)):
+            self.invalidate_view_item(item)
+        else:
+            raise TypeError(f"{item} isn't part of a model")
+
+    def clone(self, model: Model) -> Fingerprint:
+        """Return the fingerprint of `model`, a clone of this fingerprint's model."""
+        fingerprint = Fingerprint(model)
+        if self._active:
+            self._refresh()
+            fingerprint._active = True
+            fingerprint._total = self._total
+            fingerprint._digests = dict(self._digests)
+            fingerprint._views = {
+                id: digests.copy() for id, digests in self._views.items()
+            }
+        return fingerprint
+
+    def reset(self) -> None:
+        self._active = False
+        self._total = 0
+        self._digests.clear()
+        self._views.clear()
+        self._dirty.clear()
+        self._dirty_associations.clear()
+        self._dirty_items.clear()
+        self._replaced.clear()
+
+    def _set(self, key: Hashable, value: int | None) -> None:
+        self._total -= self._digests.pop(key, 0)
+        if value is not None:
+            self._digests[key] = value
+            self._total += value
+
+    def _build_view(self, view: View) -> None:
+        digests = self._views[view.id] = ViewDigests()
+        self._set(("view", view.id), digests.build(view))
+
+    def _refresh_view_items(self) -> None:
+        """Rehash the changed view items, then the containers they are in."""
+        model = self._model
+        # containers to rehash, deepest first. Containers are only marked by items
+        # deeper than themselves, so each is rehashed once.
+        stale: list[tuple[int, int, ItemKey]] = []
+        marked: set[tuple[int, ItemKey]] = set()
+
+        def mark(view: View, key: ItemKey | None) -> None:
+            if key is None or (view.id, key) in marked:
+                return
+            container = view if key[0] == "view" else view._group_index.get(key[1])
+            if container is None:
+                return
+            depth = 0
+            parent: Container = container
+            while isinstance(parent, Group):
+                depth += 1
+                parent = parent._parent
+            marked.add((view.id, key))
+            heapq.heappush(stale, (-depth, view.id, key))
+
+        # (view, digests, key, item, whether the item is in the view)
+        changes: list[tuple[View, ViewDigests, ItemKey, ViewObject | Group, bool]] = []
+        for (view_id, key), item in [*self._replaced, *self._dirty_items.items()]:
+            view = model._views.get(view_id)
+            if view is None or item._view is not view or view_id not in self._views:
+                continue
+            if isinstance(item, View):
+                mark(view, key)
+                continue
+            assert isinstance(item, (ViewObject, Group))
+            index = view._group_index if isinstance(item, Group) else view._object_index
+            changes.append(
+                (view, self._views[view_id], key, item, index.get(item.id) is item)
+            )
+        self._replaced.clear()
+        self._dirty_items.clear()
+
+        # Remove the old digests first, then rehash groups that were added back along
+        # with everything in them, and last the other items
+        for view, digests, key, item, present in changes:
+            mark(view, digests.discard(key, item, removed=not present))
+        for view, digests, key, item, present in changes:
+            if present and isinstance(item, Group) and key not in digests.sums:
+                digests.build(item)
+        for view, digests, key, item, present in changes:
+            if not present or key in digests.items:
+                continue
+            parent = container_key(item._parent)
+            if isinstance(item, Group):
+                # summed into its container when the group itself is rehashed
+                digests.items[key] = (parent, 0)
+                mark(view, key)
+            else:
+                value = item_digest(item)
+                digests.items[key] = (parent, value)
+                digests.sums[parent] += value
+                mark(view, parent)
+
+        while stale:
+            _, view_id, key = heapq.heappop(stale)
+            view = model._views[view_id]
+            digests = self._views[view_id]
+            if key[0] == "view":
+                self._set(("view", view_id), container_digest(view, digests.sums[key]))
+                continue
+            group = view._group_index[key[1]]
+            parent, old_value = digests.items[key]
+            value = container_digest(group, digests.sums[key])
+            digests.items[key] = (parent, value)
+            digests.sums[parent] += value - old_value
+            mark(view, parent)
+
+    def _refresh(self) -> None:
+        model = self._model
+        if not self._active:
+            self._active = True
+            for obj in model._objects.values():
+                self._set(("object", obj.id), object_digest(obj))
+            for association in model._associations:
+                self._set(association_key(association), association_digest(association))
+            for view in model._views.values():
+                self._build_view(view)
+            for icon in model._icons.values():
+                self._set(("icon", icon.name), icon_digest(icon))
+            return
+
+        for kind, key in self._dirty:
+            value: int | None = None
+            if kind == "view":
+                # added or removed views are rehashed as a whole
+                self._views.pop(key, None)  # type: ignore
+                if key in model._views:
+                    self._build_view(model._views[key])
+                    continue
+            elif kind == "object" and key in model._objects:
+                value = object_digest(model._objects[key])
+            elif kind == "icon" and key in model._icons:
+                value = icon_digest(model._icons[key])
+            self._set((kind, key), value)
+        self._dirty.clear()
+        self._refresh_view_items()
+
+        for key, association in self._dirty_associations.items():
+            self._set(
+                key,
+                association_digest(association)
+                if association in model._associations
+                else None,
+            )
+        self._dirty_associations.clear()
+
+    def model(self) -> str:
+        self._refresh()
+        header = digest(["model", self._model.name, self._model.meta])
+        return hexdigest(digest([hexdigest(header), hexdigest(self._total % MODULUS)]))
+
+    def container(self, container: Container) -> str:
+        self._refresh()
+        if isinstance(container, Group):
+            return hexdigest(
+                self._views[container._view.id].items[("group", container.id)][1]
+            )
+        return hexdigest(self._digests[("view", container.id)])
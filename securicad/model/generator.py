@@ -0,0 +1,360 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Generate large synthetic models that are valid in their language.
+
+Objects and associations are added directly, like `Model.clone()` does, and the
+multiplicities are validated once at the end, so millions of associations take
+seconds rather than minutes.
+"""
+
+from __future__ import annotations
+
+import gc
+import itertools
+import random
+from typing import TYPE_CHECKING, Callable, Mapping, Optional, Tuple
+
+from securicad.langspec import AttackStepType
+
+from .association import Association, Field, FieldTarget
+from .exceptions import LangException
+from .model import Model
+from .object import Object
+from .validator import Validator
+
+if TYPE_CHECKING:  # pragma: no cover
+    from securicad.langspec import Lang
+
+    from .visual.layout import Layout
+
+# Rules of SecurilangValidator that are only reported by validate_multiplicity, and
+# not raised when connecting. Assets that must be connected through one of the fields,
+# and associations that are never generated.
+ONE_OF: dict[str, dict[str, Tuple[str, ...]]] = {
+    "com.foreseeti.securilang": {
+        "Client": ("rootHost", "nonRootHost"),
+        "Service": (
+            "rootShellHost",
+            "rootApplicationHost",
+            "nonRootShellHost",
+            "nonRootApplicationHost",
+        ),
+    }
+}
+SKIP: dict[str, Tuple[Tuple[str, str], ...]] = {
+    # a service on both a host and a network needs the host on the network too
+    "com.foreseeti.securilang": (
+        ("Service", "exposureNetwork"),
+        ("UnknownService", "network"),
+    )
+}
+
+# Assets whose associations SecurilangValidator.validate_association has rules for
+RULE_ASSETS: dict[str, Tuple[str, ...]] = {
+    "com.foreseeti.securilang": (
+        "SoftwareProduct",
+        "Keystore",
+        "Datastore",
+        "IDS",
+        "VulnerabilityScanner",
+        "UserAccount",
+        "Service",
+    )
+}
+
+# (field, maximum, opposite field, its maximum, concrete asset types it connects to)
+FieldSpec = Tuple[str, float, str, float, Tuple[str, ...]]
+
+
+class Generator:
+    def __init__(
+        self, lang: Lang, seed: Optional[int], name: str, max_objects: int
+    ) -> None:
+        self.lang = lang
+        self.random = random.Random(seed)
+        self.model = Model(name, lang=lang)
+        self.max_objects = max_objects
+        self.objects: list[Object] = []
+        self.by_type: dict[str, list[Object]] = {}
+        self.pending: list[Object] = []
+        self._prepare()
+
+    def _prepare(self) -> None:
+        lang = self.lang
+        lang_id = lang.defines["id"]
+        concrete = {
+            name for name, asset in lang.assets.items() if not asset.is_abstract
+        }
+        skip: set[tuple[str, str]] = set()
+        for asset, name in SKIP.get(lang_id, ()):
+            field = lang.assets[asset].fields[name]
+            skip.update((subtype, name) for subtype in lang.subtypes(asset))
+            skip.update(
+                (subtype, field.target.name)
+                for subtype in lang.subtypes(field.target.asset.name)
+            )
+        self.fields: dict[str, dict[str, FieldSpec]] = {}
+        for asset in concrete:
+            self.fields[asset] = {
+                name: (
+                    name,
+                    field.multiplicity.max,
+                    field.target.name,
+                    field.target.multiplicity.max,
+                    tuple(
+                        t
+                        for t in lang.subtypes(field.target.asset.name)
+                        if t in concrete
+                    ),
+                )
+                for name, field in lang.assets[asset].fields.items()
+                if (asset, name) not in skip
+            }
+        # asset -> [(fields, number of connections needed through them)]
+        self.required: dict[str, list[tuple[Tuple[str, ...], int]]] = {
+            asset: [
+                ((name,), field.multiplicity.min)
+                for name, field in self.lang.assets[asset].fields.items()
+                if field.multiplicity.min > 0
+            ]
+            for asset in concrete
+        }
+        for base, names in ONE_OF.get(lang_id, {}).items():
+            for asset in lang.subtypes(base):
+                if asset in concrete:
+                    self.required[asset].append((names, 1))
+
+        # Drop assets that can't get all their required connections, until none are left
+        self.assets = set(concrete)
+        changed = True
+        while changed:
+            changed = False
+            for asset in list(self.assets):
+                if not all(
+                    any(
+                        set(self.fields[asset][name][4]) & self.assets
+                        for name in names
+                        if name in self.fields[asset]
+                    )
+                    for names, _ in self.required[asset]
+                ):
+                    self.assets.remove(asset)
+                    changed = True
+        for asset in self.assets:
+            for name, spec in list(self.fields[asset].items()):
+                targets = tuple(t for t in spec[4] if t in self.assets)
+                if targets:
+                    self.fields[asset][name] = spec[:4] + (targets,)
+                else:
+                    del self.fields[asset][name]
+        self.open_fields = {
+            asset: list(self.fields[asset].values()) for asset in self.assets
+        }
+        # Associations with these assets are checked by the validator. Only languages
+        # with their own validator have rules beyond the multiplicities.
+        self.checked: set[str] = set()
+        if type(self.model._validator) is not Validator:
+            if lang_id in RULE_ASSETS:
+                for asset in RULE_ASSETS[lang_id]:
+                    self.checked.update(lang.subtypes(asset))
+            else:
+                self.checked = concrete
+
+    def create(self, asset_type: str) -> Object:
+        id = len(self.objects) + 1
+        if id > self.max_objects:
+            raise ValueError(
+                f"Can't satisfy the multiplicities of {self.lang.defines['id']} within "
+                f"{self.max_objects} objects"
+            )
+        obj = Object({}, self.model, id, asset_type, f"{asset_type} {id}")
+        self.model._objects[id] = obj
+        self.model._objects_by_type[asset_type][id] = obj
+        self.objects.append(obj)
+        self.by_type.setdefault(asset_type, []).append(obj)
+        self.pending.append(obj)
+        return obj
+
+    def link(self, a: Object, spec: FieldSpec, b: Object) -> bool:
+        """Connect `a` to `b` through the field of `spec` if that keeps the model valid."""
+        if a is b:
+            return False
+        name, maximum, target_name, target_maximum, _ = spec
+        source = a._associations.get(name)
+        if source is None:
+            source = a._associations[name] = Field(a, name)
+        target = b._associations.get(target_name)
+        if target is None:
+            target = b._associations[target_name] = Field(b, target_name)
+        if (
+            b._id in source._targets
+            or len(source._targets) >= maximum
+            or len(target._targets) >= target_maximum
+        ):
+            return False
+        association = Association({}, a, name, b, target_name)
+        if a._asset_type in self.checked or b._asset_type in self.checked:
+            try:
+                self.model._validator.validate_association(association)
+            except LangException:
+                return False
+        source_target = FieldTarget(source, None, association)  # type: ignore
+        target_target = FieldTarget(target, source_target, association)
+        source_target.target = target_target
+        source._targets[b._id] = source_target
+        target._targets[a._id] = target_target
+        self.model._associations.add(association)
+        self.model._association_revision += 1
+        return True
+
+    def partner(self, spec: FieldSpec) -> Optional[Object]:
+        objects = self.by_type.get(self.random.choice(spec[4]))
+        return objects[int(self.random.random() * len(objects))] if objects else None
+
+    def satisfy(self, obj: Object) -> None:
+        fields = self.fields[obj._asset_type]
+        for names, count in self.required[obj._asset_type]:
+            specs = [fields[name] for name in names if name in fields]
+            have = sum(
+                len(obj._associations[name]._targets)
+                for name in names
+                if name in obj._associations
+            )
+            while have < count:
+                spec = self.random.choice(specs)
+                for _ in range(8):
+                    partner = self.partner(spec)
+                    if partner is not None and self.link(obj, spec, partner):
+                        break
+                else:
+                    for _ in range(8):
+                        if self.link(
+                            obj, spec, self.create(self.random.choice(spec[4]))
+                        ):
+                            break
+                    else:
+                        raise ValueError(f"Can't connect {obj} through {spec[0]}")
+                have += 1
+
+    def populate(self, objects: int, weights: Optional[Mapping[str, float]]) -> None:
+        if weights is None:
+            types = sorted(self.assets)
+            cumulative = None
+        else:
+            unknown = set(weights) - self.assets
+            if unknown:
+                raise ValueError(f"Can't generate {sorted(unknown)}")
+            types = list(weights)
+            cumulative = list(itertools.accumulate(weights[t] for t in types))
+        while len(self.objects) < objects:
+            if cumulative is None:
+                asset_type = self.random.choice(types)
+            else:
+                asset_type = self.random.choices(types, cum_weights=cumulative)[0]
+            self.create(asset_type)
+            while self.pending:
+                self.satisfy(self.pending.pop())
+
+    def connect(self, associations: int) -> None:
+        """Add random associations until there are `associations` in total."""
+        objects = self.objects
+        by_type = self.by_type
+        open_fields = self.open_fields
+        link = self.link
+        rand = self.random.random
+        count = len(self.model._associations)
+        attempts = 10 * associations + 1000
+        while count < associations and attempts:
+            attempts -= 1
+            obj = objects[int(rand() * len(objects))]
+            fields = open_fields[obj._asset_type]
+            if not fields:
+                continue
+            spec = fields[int(rand() * len(fields))]
+            partners = by_type.get(spec[4][int(rand() * len(spec[4]))])
+            if partners and link(obj, spec, partners[int(rand() * len(partners))]):
+                count += 1
+
+    def attach(self, attackers: int, attack_steps: int) -> None:
+        attack_types = (AttackStepType.AND, AttackStepType.OR)
+        steps = {
+            asset: list(self.lang.step_names(asset, attack_types).values())
+            for asset in self.by_type
+        }
+        targets = [obj for obj in self.objects if steps[obj._asset_type]]
+        if not targets:
+            return
+        for _ in range(attackers):
+            attacker = self.model.create_attacker()
+            for _ in range(attack_steps):
+                obj = self.random.choice(targets)
+                step = self.random.choice(steps[obj._asset_type])
+                if obj not in attacker._first_steps or (
+                    step not in attacker._first_steps[obj]
+                ):
+                    attacker.connect(obj.attack_step(step))
+
+
+def generate_model(
+    lang: Lang,
+    objects: int,
+    *,
+    associations: Optional[int] = None,
+    seed: Optional[int] = None,
+    weights: Optional[Mapping[str, float]] = None,
+    attackers: int = 1,
+    attack_steps: int = 1,
+    layout: Optional[Callable[[str], Layout]] = None,
+    name: str = "Generated",
+) -> Model:
+    """
+    Generate a model of at least `objects` objects in `lang` without validation errors.
+
+    Asset types are drawn uniformly from the concrete assets, or by `weights`. Every
+    object gets the connections its fields need, which can create more objects than
+    asked for, and random connections are added until there are `associations`, by
+    default as many as objects. Fields are never connected beyond their maximum, and
+    the association rules of the language's validator are followed. Then `attackers`
+    attackers are each connected to `attack_steps` random attack steps. With `layout`,
+    e.g. `GridLayout` or `functools.partial(ForceLayout, seed=1)`, a view with every
+    object is built. The same `seed` gives the same model.
+    """
+    if objects < 1:
+        raise ValueError("'objects' must be at least 1")
+    generator = Generator(lang, seed, name, max_objects=10 * objects + 1000)
+    if not generator.assets:
+        raise ValueError(f"No asset of {lang.defines['id']} can be generated")
+    model = generator.model
+    # Nothing created here is garbage, collecting while millions of objects are
+    # created only rescans them
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        generator.populate(objects, weights)
+        generator.connect(objects if associations is None else associations)
+        model._counter = len(generator.objects) + 1
+        for obj in generator.objects:
+            model._validator.validate_multiplicity(obj)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    generator.attach(attackers, attack_steps)
+    if layout is not None:
+        root = layout(name)
+        for obj in generator.objects:
+            root.add_item(obj)
+        root.build(model)
+    return model
@@ -0,0 +1,125 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import contextlib
+from typing import Callable, ContextManager, Iterator, Tuple
+
+from .exceptions import JournalException
+
+# Return values of the callables are ignored
+Change = Tuple[Callable[[], object], Callable[[], object]]
+
+
+class Journal:
+    """
+    Change log of a model.
+
+    Every change is recorded as a pair of callables, one reverting the change and one
+    reapplying it. Changes are only recorded while the journal is `enabled` or while a
+    transaction is open, so models that don't use undo/redo don't pay for it.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._undo_stack: list[list[Change]] = []
+        self._redo_stack: list[list[Change]] = []
+        self._transactions: list[list[Change]] = []
+        self._replaying = False
+
+    @property
+    def recording(self) -> bool:
+        return (self.enabled or bool(self._transactions)) and not self._replaying
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo_stack)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo_stack)
+
+    def record(self, undo: Callable[[], object], redo: Callable[[], object]) -> None:
+        if self._transactions:
+            self._transactions[-1].append((undo, redo))
+        else:
+            self._commit([(undo, redo)])
+
+    def _commit(self, changes: list[Change]) -> None:
+        self._undo_stack.append(changes)
+        self._redo_stack.clear()
+
+    def _replay(self, changes: list[Change], redo: bool) -> None:
+        self._replaying = True
+        try:
+            if redo:
+                for _, redo_change in changes:
+                    redo_change()
+            else:
+                for undo_change, _ in reversed(changes):
+                    undo_change()
+        finally:
+            self._replaying = False
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Group all changes made within the block.
+
+        If the block raises, all changes are reverted in reverse order before the
+        exception propagates. Otherwise the changes become a single undo step, or are
+        merged into the enclosing transaction when nested.
+        """
+        changes: list[Change] = []
+        self._transactions.append(changes)
+        try:
+            yield
+        except BaseException:
+            self._transactions.pop()
+            self._replay(changes, redo=False)
+            raise
+        self._transactions.pop()
+        if self._transactions:
+            self._transactions[-1].extend(changes)
+        elif self.enabled and changes:
+            self._commit(changes)
+
+    def batch(self) -> ContextManager[None]:
+        """Group changes into a single undo step, but only if they are recorded."""
+        if self.recording:
+            return self.transaction()
+        return contextlib.nullcontext()
+
+    def undo(self) -> None:
+        if self._transactions:
+            raise JournalException("Can't undo while a transaction is open.")
+        if not self._undo_stack:
+            raise JournalException("Nothing to undo.")
+        changes = self._undo_stack.pop()
+        self._replay(changes, redo=False)
+        self._redo_stack.append(changes)
+
+    def redo(self) -> None:
+        if self._transactions:
+            raise JournalException("Can't redo while a transaction is open.")
+        if not self._redo_stack:
+            raise JournalException("Nothing to redo.")
+        changes = self._redo_stack.pop()
+        self._replay(changes, redo=True)
+        self._undo_stack.append(changes)
+
+    def clear(self) -> None:
+        self._undo_stack.clear()
+        self._redo_stack.clear()
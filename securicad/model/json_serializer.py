@@ -19,7 +19,8 @@ import importlib.resources
 import json
 import typing
 from functools import lru_cache
-from typing import TYPE_CHECKING, Any, Optional, Type
+from os import PathLike
+from typing import IO, TYPE_CHECKING, Any, Optional, Type
 
 import jsonschema
 
@@ -37,13 +38,18 @@ from securicad.langspec import (
     TtcSubtraction,
 )
 
-from . import utility
+from . import tracing, utility
 from .attacker import Attacker
 from .exceptions import LangException
 from .visual.container import Container
 
 if TYPE_CHECKING:  # pragma: no cover
+    from .aio import Runner
+    from .association import Association
+    from .icon import Icon
     from .model import Model
+    from .object import Object
+    from .visual.view import View
 
 
 @lru_cache(1)
@@ -53,10 +59,13 @@ def read_schema() -> dict[str, Any]:
 
 
 def validate_model_data(data: dict[str, Any]):
-    jsonschema.validate(data, read_schema())
+    with tracing.span("json.schema_validation"):
+        jsonschema.validate(data, read_schema())
 
 
-def serialize_container(container: Container) -> dict[str, Any]:
+def serialize_container(
+    container: Container, deterministic: bool = False
+) -> dict[str, Any]:
     return {
         "meta": container.meta,
         "id": container.id,
@@ -71,20 +80,20 @@ def serialize_container(container: Container) -> dict[str, Any]:
                     "y": obj.y,
                     "type": "object",
                 }
-                for obj in container._objects.values()
+                for obj in utility.by_id(container._objects.values(), deterministic)
             ],
         )
         + typing.cast(
             "list[Any]",
             [
                 {
-                    **serialize_container(group),
+                    **serialize_container(group, deterministic),
                     "x": group.x,
                     "y": group.y,
                     "icon": group.icon,
                     "type": "group",
                 }
-                for group in container._groups.values()
+                for group in utility.by_id(container._groups.values(), deterministic)
             ],
         ),
     }
@@ -93,18 +102,27 @@ def serialize_container(container: Container) -> dict[str, Any]:
 def deserialize_items(
     model: Model, container: Container, items: list[dict[str, Any]]
 ) -> None:
+    objects: list[dict[str, Any]] = []
+    groups: list[dict[str, Any]] = []
     for item in items:
         if item["type"] == "object":
-            obj = container.add_object(model.object(item["id"]), item["x"], item["y"])
-            obj.meta = item["meta"]
+            objects.append(item)
         elif item["type"] == "group":
-            group = container.create_group(
-                item["name"], item["icon"], item["x"], item["y"], id=item["id"]
-            )
-            group.meta = item["meta"]
-            deserialize_items(model, group, item["items"])
+            groups.append(item)
         else:  # pragma: no cover
             raise RuntimeError(f"invalid item type {item['type']}")
+    view_objects = container.add_objects(
+        (model.object(item["id"]), item["x"], item["y"]) for item in objects
+    )
+    for obj, item in zip(view_objects, objects):
+        obj.meta = item["meta"]
+    created = container.create_groups(
+        (item["name"], item["icon"], item["x"], item["y"], item["id"])
+        for item in groups
+    )
+    for group, item in zip(created, groups):
+        group.meta = item["meta"]
+        deserialize_items(model, group, item["items"])
 
 
 def serialize_ttc(ttc: TtcExpression) -> dict[str, Any]:
@@ -145,136 +163,168 @@ def deserialize_ttc(data: dict[str, Any]) -> TtcExpression:
         raise RuntimeError(f"{data} couldn't be deserialized")
 
 
-def serialize_model(model: Model, *, sort: bool = False) -> dict[str, Any]:
+def serialize_object(obj: Object, deterministic: bool = False) -> dict[str, Any]:
+    return {
+        "meta": obj.meta,
+        "id": obj.id,
+        "name": obj.name,
+        "asset_type": obj.asset_type,
+        "attack_steps": [
+            {
+                "meta": attack_step.meta,
+                "name": attack_step.name,
+                "ttc": None
+                if attack_step.ttc is None
+                else serialize_ttc(attack_step.ttc),
+            }
+            for attack_step in utility.by_name(
+                obj._attack_steps.values(), deterministic
+            )
+            if not attack_step.is_default
+        ],
+        "defenses": [
+            {
+                "meta": defense.meta,
+                "name": defense.name,
+                "probability": None
+                if defense.probability is None
+                else defense.probability,
+            }
+            for defense in utility.by_name(obj._defenses.values(), deterministic)
+            if not defense.is_default
+        ],
+    }
+
+
+def serialize_association(
+    association: Association, deterministic: bool = False
+) -> dict[str, Any]:
+    source, source_field, target, target_field = utility.association_ends(
+        association, deterministic
+    )
+    return {
+        "meta": association.meta,
+        "source_object_id": source.id,
+        "source_field": source_field,
+        "target_object_id": target.id,
+        "target_field": target_field,
+    }
+
+
+def serialize_icon(icon: Icon) -> dict[str, Any]:
+    return {
+        "name": icon.name,
+        "license": icon.license,
+        "data": base64.b64encode(icon.data).decode("utf-8"),
+        "format": icon.format,
+        "meta": icon.meta,
+    }
+
+
+def serialize_model(
+    model: Model,
+    *,
+    sort: bool = False,
+    deterministic: bool = False,
+    validate: bool = True,
+) -> dict[str, Any]:
+    """
+    Serialize `model` as a dictionary.
+
+    With `sort`, associations are sorted by their JSON encoding. With `deterministic`,
+    objects, views, groups, and view items are sorted by ID, attack steps, defenses,
+    and icons by name, and associations by their IDs and fields, each in the same
+    direction regardless of the side it was connected from. Models with the same
+    content then serialize the same regardless of the order in which they were built.
+    Encode the result with `json.dumps(..., sort_keys=True)` to also make the order of
+    meta keys stable. `validate=False` skips validating the result against the JSON
+    schema.
+    """
+
     def sort_dict_list(associations: list[dict[str, Any]]) -> list[dict[str, Any]]:
         return sorted(associations, key=json.dumps) if sort else associations
 
+    associations = [
+        serialize_association(association, deterministic)
+        for association in utility.by_association(model._associations, deterministic)
+    ]
     data = {
         "name": model.name,
         "meta": model.meta,
         "objects": [
-            {
-                "meta": obj.meta,
-                "id": obj.id,
-                "name": obj.name,
-                "asset_type": obj.asset_type,
-                "attack_steps": [
-                    {
-                        "meta": attack_step.meta,
-                        "name": attack_step.name,
-                        "ttc": None
-                        if attack_step.ttc is None
-                        else serialize_ttc(attack_step.ttc),
-                    }
-                    for attack_step in obj._attack_steps.values()
-                    if not attack_step.is_default
-                ],
-                "defenses": [
-                    {
-                        "meta": defense.meta,
-                        "name": defense.name,
-                        "probability": None
-                        if defense.probability is None
-                        else defense.probability,
-                    }
-                    for defense in obj._defenses.values()
-                    if not defense.is_default
-                ],
-            }
-            for obj in model._objects.values()
+            serialize_object(obj, deterministic)
+            for obj in utility.by_id(model._objects.values(), deterministic)
+        ],
+        "associations": associations if deterministic else sort_dict_list(associations),
+        "views": [
+            serialize_container(view, deterministic)
+            for view in utility.by_id(model._views.values(), deterministic)
         ],
-        "associations": sort_dict_list(
-            [
-                {
-                    "meta": association.meta,
-                    "source_object_id": association.source_object.id,
-                    "source_field": association.source_field,
-                    "target_object_id": association.target_object.id,
-                    "target_field": association.target_field,
-                }
-                for association in model._associations
-            ]
-        ),
-        "views": [serialize_container(view) for view in model._views.values()],
         "icons": [
-            {
-                "name": icon.name,
-                "license": icon.license,
-                "data": base64.b64encode(icon.data).decode("utf-8"),
-                "format": icon.format,
-                "meta": icon.meta,
-            }
-            for icon in model._icons.values()
+            serialize_icon(icon)
+            for icon in utility.by_name(model._icons.values(), deterministic)
         ],
     }
-    validate_model_data(data)
+    if validate:
+        validate_model_data(data)
     return data
 
 
-def deserialize_model(
-    data: dict[str, Any], *, lang: Optional[Lang] = None, validate_icons: bool = True
-) -> Model:
-    from .model import Model
-
-    validate_model_data(data)
-
-    if lang:
-        utility.verify_lang(
-            lang=lang,
-            lang_id=data["meta"]["langId"],
-            lang_version=data["meta"]["langVersion"],
+def deserialize_object(model: Model, o_data: dict[str, Any]) -> Object:
+    if o_data["asset_type"] == "Attacker":
+        return model.create_attacker(
+            o_data["name"], id=o_data["id"], meta=o_data["meta"]
         )
-
-    model = Model(
-        data["name"],
-        lang=lang,
-        lang_id=data["meta"]["langId"],
-        lang_version=data["meta"]["langVersion"],
-        validate_icons=validate_icons,
+    obj = model.create_object(
+        o_data["asset_type"],
+        o_data["name"],
+        id=o_data["id"],
+        meta=o_data["meta"],
     )
-    model.meta = data["meta"]
+    for a_data in o_data["attack_steps"]:
+        attack_step = obj.attack_step(a_data["name"])
+        attack_step.meta = a_data["meta"]
+        if a_data["ttc"] is not None:
+            attack_step.ttc = deserialize_ttc(a_data["ttc"])
+    for d_data in o_data["defenses"]:
+        defense = obj.defense(d_data["name"])
+        defense.meta = d_data["meta"]
+        defense.probability = d_data["probability"]
+    return obj
+
+
+def deserialize_icon(model: Model, i_data: dict[str, Any]) -> Icon:
+    icon = model.create_icon(
+        i_data["name"],
+        i_data["format"],
+        base64.b64decode(i_data["data"]),
+        i_data["license"],
+    )
+    icon.meta = i_data["meta"]
+    return icon
 
-    for o_data in data["objects"]:
-        if o_data["asset_type"] == "Attacker":
-            model.create_attacker(o_data["name"], id=o_data["id"], meta=o_data["meta"])
-        else:
-            obj = model.create_object(
-                o_data["asset_type"],
-                o_data["name"],
-                id=o_data["id"],
-                meta=o_data["meta"],
-            )
-            for a_data in o_data["attack_steps"]:
-                attack_step = obj.attack_step(a_data["name"])
-                attack_step.meta = a_data["meta"]
-                if a_data["ttc"] is not None:
-                    attack_step.ttc = deserialize_ttc(a_data["ttc"])
-            for d_data in o_data["defenses"]:
-                defense = obj.defense(d_data["name"])
-                defense.meta = d_data["meta"]
-                defense.probability = d_data["probability"]
 
-    for i_data in data["icons"]:
-        icon = model.create_icon(
-            i_data["name"],
-            i_data["format"],
-            base64.b64decode(i_data["data"]),
-            i_data["license"],
-        )
-        icon.meta = i_data["meta"]
+def deserialize_view(model: Model, v_data: dict[str, Any]) -> View:
+    view = model.create_view(v_data["name"], id=v_data["id"])
+    view.meta = v_data["meta"]
+    deserialize_items(model, view, v_data["items"])
+    return view
+
+
+def deserialize_associations(model: Model, associations: list[dict[str, Any]]) -> None:
+    with tracing.span("json.associations"):
+        _deserialize_associations(model, associations)
 
-    for v_data in data["views"]:
-        view = model.create_view(v_data["name"], id=v_data["id"])
-        view.meta = v_data["meta"]
-        deserialize_items(model, view, v_data["items"])
 
+def _deserialize_associations(model: Model, associations: list[dict[str, Any]]) -> None:
     # FIXME: Clean this up when securilang is retired
-    queue: list[dict[str, Any]] = list(data["associations"])
+    queue: list[dict[str, Any]] = list(associations)
     assoc_was_added = True
     while queue and assoc_was_added:
         last_exc: Optional[LangException] = None
         assoc_was_added = False
         assocs_added: list[dict[str, Any]] = []
+        tracing.add("json.association_passes")
 
         # first try to create any remaining to-be-created-assoc
         for que_obj in queue:
@@ -305,5 +355,100 @@ def deserialize_model(
         # last remove the created ones from the attempt queue
         for assoc in assocs_added:
             queue.remove(assoc)
+        if queue:
+            tracing.add("json.association_retries", len(queue))
+
+
+def deserialize_model(
+    data: dict[str, Any],
+    *,
+    lang: Optional[Lang] = None,
+    validate_icons: bool = True,
+    validate: bool = True,
+) -> Model:
+    """
+    Create a model from a dictionary. `validate=False` skips validating `data` against
+    the JSON schema, for data that is known to be valid.
+    """
+    from .model import Model
+
+    if validate:
+        validate_model_data(data)
+
+    if lang:
+        utility.verify_lang(
+            lang=lang,
+            lang_id=data["meta"]["langId"],
+            lang_version=data["meta"]["langVersion"],
+        )
+
+    model = Model(
+        data["name"],
+        lang=lang,
+        lang_id=data["meta"]["langId"],
+        lang_version=data["meta"]["langVersion"],
+        validate_icons=validate_icons,
+    )
+    model.meta = data["meta"]
+
+    for o_data in data["objects"]:
+        deserialize_object(model, o_data)
+
+    for i_data in data["icons"]:
+        deserialize_icon(model, i_data)
+
+    for v_data in data["views"]:
+        deserialize_view(model, v_data)
+
+    deserialize_associations(model, data["associations"])
 
     return model
+
+
+# async
+
+
+def _load(
+    file: str | PathLike[Any] | IO[Any], lang: Optional[Lang], validate_icons: bool
+) -> Model:
+    return deserialize_model(
+        utility.read_json(file), lang=lang, validate_icons=validate_icons
+    )
+
+
+def _dump(
+    model: Model, file: str | PathLike[Any] | IO[str], sort: bool, deterministic: bool
+) -> None:
+    utility.write_json(
+        serialize_model(model, sort=sort, deterministic=deterministic), file
+    )
+
+
+async def aload(
+    file: str | PathLike[Any] | IO[Any],
+    *,
+    lang: Optional[Lang] = None,
+    validate_icons: bool = True,
+    runner: Optional[Runner] = None,
+) -> Model:
+    """
+    Read a JSON model from a path or file object in the executor of `runner`, or of
+    the runner set with `aio.configure`.
+    """
+    from . import aio
+
+    return await aio.run(_load, file, lang, validate_icons, runner=runner)
+
+
+async def adump(
+    model: Model,
+    file: str | PathLike[Any] | IO[str],
+    *,
+    sort: bool = False,
+    deterministic: bool = False,
+    runner: Optional[Runner] = None,
+) -> None:
+    """Write `model` as JSON to a path or text file object, see `aload`."""
+    from . import aio
+
+    await aio.run(_dump, model, file, sort, deterministic, runner=runner)
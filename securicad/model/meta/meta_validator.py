@@ -21,6 +21,8 @@ from typing import TYPE_CHECKING, Any
 
 import jsonschema
 
+from .. import tracing
+
 if TYPE_CHECKING:  # pragma: no cover
     from securicad.model import Model
     from securicad.model.base import Base
@@ -34,17 +36,36 @@ def schema(name: str) -> dict[str, Any]:
         return json.load(fp)
 
 
+@lru_cache
+def validator(name: str) -> Any:
+    # Same as `jsonschema.validate`, but the schema is only checked once
+    schema_ = schema(name)
+    cls = jsonschema.validators.validator_for(schema_)  # type: ignore
+    cls.check_schema(schema_)
+    return cls(schema_)
+
+
+@lru_cache
+def accepts_empty(name: str) -> bool:
+    return bool(validator(name).is_valid({}))
+
+
 def validate(instance: Base, name: str):
-    jsonschema.validate(instance.meta, schema(name))  # type: ignore
+    if not instance.meta and accepts_empty(name):
+        return
+    error = jsonschema.exceptions.best_match(validator(name).iter_errors(instance.meta))
+    if error is not None:
+        raise error
 
 
 def validate_model(model: Model):
-    validate(model, "model")
-    for obj in model._objects.values():
-        validate(obj, "object")
-        for attack_step in obj._attack_steps.values():
-            validate(attack_step, "attackstep")
-    for view in model._views.values():
-        validate(view, "view")
-        for group in view.groups():
-            validate(group, "group")
+    with tracing.span("meta.schema_validation"):
+        validate(model, "model")
+        for obj in model._objects.values():
+            validate(obj, "object")
+            for attack_step in obj._attack_steps.values():
+                validate(attack_step, "attackstep")
+        for view in model._views.values():
+            validate(view, "view")
+            for group in view.groups():
+                validate(group, "group")
@@ -17,14 +17,16 @@ from __future__ import annotations
 
 import collections
 import typing
-from typing import TYPE_CHECKING, Any, DefaultDict, Optional
+from typing import Any, ContextManager, DefaultDict, Optional
 
 from securicad.langspec import Lang
 
 from . import utility
-from .association import Association, FieldTarget
+from .association import Association, Field, FieldTarget
 from .attacker import Attacker
+from .attackstep import AttackStep
 from .base import Base
+from .defense import Defense
 from .exceptions import (
     DuplicateAssociationException,
     DuplicateAttackStepException,
@@ -38,15 +40,14 @@ from .exceptions import (
     MissingViewException,
     ModelException,
 )
+from .fingerprint import Fingerprint
 from .icon import Icon
+from .journal import Journal
 from .object import Object
 from .securilang_validator import SecurilangValidator
 from .validator import Validator
 from .visual.view import View
 
-if TYPE_CHECKING:
-    from .attackstep import AttackStep
-
 
 class Model(Base):
     def __init__(
@@ -77,14 +78,127 @@ class Model(Base):
             self._validator = Validator(self, validate_icons)
         self._views: dict[int, View] = {}
         self._objects: dict[int, Object] = {}
+        self._objects_by_type: DefaultDict[
+            str, dict[int, Object]
+        ] = collections.defaultdict(dict)
         self._attackers: dict[int, Attacker] = {}
         self._associations: set[Association] = set()
+        # Number of attack steps attackers are connected to
+        self._connection_count = 0
+        # Bumped whenever an association or connection is added or removed
+        self._association_revision = 0
         self._icons: dict[str, Icon] = {}
         self._counter = 1
+        self._journal = Journal()
+        self._fingerprint = Fingerprint(self)
         self._multiplicity_errors: DefaultDict[
             Object, list[str]
         ] = collections.defaultdict(list)
 
+    def clone(self) -> Model:
+        """
+        Return a deep copy of the model.
+
+        The copy shares the language and icon data with this model, which are never
+        modified, and copies everything else. Nothing is validated again, so the copy
+        also has the same multiplicity errors as this model. The journal isn't copied.
+        """
+        model = Model(
+            self.name,
+            lang=self._lang,
+            lang_id=self.meta["langId"],
+            lang_version=self.meta["langVersion"],
+            validate_icons=self._validator.validate_icons,
+        )
+        model.meta = utility.copy_meta(self.meta)
+        model._counter = self._counter
+
+        objects: dict[int, Object] = {}
+        for obj in self._objects.values():
+            meta = utility.copy_meta(obj.meta)
+            if isinstance(obj, Attacker):
+                clone: Object = Attacker(meta, model, obj.id, obj.name)
+                model._attackers[obj.id] = clone  # type: ignore
+            else:
+                clone = Object(meta, model, obj.id, obj.asset_type, obj.name)
+            for name, attack_step in obj._attack_steps.items():
+                clone._attack_steps[name] = AttackStep(
+                    utility.copy_meta(attack_step.meta), clone, name, attack_step.ttc
+                )
+            for name, defense in obj._defenses.items():
+                clone._defenses[name] = Defense(
+                    utility.copy_meta(defense.meta), clone, name, defense.probability
+                )
+            for name in obj._associations:
+                clone._associations[name] = Field(clone, name)
+            objects[obj.id] = clone
+            model._objects_by_type[obj.asset_type][obj.id] = clone
+        model._objects = objects
+
+        connections: set[Association] = set()
+        for attacker in self._attackers.values():
+            attacker_clone = model._attackers[attacker.id]
+            for obj, steps in attacker._first_steps.items():
+                target = objects[obj.id]
+                for step_name, connection in steps.items():
+                    connections.add(connection)
+                    model._add_connection(
+                        attacker_clone,
+                        target,
+                        step_name,
+                        Association(
+                            utility.copy_meta(connection.meta),
+                            attacker_clone,
+                            connection.source_field,
+                            target,
+                            connection.target_field,
+                        ),
+                    )
+
+        for association in self._associations:
+            if association in connections:
+                continue
+            source_object = objects[association.source_object.id]
+            target_object = objects[association.target_object.id]
+            source_field = source_object._associations[association.source_field]
+            target_field = target_object._associations[association.target_field]
+            copied = Association(
+                utility.copy_meta(association.meta),
+                source_object,
+                association.source_field,
+                target_object,
+                association.target_field,
+            )
+            source_field_target = FieldTarget(
+                source_field, typing.cast(Any, None), copied
+            )
+            target_field_target = FieldTarget(target_field, source_field_target, copied)
+            source_field_target.target = target_field_target
+            source_field._targets[target_object.id] = source_field_target
+            target_field._targets[source_object.id] = target_field_target
+            model._associations.add(copied)
+
+        for icon in self._icons.values():
+            model._icons[icon.name] = Icon(
+                utility.copy_meta(icon.meta),
+                model,
+                icon.name,
+                icon.format,
+                icon.data,
+                icon.license,
+            )
+
+        for view in self._views.values():
+            clone_view = View(utility.copy_meta(view.meta), model, view.name, view.id)
+            view._clone_items(clone_view)
+            model._views[view.id] = clone_view
+
+        for obj, errors in self._multiplicity_errors.items():
+            if errors:
+                model._multiplicity_errors[objects[obj.id]] = list(errors)
+        model._fingerprint = self._fingerprint.clone(model)
+        return model
+
     def _get_id(self, id: Optional[int] = None) -> int:
         """
         Return lowest non-taken ID if `id` is not specified, otherwise return `id`.
@@ -95,18 +209,22 @@ class Model(Base):
         """
         if id is not None:
             return id
-        group_ids = {
-            group.id for view in self._views.values() for group in view.groups()
-        }
-        while (  # id's are shared between objects, views, and groups
-            self._counter in self._objects
-            or self._counter in self._views
-            or self._counter in group_ids
-        ):
+        return self._get_ids(1)[0]
+
+    def _get_ids(self, count: int) -> list[int]:
+        """Return the `count` lowest non-taken IDs, see `_get_id()`."""
+        views = list(self._views.values())
+        ids: list[int] = []
+        while len(ids) < count:
+            while (  # id's are shared between objects, views, and groups
+                self._counter in self._objects
+                or self._counter in self._views
+                or any(self._counter in view._group_index for view in views)
+            ):
+                self._counter += 1
+            ids.append(self._counter)
             self._counter += 1
-        id = self._counter
-        self._counter += 1
-        return id
+        return ids
 
     def _update_counter(self, id: int) -> None:
         self._counter = min(id, self._counter)
@@ -114,16 +232,69 @@ class Model(Base):
     def _add_error(self, obj: Object, error: str):
         self._multiplicity_errors[obj].append(error)
 
+    ##
+    # Journal
+
+    @property
+    def journal(self) -> Journal:
+        return self._journal
+
+    def transaction(self) -> ContextManager[None]:
+        return self._journal.transaction()
+
+    def undo(self) -> None:
+        self._journal.undo()
+
+    def redo(self) -> None:
+        self._journal.redo()
+
+    ##
+    # Fingerprint
+
+    def fingerprint(self) -> str:
+        """
+        Return a hash of the model's content that doesn't depend on the order in which
+        the model was built.
+
+        The hash is maintained incrementally, so asking for it again after a small
+        change is cheap. Changes made directly to `meta` dictionaries aren't observed,
+        pass the changed items to `invalidate_fingerprint()`.
+        """
+        return self._fingerprint.model()
+
+    def invalidate_fingerprint(self, *items: Base) -> None:
+        """Rehash `items` on the next call to `fingerprint()`, or everything."""
+        if not items:
+            self._fingerprint.reset()
+        for item in items:
+            self._fingerprint.invalidate_item(item)
+
     ##
     # Icon
 
+    def _add_icon(self, icon: Icon) -> None:
+        self._icons[icon.name] = icon
+        self._fingerprint.invalidate("icon", icon.name)
+        if self._journal.recording:
+            self._journal.record(
+                lambda: self._remove_icon(icon), lambda: self._add_icon(icon)
+            )
+
+    def _remove_icon(self, icon: Icon) -> None:
+        del self._icons[icon.name]
+        self._fingerprint.invalidate("icon", icon.name)
+        if self._journal.recording:
+            self._journal.record(
+                lambda: self._add_icon(icon), lambda: self._remove_icon(icon)
+            )
+
     def create_icon(self, name: str, format: str, data: bytes, license: str) -> Icon:
         if name in self._icons:
             raise DuplicateIconException(name)
         icon = Icon(
             meta={}, model=self, name=name, format=format, data=data, license=license
         )
-        self._icons[name] = icon
+        self._add_icon(icon)
         return icon
 
     def icon(self, name: str) -> Icon:
@@ -134,7 +305,7 @@ class Model(Base):
     def _delete_icon(self, name: str) -> None:
         if name not in self._icons:
             raise MissingIconException(name)
-        del self._icons[name]
+        self._remove_icon(self._icons[name])
 
     ##
     # Validation
@@ -163,7 +334,28 @@ class Model(Base):
 
     def _add_object(self, obj: Object) -> None:
         self._objects[obj.id] = obj
+        self._objects_by_type[obj.asset_type][obj.id] = obj
+        if isinstance(obj, Attacker):
+            self._attackers[obj.id] = obj
         self._validator.validate_multiplicity(obj)
+        self._fingerprint.invalidate("object", obj.id)
+        if self._journal.recording:
+            self._journal.record(
+                lambda: self._remove_object(obj), lambda: self._add_object(obj)
+            )
+
+    def _remove_object(self, obj: Object) -> None:
+        self._update_counter(obj.id)
+        del self._objects[obj.id]
+        del self._objects_by_type[obj.asset_type][obj.id]
+        if isinstance(obj, Attacker):
+            del self._attackers[obj.id]
+        self._multiplicity_errors.pop(obj, None)
+        self._fingerprint.invalidate("object", obj.id)
+        if self._journal.recording:
+            self._journal.record(
+                lambda: self._add_object(obj), lambda: self._remove_object(obj)
+            )
 
     def has_object(self, id: int) -> bool:
         return id in self._objects
@@ -176,9 +368,11 @@ class Model(Base):
     def objects(
         self, *, name: Optional[str] = None, asset_type: Optional[str] = None
     ) -> list[Object]:
-        return utility.iterable_filter(
-            self._objects.values(), name=name, asset_type=asset_type
-        )
+        if asset_type is not None:
+            return utility.iterable_filter(
+                self._objects_by_type.get(asset_type, {}).values(), name=name
+            )
+        return utility.iterable_filter(self._objects.values(), name=name)
 
     def create_object(
         self,
@@ -202,30 +396,26 @@ class Model(Base):
         if not self.has_object(id):
             raise MissingObjectException(id)
         obj = self._objects[id]
-        self._update_counter(obj.id)
 
-        for field in obj._associations.values():
-            for field_target in field.targets:
-                obj.field(field.name).disconnect(field_target.target.field.object)
+        with self._journal.batch():
+            for field in obj._associations.values():
+                for field_target in field.targets:
+                    obj.field(field.name).disconnect(field_target.target.field.object)
 
-        for view in self._views.values():
-            if view.has_object(obj):
-                view.object(obj).delete()
+            for view in self._views.values():
+                if view.has_object(obj):
+                    view.object(obj).delete()
 
-        del self._objects[id]
-        if isinstance(obj, Attacker):
-            del self._attackers[id]
-            for obj2, steps in obj._first_steps.items():
-                obj2._attackers.remove(obj)
-                for association in steps.values():
-                    self._associations.remove(association)
+            if isinstance(obj, Attacker):
+                for obj2, steps in list(obj._first_steps.items()):
+                    for attack_step in list(steps):
+                        self._remove_connection(obj, obj2, attack_step)
 
-        del self._multiplicity_errors[obj]
+            for attacker in list(obj._attackers):
+                for attack_step in list(attacker._first_steps[obj]):
+                    self._remove_connection(attacker, obj, attack_step)
 
-        for attacker in obj._attackers:
-            for association in attacker._first_steps[obj].values():
-                self._associations.remove(association)
-            del attacker._first_steps[obj]
+            self._remove_object(obj)
 
     ##
     # Attacker
@@ -241,7 +431,6 @@ class Model(Base):
         if self.has_object(id):
             raise DuplicateObjectException(self.object(id))
         attacker = Attacker(meta or {}, self, id, name)
-        self._attackers[attacker.id] = attacker
         self._add_object(attacker)
         return attacker
 
@@ -260,18 +449,47 @@ class Model(Base):
             raise DuplicateAttackStepException(attacker, attack_step)
 
     def _add_connection(
-        self, attacker: Attacker, obj: Object, attack_step: str
+        self,
+        attacker: Attacker,
+        obj: Object,
+        attack_step: str,
+        association: Optional[Association] = None,
     ) -> None:
-        association = Association(
+        connection = association or Association(
             meta={},
             source_object=attacker,
             source_field="firstSteps",
             target_object=obj,
             target_field=f"{attack_step}.attacker",
         )
-        attacker._first_steps[obj][attack_step] = association
+        attacker._first_steps[obj][attack_step] = connection
         obj._attackers.add(attacker)
-        self._associations.add(association)
+        self._connection_count += 1
+        self._association_revision += 1
+        self._associations.add(connection)
+        self._fingerprint.invalidate_association(connection)
+        if self._journal.recording:
+            self._journal.record(
+                lambda: self._remove_connection(attacker, obj, attack_step),
+                lambda: self._add_connection(attacker, obj, attack_step, connection),
+            )
+
+    def _remove_connection(
+        self, attacker: Attacker, obj: Object, attack_step: str
+    ) -> None:
+        connection = attacker._first_steps[obj].pop(attack_step)
+        if not attacker._first_steps[obj]:
+            del attacker._first_steps[obj]
+            obj._attackers.discard(attacker)
+        self._connection_count -= 1
+        self._association_revision += 1
+        self._associations.remove(connection)
+        self._fingerprint.invalidate_association(connection)
+        if self._journal.recording:
+            self._journal.record(
+                lambda: self._add_connection(attacker, obj, attack_step, connection),
+                lambda: self._remove_connection(attacker, obj, attack_step),
+            )
 
     ##
     # Association
@@ -306,8 +524,32 @@ class Model(Base):
         target_field._targets[source_field.object.id] = target_field_target
 
         self._associations.add(association)
+        self._association_revision += 1
+        self._validator.validate_multiplicity(association.source_object)
+        self._validator.validate_multiplicity(association.target_object)
+        self._fingerprint.invalidate_association(association)
+        if self._journal.recording:
+            self._journal.record(
+                lambda: self._remove_association(association),
+                lambda: self._add_association(association),
+            )
+
+    def _remove_association(self, association: Association) -> None:
+        source_field = association.source_object.field(association.source_field)
+        target_field = association.target_object.field(association.target_field)
+        del source_field._targets[association.target_object.id]
+        del target_field._targets[association.source_object.id]
+
+        self._associations.remove(association)
+        self._association_revision += 1
         self._validator.validate_multiplicity(association.source_object)
         self._validator.validate_multiplicity(association.target_object)
+        self._fingerprint.invalidate_association(association)
+        if self._journal.recording:
+            self._journal.record(
+                lambda: self._add_association(association),
+                lambda: self._remove_association(association),
+            )
 
     def _create_association(
         self,
@@ -336,27 +578,28 @@ class Model(Base):
             raise MissingAssociationException(
                 source_object, source_field, target_object
             )
-        source_field_object = source_object.field(source_field)
-        source_field_target = next(  # pragma: no cover, StopIteration does not happen
-            target
-            for target in source_field_object.targets
-            if target.target.field.object == target_object
-        )
-        target_field_object = source_field_target.target.field
-        target_field_target = source_field_target.target
-
-        del source_field_object._targets[target_field_object.object.id]
-        del target_field_object._targets[source_field_object.object.id]
-
-        self._associations.remove(source_field_target.association)
-        self._validator.validate_multiplicity(source_object)
-        self._validator.validate_multiplicity(target_object)
+        field_target = source_object.field(source_field)._targets[target_object.id]
+        self._remove_association(field_target.association)
 
     ##
     # View
 
     def _add_view(self, view: View) -> None:
         self._views[view.id] = view
+        self._fingerprint.invalidate("view", view.id)
+        if self._journal.recording:
+            self._journal.record(
+                lambda: self._remove_view(view), lambda: self._add_view(view)
+            )
+
+    def _remove_view(self, view: View) -> None:
+        self._update_counter(view.id)
+        del self._views[view.id]
+        self._fingerprint.invalidate("view", view.id)
+        if self._journal.recording:
+            self._journal.record(
+                lambda: self._add_view(view), lambda: self._remove_view(view)
+            )
 
     def create_view(self, name: str, *, id: Optional[int] = None) -> View:
         id = self._get_id(id)
@@ -377,5 +620,4 @@ class Model(Base):
     def _delete_view(self, id: int) -> None:
         if id not in self._views:
             raise MissingViewException(id)
-        self._update_counter(id)
-        del self._views[id]
+        self._remove_view(self._views[id])
@@ -39,7 +39,7 @@ class Object(Base):
         super().__init__(meta)
         self._model = model
         self._id = id
-        self.name = name
+        self._name = name
         self._asset_type = asset_type
         self._associations: dict[str, Field] = {}
         self._attack_steps: dict[str, AttackStep] = {}
@@ -49,6 +49,21 @@ class Object(Base):
     def __str__(self) -> str:
         return f"<{self.__class__.__name__} id={self.id}, asset='{self.asset_type}', name='{self.name}'>"
 
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, value: str) -> None:
+        old_value = self._name
+        self._name = value
+        self._model._fingerprint.invalidate("object", self._id)
+        if self._model._journal.recording:
+            self._model._journal.record(
+                lambda: setattr(self, "name", old_value),
+                lambda: setattr(self, "name", value),
+            )
+
     @property
     def asset_type(self) -> str:
         return self._asset_type
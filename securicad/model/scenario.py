@@ -0,0 +1,281 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import json
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional, Tuple
+
+from securicad import langspec
+
+from . import es_serializer, json_serializer
+from .attackstep import AttackStep
+from .defense import Defense
+from .object import Object
+
+if TYPE_CHECKING:  # pragma: no cover
+    from securicad.langspec import TtcExpression, TtcValue
+
+    from .model import Model
+
+# (object id, attack step or defense name)
+OverrideKey = Tuple[int, str]
+
+SERIALIZERS = {"es": es_serializer, "json": json_serializer}
+PLACEHOLDER = "\0objects\0"
+
+
+class Scenario:
+    """
+    Variant of a model that differs only in defense probabilities and attack step
+    TTCs.
+
+    Only the overridden values are stored, keyed by object ID and attack step or
+    defense name, so that scenarios are cheap to create and to send to other processes.
+    """
+
+    def __init__(
+        self,
+        name: str = "",
+        *,
+        probabilities: Optional[dict[OverrideKey, Optional[float]]] = None,
+        ttcs: Optional[dict[OverrideKey, Optional[TtcValue]]] = None,
+    ) -> None:
+        self.name = name
+        self.probabilities: dict[OverrideKey, Optional[float]] = dict(
+            probabilities or {}
+        )
+        self.ttcs: dict[OverrideKey, Optional[TtcExpression]] = {
+            key: ttc if ttc is None else langspec.wrap_ttc_expression(ttc)
+            for key, ttc in (ttcs or {}).items()
+        }
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__} name='{self.name}', overrides={len(self.probabilities) + len(self.ttcs)}>"
+
+    def set_probability(self, defense: Defense, probability: Optional[float]) -> None:
+        self.probabilities[(defense._object.id, defense.name)] = probability
+
+    def set_ttc(self, attack_step: AttackStep, ttc: Optional[TtcValue]) -> None:
+        self.ttcs[(attack_step._object.id, attack_step.name)] = (
+            ttc if ttc is None else langspec.wrap_ttc_expression(ttc)
+        )
+
+    def object_ids(self) -> set[int]:
+        return {id for id, _ in self.probabilities} | {id for id, _ in self.ttcs}
+
+
+class Scenarios:
+    """
+    Serializes scenarios of a base model.
+
+    The base model is serialized once. For every scenario only the sections of the
+    objects it overrides are serialized again, everything else is shared with the base
+    document. The base model must not be changed while it's in use by a `Scenarios`.
+
+    Every document has the same `mid` as the base document, which is random unless the
+    model's meta has a `mid` or `deterministic` is set, in which case it's derived from
+    the base model's fingerprint. Deterministic documents of equal scenarios are equal,
+    which allows them to be cached or deduplicated by content.
+    """
+
+    def __init__(
+        self,
+        model: Model,
+        *,
+        format: str = "es",
+        sort: bool = False,
+        deterministic: bool = False,
+    ):
+        if format not in SERIALIZERS:
+            raise ValueError(f"format must be one of {list(SERIALIZERS)}")
+        self._model = model
+        self._format = format
+        self._sort = sort
+        self._deterministic = deterministic
+        self._document = SERIALIZERS[format].serialize_model(
+            model, sort=sort, deterministic=deterministic
+        )
+        self._prepare()
+
+    def _prepare(self) -> None:
+        objects = self._document["objects"]
+        if self._format == "es":
+            self._ids = [section["eid"] for section in objects.values()]
+            self._keys: list[Any] = list(objects)
+            encoded = [
+                f"{json.dumps(key)}: {json.dumps(section)}"
+                for key, section in objects.items()
+            ]
+        else:
+            self._ids = [section["id"] for section in objects]
+            self._keys = list(range(len(objects)))
+            encoded = [json.dumps(section) for section in objects]
+        self._encoded = encoded
+        self._positions = {id: position for position, id in enumerate(self._ids)}
+        template = json.dumps({**self._document, "objects": PLACEHOLDER})
+        self._head, self._tail = template.split(json.dumps(PLACEHOLDER))
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Workers rebuild the model from JSON, pickling the object graph directly is
+        # slow and can exceed the recursion limit for large models.
+        return {
+            "model": json_serializer.serialize_model(self._model),
+            "lang": self._model._lang,
+            "validate_icons": self._model._validator.validate_icons,
+            "format": self._format,
+            "sort": self._sort,
+            "deterministic": self._deterministic,
+            "document": self._document,
+        }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self._model = json_serializer.deserialize_model(
+            state["model"], lang=state["lang"], validate_icons=state["validate_icons"]
+        )
+        self._format = state["format"]
+        self._sort = state["sort"]
+        self._deterministic = state["deterministic"]
+        self._document = state["document"]
+        self._prepare()
+
+    @property
+    def model(self) -> Model:
+        return self._model
+
+    @property
+    def format(self) -> str:
+        return self._format
+
+    def _overlay(
+        self,
+        obj: Object,
+        probabilities: dict[str, Optional[float]],
+        ttcs: dict[str, Optional[TtcExpression]],
+    ) -> Object:
+        overlay = Object(obj.meta, self._model, obj.id, obj.asset_type, obj.name)
+        overlay._attack_steps = dict(obj._attack_steps)
+        overlay._defenses = dict(obj._defenses)
+        validator = self._model._validator
+        for name, ttc in ttcs.items():
+            base = obj._attack_steps.get(name)
+            attack_step = AttackStep(base.meta if base else {}, overlay, name, ttc)
+            if base is None:
+                validator.validate_attack_step(attack_step)
+            overlay._attack_steps[name] = attack_step
+        for name, probability in probabilities.items():
+            base_defense = obj._defenses.get(name)
+            defense = Defense(
+                base_defense.meta if base_defense else {}, overlay, name, probability
+            )
+            if base_defense is None:
+                validator.validate_defense(defense)
+            overlay._defenses[name] = defense
+        return overlay
+
+    def _sections(self, scenario: Scenario) -> dict[int, Any]:
+        probabilities: collections.defaultdict[
+            int, dict[str, Optional[float]]
+        ] = collections.defaultdict(dict)
+        ttcs: collections.defaultdict[
+            int, dict[str, Optional[TtcExpression]]
+        ] = collections.defaultdict(dict)
+        for (id, name), probability in scenario.probabilities.items():
+            probabilities[id][name] = probability
+        for (id, name), ttc in scenario.ttcs.items():
+            ttcs[id][name] = ttc
+
+        serializer = SERIALIZERS[self._format]
+        sections: dict[int, Any] = {}
+        for id in scenario.object_ids():
+            overlay = self._overlay(self._model.object(id), probabilities[id], ttcs[id])
+            sections[self._positions[id]] = serializer.serialize_object(
+                overlay, self._deterministic
+            )
+        return sections
+
+    def document(self, scenario: Scenario) -> dict[str, Any]:
+        """
+        Return the document of `scenario`.
+
+        The document shares all unchanged parts with the base document and must be
+        treated as read-only.
+        """
+        sections = self._sections(scenario)
+        objects = self._document["objects"]
+        if self._format == "es":
+            objects = dict(objects)
+            for position, section in sections.items():
+                objects[self._keys[position]] = section
+        else:
+            objects = list(objects)
+            for position, section in sections.items():
+                objects[position] = section
+        return {**self._document, "objects": objects}
+
+    def dumps(self, scenario: Scenario) -> str:
+        """Return the document of `scenario` encoded as JSON."""
+        encoded = self._encoded
+        sections = self._sections(scenario)
+        if sections:
+            encoded = list(encoded)
+            for position, section in sections.items():
+                if self._format == "es":
+                    key = json.dumps(self._keys[position])
+                    encoded[position] = f"{key}: {json.dumps(section)}"
+                else:
+                    encoded[position] = json.dumps(section)
+        brackets = "{}" if self._format == "es" else "[]"
+        return f"{self._head}{brackets[0]}{', '.join(encoded)}{brackets[1]}{self._tail}"
+
+    def documents(self, scenarios: Iterable[Scenario]) -> Iterator[dict[str, Any]]:
+        for scenario in scenarios:
+            yield self.document(scenario)
+
+    def stream(
+        self,
+        scenarios: Iterable[Scenario],
+        *,
+        max_workers: Optional[int] = None,
+        chunksize: int = 16,
+    ) -> Iterator[str]:
+        """
+        Yield the JSON encoded documents of `scenarios` in order.
+
+        If `max_workers` is given, the documents are encoded in a pool of that many
+        processes. Every worker receives a copy of the base model once.
+        """
+        if max_workers is None:
+            for scenario in scenarios:
+                yield self.dumps(scenario)
+            return
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers, initializer=_init_worker, initargs=(self,)
+        ) as executor:
+            yield from executor.map(_dumps, scenarios, chunksize=chunksize)
+
+
+_worker_scenarios: Optional[Scenarios] = None
+
+
+def _init_worker(scenarios: Scenarios) -> None:
+    global _worker_scenarios
+    _worker_scenarios = scenarios
+
+
+def _dumps(scenario: Scenario) -> str:
+    assert _worker_scenarios is not None
+    return _worker_scenarios.dumps(scenario)
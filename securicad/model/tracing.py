@@ -0,0 +1,217 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Optional spans and counters around the hot paths of the SDK.
+
+Nothing is traced until `configure` is given a tracer or a meter, for the whole
+process, or `scope` is, for the current thread or asyncio task. The methods that run
+for every object and association, those of the validators and
+`Model._create_association`, are only wrapped while a tracer is in use, so they cost
+nothing otherwise. Tracers and meters follow the OpenTelemetry API, so
+`opentelemetry.trace.get_tracer(...)` and `opentelemetry.metrics.get_meter(...)` can
+be used directly, and `Recorder` sums the spans and counters in this process.
+
+    recorder = tracing.Recorder()
+    with tracing.scope(tracer=recorder, meter=recorder):
+        model = json_serializer.deserialize_model(data, lang=lang)
+    print(recorder.seconds, recorder.counters)
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+from typing import Any, Callable, ContextManager, Iterator, Optional, Protocol
+
+
+class Tracer(Protocol):
+    def start_as_current_span(self, name: str) -> ContextManager[Any]:
+        ...
+
+
+class Counter(Protocol):
+    def add(self, amount: int) -> None:
+        ...
+
+
+class Meter(Protocol):
+    def create_counter(self, name: str) -> Counter:
+        ...
+
+
+class _Config:
+    def __init__(self, tracer: Optional[Tracer], meter: Optional[Meter]) -> None:
+        self.tracer = tracer
+        self.meter = meter
+        self.counters: dict[str, Counter] = {}
+
+
+# Set by configure(), used where no scope() is active
+_default = _Config(None, None)
+_scoped: contextvars.ContextVar[Optional[_Config]] = contextvars.ContextVar(
+    "securicad_model_tracing", default=None
+)
+# Guards the wrapping of methods, and the number of scopes with a tracer
+_lock = threading.Lock()
+_scopes = 0
+# (class, method name) -> the method before it was wrapped
+_wrapped: dict[tuple[type, str], Callable[..., Any]] = {}
+_NO_SPAN = contextlib.nullcontext()
+
+
+def _current() -> _Config:
+    return _scoped.get() or _default
+
+
+def span(name: str) -> ContextManager[Any]:
+    """Return a span named `name` of the current tracer, if there is one."""
+    tracer = _current().tracer
+    if tracer is None:
+        return _NO_SPAN
+    return tracer.start_as_current_span(name)
+
+
+def add(name: str, amount: int = 1) -> None:
+    """Add `amount` to the counter `name` of the current meter, if there is one."""
+    config = _current()
+    if config.meter is None:
+        return
+    counter = config.counters.get(name)
+    if counter is None:
+        counter = config.counters[name] = config.meter.create_counter(name)
+    counter.add(amount)
+
+
+def configure(
+    *, tracer: Optional[Tracer] = None, meter: Optional[Meter] = None
+) -> None:
+    """
+    Send spans to `tracer` and counters to `meter` outside of `scope` blocks, disable
+    tracing without them.
+    """
+    global _default
+    with _lock:
+        _default = _Config(tracer, meter)
+        _update_wrapping()
+
+
+@contextlib.contextmanager
+def scope(
+    *, tracer: Optional[Tracer] = None, meter: Optional[Meter] = None
+) -> Iterator[None]:
+    """
+    Send the spans and counters of the current thread or asyncio task to `tracer` and
+    `meter` within the block, instead of those of `configure`. Threads started within
+    the block are not included.
+    """
+    global _scopes
+    token = _scoped.set(_Config(tracer, meter))
+    if tracer is not None:
+        with _lock:
+            _scopes += 1
+            _update_wrapping()
+    try:
+        yield
+    finally:
+        _scoped.reset(token)
+        if tracer is not None:
+            with _lock:
+                _scopes -= 1
+                _update_wrapping()
+
+
+def _update_wrapping() -> None:
+    """Wrap the traced methods while a tracer is in use, must hold `_lock`."""
+    if _default.tracer is None and _scopes == 0:
+        for (cls, name), method in _wrapped.items():
+            setattr(cls, name, method)
+        _wrapped.clear()
+    elif not _wrapped:
+        for cls, name, span_name in traced_methods():
+            _wrapped[(cls, name)] = vars(cls)[name]
+            setattr(cls, name, _traced(vars(cls)[name], span_name))
+
+
+def traced_methods() -> list[tuple[type, str, str]]:
+    """Return (class, method name, span name) of the methods that are wrapped."""
+    from .model import Model
+    from .securilang_validator import SecurilangValidator
+    from .validator import Validator
+
+    methods: list[tuple[type, str, str]] = [
+        (Model, "_create_association", "model.create_association")
+    ]
+    validators: list[tuple[type, str]] = [
+        (Validator, "validator"),
+        (SecurilangValidator, "securilang_validator"),
+    ]
+    for cls, prefix in validators:
+        methods.extend(
+            (cls, name, f"{prefix}.{name}")
+            for name, value in vars(cls).items()
+            if name.startswith("validate") and callable(value)
+        )
+    return methods
+
+
+def _traced(method: Callable[..., Any], name: str) -> Callable[..., Any]:
+    @functools.wraps(method)
+    def traced(*args: Any, **kwargs: Any) -> Any:
+        with span(name):
+            return method(*args, **kwargs)
+
+    return traced
+
+
+class RecordedCounter:
+    def __init__(self, recorder: Recorder, name: str) -> None:
+        self.recorder = recorder
+        self.name = name
+
+    def add(self, amount: int, *args: Any, **kwargs: Any) -> None:
+        self.recorder.counters[self.name] = (
+            self.recorder.counters.get(self.name, 0) + amount
+        )
+
+
+class Recorder:
+    """
+    A tracer and meter that sums the calls and seconds of spans, and the counters, by
+    name. The seconds of a span include the spans within it.
+    """
+
+    def __init__(self) -> None:
+        self.calls: dict[str, int] = {}
+        self.seconds: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+
+    @contextlib.contextmanager
+    def start_as_current_span(
+        self, name: str, *args: Any, **kwargs: Any
+    ) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self.seconds[name] = (
+                self.seconds.get(name, 0.0) + time.perf_counter() - start
+            )
+
+    def create_counter(self, name: str, *args: Any, **kwargs: Any) -> RecordedCounter:
+        return RecordedCounter(self, name)
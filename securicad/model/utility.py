@@ -13,14 +13,19 @@
 # limitations under the License.
 from __future__ import annotations
 
-from functools import lru_cache
-from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional, TypeVar
+import copy
+import json
+from os import PathLike
+from typing import IO, TYPE_CHECKING, Any, Callable, Iterable, Optional, TypeVar
 
 from .exceptions import InvalidLangException
 
 if TYPE_CHECKING:  # pragma: no cover
     from securicad.langspec import AttackStepType, Lang
 
+    from .association import Association
+    from .object import Object
+
 T = TypeVar("T")
 
 
@@ -30,6 +35,21 @@ def named_id_type(type_: type[T], subject: int | T) -> str:
     return str(subject)
 
 
+def read_json(file: str | PathLike[Any] | IO[Any]) -> Any:
+    if isinstance(file, (str, PathLike)):
+        with open(file, "rb") as f:
+            return json.load(f)
+    return json.load(file)
+
+
+def write_json(data: Any, file: str | PathLike[Any] | IO[str]) -> None:
+    if isinstance(file, (str, PathLike)):
+        with open(file, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    else:
+        json.dump(data, file)
+
+
 def id_pad(value: int) -> int:
     if value < 10**9:
         value += 10**9
@@ -53,27 +73,86 @@ def iterable_filter(iterable: Iterable[T], **kwargs: Any) -> list[T]:
     ]
 
 
+def association_key(
+    source_id: int, source_field: str, target_id: int, target_field: str
+) -> tuple[int, str, int, str]:
+    """Key an association independent of which side is the source."""
+    return min(
+        (source_id, source_field, target_id, target_field),
+        (target_id, target_field, source_id, source_field),
+    )
+
+
+def by_id(items: Iterable[T], deterministic: bool) -> Iterable[T]:
+    """Sort items by their integer `id` in deterministic mode."""
+    return sorted(items, key=lambda item: item.id) if deterministic else items  # type: ignore
+
+
+def by_name(items: Iterable[T], deterministic: bool) -> Iterable[T]:
+    """Sort items by their `name` in deterministic mode."""
+    return sorted(items, key=lambda item: item.name) if deterministic else items  # type: ignore
+
+
+def association_ends(
+    association: Association, deterministic: bool
+) -> tuple[Object, str, Object, str]:
+    """
+    Return (source, source field, target, target field) of an association, in the
+    direction of `association_key` in deterministic mode. Attackers are always the
+    source of their connections.
+    """
+    source, source_field = association.source_object, association.source_field
+    target, target_field = association.target_object, association.target_field
+    if (
+        deterministic
+        and source.asset_type != "Attacker"
+        and (target.id, target_field) < (source.id, source_field)
+    ):
+        return target, target_field, source, source_field
+    return source, source_field, target, target_field
+
+
+def association_order(association: Association) -> tuple[int, str, int, str]:
+    return association_key(
+        association.source_object.id,
+        association.source_field,
+        association.target_object.id,
+        association.target_field,
+    )
+
+
+def by_association(
+    associations: Iterable[Association], deterministic: bool
+) -> Iterable[Association]:
+    """Sort associations by `association_key` in deterministic mode."""
+    return (
+        sorted(associations, key=association_order) if deterministic else associations
+    )
+
+
+def copy_meta(meta: dict[str, Any]) -> dict[str, Any]:
+    return copy.deepcopy(meta) if meta else {}
+
+
 def uc_first(value: str) -> str:
     return value[0].upper() + value[1:]
 
 
-@lru_cache
 def attack_step_lookup(
     asset_type: str,
     lang: Optional[Lang],
     lowercase_attack_step: bool,
-    types_: tuple[AttackStepType],
+    types_: tuple[AttackStepType, ...],
 ) -> Callable[[str], str]:
     if lang and asset_type != "Attacker":
-        attack_steps = {
-            name.lower(): name
-            for name, attack_step in lang.assets[asset_type].attack_steps.items()
-            if attack_step.type in types_
-        }
+        attack_steps = lang.step_names(asset_type, types_)
+    else:
+        attack_steps = {}
 
     def lookup(attack_step: str):
-        if lang and attack_step.lower() in attack_steps:
-            return attack_steps[attack_step.lower()]
+        name = attack_steps.get(attack_step.lower())
+        if name is not None:
+            return name
         if lowercase_attack_step:
             return attack_step[0].lower() + attack_step[1:]
         return attack_step
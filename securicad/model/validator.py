@@ -106,11 +106,7 @@ class Validator:
             raise InvalidAssociationException(association)
 
     def validate_attackers(self) -> list[str]:
-        if not any(
-            connections
-            for attacker in self.model._attackers.values()
-            for connections in attacker._first_steps.values()
-        ):
+        if not self.model._connection_count:
             return ["At least 1 attacker must be connected to the model."]
         return []
 
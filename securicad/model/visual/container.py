@@ -14,7 +14,7 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Optional
+from typing import TYPE_CHECKING, Any, Iterable, Optional, Tuple, Union
 
 from .. import utility
 from ..base import Base
@@ -33,13 +33,16 @@ if TYPE_CHECKING:  # pragma: no cover
     from .view import View
     from .viewitem import ViewItem
 
+# (name, icon, x, y) or (name, icon, x, y, id)
+GroupSpec = Union[Tuple[str, str, float, float], Tuple[str, str, float, float, int]]
+
 
 class Container(Base):
     def __init__(self, meta: dict[str, Any], name: str, id: int) -> None:
         super().__init__(meta)
         self._objects: dict[int, ViewObject] = {}
         self._groups: dict[int, Group] = {}
-        self.name = name
+        self._name = name
         self._id = id
 
     def __str__(self) -> str:
@@ -49,19 +52,83 @@ class Container(Base):
     def id(self) -> int:
         return self._id
 
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, value: str) -> None:
+        old_value = self._name
+        self._name = value
+        model = self._view._model
+        model._fingerprint.invalidate_view_item(self)
+        if model._journal.recording:
+            model._journal.record(
+                lambda: setattr(self, "name", old_value),
+                lambda: setattr(self, "name", value),
+            )
+
+    def fingerprint(self) -> str:
+        """Return a hash of the container's content, see `Model.fingerprint()`."""
+        return self._view._model._fingerprint.container(self)
+
     def _add_group(self, group: Group) -> Group:
-        self._groups[group.id] = group
-        return group
+        return self._add_groups([group])[0]
+
+    def _add_groups(self, groups: list[Group]) -> list[Group]:
+        fingerprint = self._view._model._fingerprint
+        for group in groups:
+            self._groups[group.id] = group
+            group._parent = self
+            self._view._index(group)
+            fingerprint.invalidate_view_item(group)
+        journal = self._view._model._journal
+        if journal.recording:
+            journal.record(
+                lambda: self._remove_groups(groups), lambda: self._add_groups(groups)
+            )
+        return groups
+
+    def _remove_group(self, group: Group) -> None:
+        self._remove_groups([group])
+
+    def _remove_groups(self, groups: list[Group]) -> None:
+        fingerprint = self._view._model._fingerprint
+        for group in groups:
+            del self._groups[group.id]
+            self._view._unindex(group)
+            fingerprint.invalidate_view_item(group)
+        journal = self._view._model._journal
+        if journal.recording:
+            journal.record(
+                lambda: self._add_groups(groups), lambda: self._remove_groups(groups)
+            )
+
+    def _contains(self, item: ViewItem) -> bool:
+        """Whether `item` is in this container or in any of its groups."""
+        view = self._view
+        if self is view:
+            return True
+        container = item._parent
+        while container is not self:
+            if container is view:
+                return False
+            container = container._parent  # type: ignore
+        return True
+
+    def _find_object(self, id: int) -> Optional[ViewObject]:
+        obj = self._view._object_index.get(id)
+        return obj if obj is not None and self._contains(obj) else None
+
+    def _find_group(self, id: int) -> Optional[Group]:
+        group = self._view._group_index.get(id)
+        return group if group is not None and self._contains(group) else None
 
     def object(self, obj: Object) -> ViewObject:
-        if obj.id in self._objects:
-            return self._objects[obj.id]
-        for group in self._groups.values():
-            try:
-                return group.object(obj)
-            except MissingViewObjectException:
-                pass
-        raise MissingViewObjectException(self._view, obj)
+        view_object = self._find_object(obj.id)
+        if view_object is None:
+            raise MissingViewObjectException(self._view, obj)
+        return view_object
 
     def objects(self, *, name: Optional[str] = None) -> list[ViewObject]:
         objects = utility.iterable_filter(
@@ -72,14 +139,10 @@ class Container(Base):
         return objects
 
     def group(self, id: int) -> Group:
-        if id in self._groups:
-            return self._groups[id]
-        for group in self._groups.values():
-            try:
-                return group.group(id)
-            except MissingGroupException:
-                pass
-        raise MissingGroupException(self._view, id)
+        group = self._find_group(id)
+        if group is None:
+            raise MissingGroupException(self._view, id)
+        return group
 
     def groups(self, *, name: Optional[str] = None) -> list[Group]:
         groups = utility.iterable_filter(self._groups.values(), name=name)
@@ -88,35 +151,87 @@ class Container(Base):
         return groups
 
     def has_object(self, obj: Object) -> bool:
-        return obj.id in self._objects or any(
-            group.has_object(obj) for group in self._groups.values()
-        )
+        return self._find_object(obj.id) is not None
 
     def _delete_object(self, obj: Object) -> bool:
-        if obj.id in self._objects:
-            del self._objects[obj.id]
-            return True
-        else:
-            return any(group._delete_object(obj) for group in self._groups.values())
+        view_object = self._find_object(obj.id)
+        if view_object is None:
+            return False
+        view_object._parent._remove_object(view_object)
+        return True
 
     def _delete_group(self, id: int) -> bool:
-        if id in self._groups:
-            del self._groups[id]
-            self._view._model._update_counter(id)
-            return True
-        else:
-            return any(group._delete_group(id) for group in self._groups.values())
+        group = self._find_group(id)
+        if group is None:
+            return False
+        group._parent._remove_group(group)
+        self._view._model._update_counter(id)
+        return True
 
     def _add_object(self, obj: ViewObject) -> ViewObject:
         self._view._model.object(obj.id)
-        self._objects[obj.id] = obj
-        return obj
+        return self._add_objects([obj])[0]
+
+    def _add_objects(self, objs: list[ViewObject]) -> list[ViewObject]:
+        view = self._view
+        for obj in objs:
+            self._objects[obj.id] = obj
+            obj._parent = self
+            view._object_index[obj.id] = obj
+            if view._spatial is not None:
+                view._spatial.insert(obj)
+            view._model._fingerprint.invalidate_view_item(obj)
+        journal = view._model._journal
+        if journal.recording:
+            journal.record(
+                lambda: self._remove_objects(objs), lambda: self._add_objects(objs)
+            )
+        return objs
+
+    def _remove_object(self, obj: ViewObject) -> None:
+        self._remove_objects([obj])
+
+    def _remove_objects(self, objs: list[ViewObject]) -> None:
+        view = self._view
+        for obj in objs:
+            del self._objects[obj.id]
+            del view._object_index[obj.id]
+            if view._spatial is not None:
+                view._spatial.remove(obj)
+            view._model._fingerprint.invalidate_view_item(obj)
+        journal = view._model._journal
+        if journal.recording:
+            journal.record(
+                lambda: self._add_objects(objs), lambda: self._remove_objects(objs)
+            )
 
     def add_object(self, obj: Object, x: float = 0, y: float = 0) -> ViewObject:
         if self._view.has_object(obj):
             raise DuplicateViewObjectException(self._view, obj)
         return self._add_object(ViewObject({}, x, y, self, obj.id))
 
+    def add_objects(
+        self, objects: Iterable[tuple[Object, float, float]]
+    ) -> list[ViewObject]:
+        """
+        Add objects at the given `(object, x, y)` positions. Every object is validated
+        before any is added, so either all or none of them are added.
+        """
+        view = self._view
+        model = view._model
+        items = list(objects)
+        if not items:
+            return []
+        seen: set[int] = set()
+        for obj, _, _ in items:
+            model.object(obj.id)
+            if obj.id in seen or obj.id in view._object_index:
+                raise DuplicateViewObjectException(view, obj)
+            seen.add(obj.id)
+        return self._add_objects(
+            [ViewObject({}, x, y, self, obj.id) for obj, x, y in items]
+        )
+
     def create_group(
         self,
         name: str,
@@ -129,12 +244,61 @@ class Container(Base):
         from .group import Group
 
         id = self._view._model._get_id(id)
-        if id in self._groups:
-            raise DuplicateGroupException(self._view, self.group(id))
+        # Group IDs are unique within the whole view, not just this container
+        if id in self._view._group_index:
+            raise DuplicateGroupException(self._view, self._view._group_index[id])
         group = Group({}, id, x, y, self, name, icon)
         self._view._model._validator.validate_icon(icon)
         return self._add_group(group)
 
+    def create_groups(self, groups: Iterable[GroupSpec]) -> list[Group]:
+        """
+        Create groups from `(name, icon, x, y)` or `(name, icon, x, y, id)` tuples.
+        Groups without an ID get the lowest free IDs. Every group is validated before
+        any is added, so either all or none of them are created.
+        """
+        from .group import Group
+
+        specs = list(groups)
+        if not specs:
+            return []
+        model = self._view._model
+        free_ids = iter(model._get_ids(sum(len(spec) < 5 for spec in specs)))
+        created: list[Group] = []
+        seen: set[int] = set()
+        for spec in specs:
+            name, icon, x, y = spec[:4]
+            id = spec[4] if len(spec) > 4 else next(free_ids)
+            group = Group({}, id, x, y, self, name, icon)
+            if id in self._view._group_index or id in seen:
+                raise DuplicateGroupException(self._view, group)
+            seen.add(id)
+            created.append(group)
+        return self._add_groups(created)
+
+    def _clone_items(self, target: Container) -> None:
+        from .group import Group
+
+        for obj in self._objects.values():
+            clone_object = ViewObject(
+                utility.copy_meta(obj.meta), obj.x, obj.y, target, obj.id
+            )
+            target._objects[obj.id] = clone_object
+            target._view._object_index[obj.id] = clone_object
+        for group in self._groups.values():
+            clone = Group(
+                utility.copy_meta(group.meta),
+                group.id,
+                group.x,
+                group.y,
+                target,
+                group.name,
+                group.icon,
+            )
+            group._clone_items(clone)
+            target._groups[group.id] = clone
+            target._view._group_index[group.id] = clone
+
     @property
     def _view(self) -> View:  # pragma: no cover
         raise NotImplementedError()
@@ -33,8 +33,8 @@ class Group(ViewItem, Container):
     ) -> None:
         ViewItem.__init__(self, x, y, parent)
         Container.__init__(self, meta, name, id)
-        self._icon: str
-        self.icon = icon
+        self._view._model._validator.validate_icon(icon)
+        self._icon = icon
 
     @property
     def icon(self) -> str:
@@ -42,16 +42,24 @@ class Group(ViewItem, Container):
 
     @icon.setter
     def icon(self, value: str) -> None:
-        self._view._model._validator.validate_icon(value)
+        model = self._view._model
+        model._validator.validate_icon(value)
+        old_value = self._icon
         self._icon = value
+        model._fingerprint.invalidate_view_item(self)
+        if model._journal.recording:
+            model._journal.record(
+                lambda: setattr(self, "icon", old_value),
+                lambda: setattr(self, "icon", value),
+            )
 
     # inherited viewitem
 
     def move(self, target: Container) -> None:
         target._validate_can_move_here(obj=self)
-        del self._parent._groups[self.id]
-        target._groups[self.id] = self
-        self._parent = target
+        with self._view._model._journal.batch():
+            self._parent._remove_group(self)
+            target._add_group(self)
 
     # inherited viewitem, container
 
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+import random
 from abc import ABC, abstractmethod
+from collections import deque
 from dataclasses import dataclass
-from math import ceil, sqrt
-from typing import Any, Generator, Optional, TypedDict, Union
+from itertools import chain
+from math import ceil, floor, log2, sqrt
+from typing import Any, Generator, Iterator, Optional, Tuple, TypedDict, Union
 
+from securicad.model.attacker import Attacker
 from securicad.model.model import Model
 from securicad.model.object import Object
-from securicad.model.visual.container import Container
+from securicad.model.visual.container import Container, GroupSpec
 from securicad.model.visual.exceptions import (
     DuplicateLayoutObjectException,
     EmptyLayoutException,
@@ -20,6 +24,13 @@ GROUP_PADDING = 35
 ITEM_PADDING = 1.5 * OBJECT_RADIUS
 TREE_SPACING = 150
 
+# Force layout: largest distance an item moves in the first iteration, in ideal
+# edge lengths, the strength of the repulsion between distant items relative to close
+# items, and of the pull towards the center
+TEMPERATURE = 3
+FAR_FIELD = 0.05
+GRAVITY = 0.1
+
 ItemType = Union["Layout", Object]
 
 
@@ -55,6 +66,9 @@ class Layout(ABC):
         offset: Optional[dict[ItemType, OffsetMap]] = None,
         item_padding: float = ITEM_PADDING,
     ) -> None:
+        self._parent: Optional[Layout] = None
+        # Whether this layout or any nested layout changed since the last _layout()
+        self._dirty = True
         self.name = name
         self.icon = icon
         self.expand = expand
@@ -63,26 +77,52 @@ class Layout(ABC):
         self.color = color
         self.offset: dict[ItemType, OffsetMap] = {} if offset is None else dict(offset)
         self.item_padding = item_padding
-        self._parent: Optional[Layout] = None
         self._items: list[ItemType] = []
+        # IDs of the objects in this layout and all nested layouts
+        self._object_ids: set[int] = set()
         self._positions: dict[ItemType, Position] = {}
+        self._sizes: dict[ItemType, tuple[float, float]] = {}
         self._width: float = OBJECT_RADIUS * 2 if expand is False else 0
         self._height: float = OBJECT_RADIUS * 2 if expand is False else 0
 
     def __str__(self) -> str:
         return f"<{self.__class__.__name__} name='{self.name}'>"
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        """
+        Mark this layout and its parents to be laid out again by the next `build()`.
+
+        This is done automatically when items are added or attributes are assigned, but
+        must be called after changing `offset`, `stem` or `tags` in place.
+        """
+        layout: Optional[Layout] = self
+        while layout is not None and not layout._dirty:
+            layout._dirty = True
+            layout = layout._parent
+
     def add_item(self, item: ItemType) -> None:
         if isinstance(item, Layout):
-            for obj in item.objects():
-                if self.has_object(obj):
-                    raise DuplicateLayoutObjectException(self, obj)
+            if not self._object_ids.isdisjoint(item._object_ids):
+                obj = next(o for o in item.objects() if o.id in self._object_ids)
+                raise DuplicateLayoutObjectException(self, obj)
             item._parent = self
+            object_ids = item._object_ids
         else:
             assert isinstance(item, Object)
             if self.has_object(item):
                 raise DuplicateLayoutObjectException(self, item)
+            object_ids = {item.id}
         self._items.append(item)
+        layout: Optional[Layout] = self
+        while layout is not None:
+            layout._object_ids |= object_ids
+            layout = layout._parent
+        self.invalidate()
 
     def objects(self) -> Generator[Object, None, None]:
         for item in self._items:
@@ -93,46 +133,58 @@ class Layout(ABC):
                 yield item
 
     def has_object(self, obj: Object) -> bool:
-        for item in self._items:
-            if isinstance(item, Layout):
-                if item.has_object(obj):
-                    return True
-            else:
-                assert isinstance(item, Object)
-                if item.id == obj.id:
-                    return True
-        return False
+        return obj.id in self._object_ids
 
     def build(self, model: Model) -> View:
         if self.icon is not None:
             raise ValueError("Views cannot have icons")
         if self._parent is not None:
             raise ValueError("Only top-level layouts can be built into views")
-        self._layout()
+        self._update_layout()
         view = model.create_view(self.name)
         self._build_items(view)
         return view
 
     def _build_items(self, container: Container) -> None:
+        objects: list[tuple[Object, float, float]] = []
+        layouts: list[Layout] = []
+        groups: list[GroupSpec] = []
         for item, position in self._positions.items():
             if isinstance(item, Layout):
                 if item.icon is None:
                     raise ValueError("Groups must have icons")
-                group = container.create_group(
-                    item.name, item.icon, position.x, position.y
-                )
-                if item.expand is not None:
-                    group.meta["expand"] = item.expand
-                if item.tags is not None:
-                    group.meta["tags"] = item.tags
-                if item.description is not None:
-                    group.meta["description"] = item.description
-                if item.color is not None:
-                    group.meta["color"] = item.color
-                item._build_items(group)
+                layouts.append(item)
+                groups.append((item.name, item.icon, position.x, position.y))
             else:
                 assert isinstance(item, Object)
-                container.add_object(item, position.x, position.y)
+                objects.append((item, position.x, position.y))
+        container.add_objects(objects)
+        for item, group in zip(layouts, container.create_groups(groups)):
+            if item.expand is not None:
+                group.meta["expand"] = item.expand
+            if item.tags is not None:
+                group.meta["tags"] = item.tags
+            if item.description is not None:
+                group.meta["description"] = item.description
+            if item.color is not None:
+                group.meta["color"] = item.color
+            item._build_items(group)
+
+    def _changed(self) -> bool:
+        """Whether this layout or any nested layout changed since the last _layout()."""
+        return self._dirty or any(
+            isinstance(item, Layout) and item._changed() for item in self._items
+        )
+
+    def _update_layout(self) -> None:
+        """Lay out this layout if it or any nested layout changed since the last time."""
+        if not self._changed():
+            return
+        self._positions = {}
+        self._width = OBJECT_RADIUS * 2 if self.expand is False else 0
+        self._height = OBJECT_RADIUS * 2 if self.expand is False else 0
+        self._layout()
+        self._dirty = False
 
     @abstractmethod
     def _layout(self) -> None:
@@ -140,7 +192,8 @@ class Layout(ABC):
             raise EmptyLayoutException(self)
         for item in self._items:
             if isinstance(item, Layout):
-                item._layout()
+                item._update_layout()
+        self._sizes = {item: item_size(item) for item in self._items}
 
     def _update_width(self, content_width: float) -> None:
         if self.expand is False:
@@ -187,12 +240,12 @@ class HorizontalLayout(Layout):
         super()._layout()
         content_height: float = 0
         for item in self._items:
-            _, item_height = item_size(item)
+            _, item_height = self._sizes[item]
             if item_height > content_height:
                 content_height = item_height
         x: float = 0
         for item in self._items:
-            item_width, item_height = item_size(item)
+            item_width, item_height = self._sizes[item]
             y = (content_height - item_height) / 2 if self.align_middle else 0
             self._position_item(item, x=x, y=y)
             self._update_width(x + item_width)
@@ -222,12 +275,12 @@ class VerticalLayout(Layout):
         super()._layout()
         content_width: float = 0
         for item in self._items:
-            item_width, _ = item_size(item)
+            item_width, _ = self._sizes[item]
             if item_width > content_width:
                 content_width = item_width
         y: float = 0
         for item in self._items:
-            item_width, item_height = item_size(item)
+            item_width, item_height = self._sizes[item]
             x = (content_width - item_width) / 2 if self.align_center else 0
             self._position_item(item, x=x, y=y)
             self._update_height(y + item_height)
@@ -272,7 +325,7 @@ class GridLayout(Layout):
                 item = item_matrix[row][col]
                 if item is None:
                     break
-                item_width, item_height = item_size(item)
+                item_width, item_height = self._sizes[item]
                 x_offset = (col_width[col] - item_width) / 2 if self.align_center else 0
                 y_offset = (
                     (row_height[row] - item_height) / 2 if self.align_middle else 0
@@ -307,7 +360,7 @@ class GridLayout(Layout):
                 item = item_matrix[row][col]
                 if item is None:
                     break
-                item_width, item_height = item_size(item)
+                item_width, item_height = self._sizes[item]
                 if item_width > col_width[col]:
                     col_width[col] = item_width
                 if item_height > row_height[row]:
@@ -347,7 +400,7 @@ class TreeLayout(Layout):
         crown_width: float = 0
         crown_height: float = 0
         for item in self._items:
-            item_width, item_height = item_size(item)
+            item_width, item_height = self._sizes[item]
             if item in self.stem:
                 stem.append(item)
                 if item_width > stem_width:
@@ -371,13 +424,377 @@ class TreeLayout(Layout):
 
         y: float = 0
         for item in stem:
-            item_width, item_height = item_size(item)
+            item_width, item_height = self._sizes[item]
             self._position_item(item, x=(content_width - item_width) / 2, y=y)
             y += item_height + self.item_padding
 
         x: float = (content_width - crown_width) / 2
         for item in crown:
-            item_width, item_height = item_size(item)
+            item_width, item_height = self._sizes[item]
             y_offset = (crown_height - item_height) / 2 if self.align_middle else 0
             self._position_item(item, x=x, y=stem_height + self.tree_spacing + y_offset)
             x += item_width + self.item_padding
+
+
+class ForceLayout(Layout):
+    """
+    Places items by simulating the associations between them as springs.
+
+    Items repel each other and are pulled together by the associations and attacker
+    connections of the objects in them. Nested layouts are laid out first and then
+    act as single items, so group containment is kept. Repulsion between close items
+    is computed with a grid and between distant items with the centroids of a coarse
+    grid, which keeps an iteration close to linear in the number of items. The
+    result only depends on the items, their associations and `seed`, and `build()`
+    lays it out again when associations of the model change.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        icon: Optional[str] = None,
+        expand: Optional[bool] = None,
+        tags: Optional[dict[str, Any]] = None,
+        description: Optional[str] = None,
+        color: Optional[str] = None,
+        offset: Optional[dict[ItemType, OffsetMap]] = None,
+        item_padding: float = ITEM_PADDING,
+        iterations: int = 50,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(
+            name, icon, expand, tags, description, color, offset, item_padding
+        )
+        if iterations < 0:
+            raise ValueError("'iterations' must not be negative")
+        self.iterations = iterations
+        self.seed = seed
+        # The association revision of the model at the last _layout(), associations
+        # can change without the layout being told
+        self._laid_out_revision: Optional[int] = None
+
+    def _association_revision(self) -> Optional[int]:
+        obj = next(self.objects(), None)
+        return None if obj is None else obj._model._association_revision
+
+    def _changed(self) -> bool:
+        return (
+            super()._changed()
+            or self._association_revision() != self._laid_out_revision
+        )
+
+    def _edges(self) -> dict[tuple[int, int], int]:
+        """Return the number of connections between each pair of items, by index."""
+        index: dict[int, int] = {}
+        members: list[list[Object]] = []
+        for i, item in enumerate(self._items):
+            objects = list(item.objects()) if isinstance(item, Layout) else [item]
+            members.append(objects)
+            for obj in objects:
+                index[obj.id] = i
+        edges: dict[tuple[int, int], int] = {}
+        for i, objects in enumerate(members):
+            for obj in objects:
+                for neighbour in _neighbours(obj):
+                    j = index.get(neighbour, i)
+                    if j > i:
+                        edges[(i, j)] = edges.get((i, j), 0) + 1
+        return edges
+
+    def _layout(self) -> None:
+        super()._layout()
+        sizes = [self._sizes[item] for item in self._items]
+        self._laid_out_revision = self._association_revision()
+        xs, ys = _force_directed(
+            sizes, self._edges(), self.item_padding, self.iterations, self.seed
+        )
+        min_x = min(x - w / 2 for x, (w, _) in zip(xs, sizes))
+        min_y = min(y - h / 2 for y, (_, h) in zip(ys, sizes))
+        max_x = max(x + w / 2 for x, (w, _) in zip(xs, sizes))
+        max_y = max(y + h / 2 for y, (_, h) in zip(ys, sizes))
+        for item, (w, h), x, y in zip(self._items, sizes, xs, ys):
+            self._position_item(item, x=x - w / 2 - min_x, y=y - h / 2 - min_y)
+        self._update_width(max_x - min_x)
+        self._update_height(max_y - min_y)
+
+
+def _neighbours(obj: Object) -> Generator[int, None, None]:
+    for field in obj._associations.values():
+        yield from field._targets
+    for attacker in obj._attackers:
+        yield attacker.id
+    if isinstance(obj, Attacker):
+        for target in obj._first_steps:
+            yield target.id
+
+
+Cell = Tuple[int, int]
+# A cell and the neighbours after it, so every pair of adjacent cells is visited once
+FORWARD_CELLS = ((1, -1), (1, 0), (1, 1), (0, 1))
+
+
+def _grid(
+    xs: list[float], ys: list[float], members: list[int], cell: float
+) -> dict[Cell, list[int]]:
+    cells: dict[Cell, list[int]] = {}
+    for i in members:
+        cells.setdefault((floor(xs[i] / cell), floor(ys[i] / cell)), []).append(i)
+    return cells
+
+
+def _close_pairs(
+    xs: list[float], ys: list[float], cells: dict[Cell, list[int]], cutoff: float
+) -> list[tuple[int, int, float, float, float]]:
+    """
+    Return (i, j, dx, dy, squared distance) for every pair of items closer than
+    `cutoff`, which must not be larger than the cell size of `cells`.
+    """
+    cutoff2 = cutoff * cutoff
+    pairs: list[tuple[int, int, float, float, float]] = []
+    append = pairs.append
+    for (cx, cy), members in cells.items():
+        candidates = list(members)
+        for ox, oy in FORWARD_CELLS:
+            other = cells.get((cx + ox, cy + oy))
+            if other:
+                candidates += other
+        for a, i in enumerate(members):
+            x = xs[i]
+            y = ys[i]
+            for j in candidates[a + 1 :]:
+                dx = x - xs[j]
+                dy = y - ys[j]
+                d2 = dx * dx + dy * dy
+                if d2 < cutoff2:
+                    append((i, j, dx, dy, d2))
+    return pairs
+
+
+def _large_pairs(
+    xs: list[float], ys: list[float], large: list[int], n: int
+) -> Iterator[tuple[int, int, float, float, float]]:
+    """Yield (i, j, dx, dy, squared distance) for every pair with a large item."""
+    is_large = set(large)
+    for i in large:
+        for j in range(n):
+            if j != i and (j not in is_large or j > i):
+                dx = xs[i] - xs[j]
+                dy = ys[i] - ys[j]
+                yield i, j, dx, dy, dx * dx + dy * dy
+
+
+def _hilbert(index: int, order: int) -> Cell:
+    """Return the cell at `index` along a Hilbert curve over 2^order x 2^order cells."""
+    x = y = 0
+    s = 1
+    while s < 1 << order:
+        rx = 1 & (index // 2)
+        ry = 1 & (index ^ rx)
+        if ry == 0:
+            if rx == 1:
+                x, y = s - 1 - x, s - 1 - y
+            x, y = y, x
+        x += s * rx
+        y += s * ry
+        index //= 4
+        s *= 2
+    return x, y
+
+
+def _initial_positions(
+    n: int, edges: dict[tuple[int, int], int], k: float, rng: random.Random
+) -> tuple[list[float], list[float]]:
+    """
+    Place the items along a Hilbert curve in breadth-first order, so that connected
+    items start close to each other, with some seeded jitter.
+    """
+    adjacent: list[list[int]] = [[] for _ in range(n)]
+    for i, j in edges:
+        adjacent[i].append(j)
+        adjacent[j].append(i)
+    roots = list(range(n))
+    rng.shuffle(roots)
+    order: list[int] = []
+    seen = [False] * n
+    for root in roots:
+        if seen[root]:
+            continue
+        seen[root] = True
+        queue = deque([root])
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+            for j in adjacent[i]:
+                if not seen[j]:
+                    seen[j] = True
+                    queue.append(j)
+    curve = max(1, ceil(log2(n) / 2))
+    xs = [0.0] * n
+    ys = [0.0] * n
+    for index, i in enumerate(order):
+        x, y = _hilbert(index, curve)
+        xs[i] = (x + rng.uniform(-0.25, 0.25)) * k
+        ys[i] = (y + rng.uniform(-0.25, 0.25)) * k
+    return xs, ys
+
+
+def _far_field(
+    xs: list[float], ys: list[float], dxs: list[float], dys: list[float], k2: float
+) -> None:
+    """
+    Add the repulsion between distant items, approximated by the repulsion between
+    the centroids of the cells of a coarse grid with about sqrt(n) cells.
+    """
+    n = len(xs)
+    columns = max(1, int(sqrt(sqrt(n))))
+    min_x = min(xs)
+    min_y = min(ys)
+    extent = max(max(xs) - min_x, max(ys) - min_y) or 1.0
+    size = extent / columns
+    # Slightly less than columns / extent, so that the largest coordinate is in range
+    scale = columns / extent * (1 - 1e-9)
+    keys: list[Cell] = []
+    # cell -> [item count, sum of x, sum of y]
+    cells: dict[Cell, list[float]] = {}
+    for x, y in zip(xs, ys):
+        key = (int((x - min_x) * scale), int((y - min_y) * scale))
+        keys.append(key)
+        cell = cells.get(key)
+        if cell is None:
+            cells[key] = [1.0, x, y]
+        else:
+            cell[0] += 1
+            cell[1] += x
+            cell[2] += y
+    centroids = [
+        (key, count, sum_x / count, sum_y / count)
+        for key, (count, sum_x, sum_y) in cells.items()
+    ]
+    forces = {key: [0.0, 0.0] for key in cells}
+    for a, (key_a, count_a, x_a, y_a) in enumerate(centroids):
+        force_a = forces[key_a]
+        for key_b, count_b, x_b, y_b in centroids[a + 1 :]:
+            dx = x_a - x_b
+            dy = y_a - y_b
+            # Centroids of adjacent cells can be arbitrarily close
+            force = k2 / max(dx * dx + dy * dy, size * size)
+            force_b = forces[key_b]
+            force_a[0] += dx * force * count_b
+            force_a[1] += dy * force * count_b
+            force_b[0] -= dx * force * count_a
+            force_b[1] -= dy * force * count_a
+    for i, key in enumerate(keys):
+        fx, fy = forces[key]
+        dxs[i] += fx
+        dys[i] += fy
+
+
+def _force_directed(
+    sizes: list[tuple[float, float]],
+    edges: dict[tuple[int, int], int],
+    padding: float,
+    iterations: int,
+    seed: int,
+) -> tuple[list[float], list[float]]:
+    """
+    Return the item centers after `iterations` steps of a force simulation.
+
+    This is Fruchterman-Reingold with linear springs, a weak pull towards the center
+    and grid approximated repulsion. Items larger than the ideal distance `k` between
+    two objects are compared with every other item, all other items only with items
+    within `k`. Repulsion between items further apart is approximated by `_far_field`.
+    """
+    n = len(sizes)
+    radii = [max(w, h) / 2 for w, h in sizes]
+    k = 2 * OBJECT_RADIUS + padding
+    xs, ys = _initial_positions(n, edges, k, random.Random(seed))
+    if n == 1:
+        return xs, ys
+    large = [i for i in range(n) if 2 * radii[i] > k]
+    small = [i for i in range(n) if 2 * radii[i] <= k]
+    k2 = k * k
+    temperature = TEMPERATURE * k
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        dxs = [0.0] * n
+        dys = [0.0] * n
+        for i, j, dx, dy, d2 in _close_pairs(xs, ys, _grid(xs, ys, small, k), k):
+            if d2 == 0:
+                # Separate items on top of each other in a fixed direction
+                dx, dy, d2 = 1.0, float(i - j), 1.0 + (i - j) ** 2
+            force = k2 / d2
+            dxs[i] += dx * force
+            dys[i] += dy * force
+            dxs[j] -= dx * force
+            dys[j] -= dy * force
+        _far_field(xs, ys, dxs, dys, FAR_FIELD * k2)
+        for i, j, dx, dy, d2 in _large_pairs(xs, ys, large, n):
+            ideal = radii[i] + radii[j] + padding
+            if d2 > 4 * ideal * ideal:
+                continue
+            if d2 == 0:
+                dx, dy, d2 = 1.0, float(i - j), 1.0 + (i - j) ** 2
+            force = ideal * ideal / d2
+            dxs[i] += dx * force
+            dys[i] += dy * force
+            dxs[j] -= dx * force
+            dys[j] -= dy * force
+        for (i, j), weight in edges.items():
+            dx = xs[i] - xs[j]
+            dy = ys[i] - ys[j]
+            dxs[i] -= dx * weight
+            dys[i] -= dy * weight
+            dxs[j] += dx * weight
+            dys[j] += dy * weight
+        center_x = sum(xs) / n
+        center_y = sum(ys) / n
+        for i in range(n):
+            dxs[i] -= GRAVITY * (xs[i] - center_x)
+            dys[i] -= GRAVITY * (ys[i] - center_y)
+            d = sqrt(dxs[i] * dxs[i] + dys[i] * dys[i])
+            if d > temperature:
+                xs[i] += dxs[i] * temperature / d
+                ys[i] += dys[i] * temperature / d
+            else:
+                xs[i] += dxs[i]
+                ys[i] += dys[i]
+        temperature -= cooling
+    _remove_overlaps(xs, ys, radii, padding, large, small, k)
+    return xs, ys
+
+
+def _remove_overlaps(
+    xs: list[float],
+    ys: list[float],
+    radii: list[float],
+    padding: float,
+    large: list[int],
+    small: list[int],
+    cell: float,
+    passes: int = 20,
+) -> None:
+    """Push apart overlapping items, until none overlap or `passes` is reached."""
+    n = len(xs)
+    cutoff = max((2 * radii[i] for i in small), default=0) + padding / 2
+    for _ in range(passes):
+        pairs = _close_pairs(xs, ys, _grid(xs, ys, small, cell), min(cutoff, cell))
+        moved = False
+        for i, j, _, _, _ in chain(pairs, _large_pairs(xs, ys, large, n)):
+            # Earlier pushes in this pass may have moved the items
+            dx = xs[i] - xs[j]
+            dy = ys[i] - ys[j]
+            d2 = dx * dx + dy * dy
+            ideal = radii[i] + radii[j] + padding / 2
+            if d2 >= ideal * ideal:
+                continue
+            if d2 == 0:
+                dx, dy, d2 = 1.0, float(i - j), 1.0 + (i - j) ** 2
+            d = sqrt(d2)
+            push = (ideal - d) / d / 2
+            xs[i] += dx * push
+            ys[i] += dy * push
+            xs[j] -= dx * push
+            ys[j] -= dy * push
+            moved = True
+        if not moved:
+            return
@@ -0,0 +1,164 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from math import floor, hypot
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .viewitem import ViewItem
+
+CELL_SIZE = 256.0
+
+Cell = Tuple[int, int]
+# (absolute x, absolute y, cell)
+Entry = Tuple[float, float, Cell]
+
+
+class SpatialIndex:
+    """
+    Uniform grid over the absolute positions of the items of a view.
+
+    Items are bucketed by the cell their position falls in, so rectangle queries only
+    visit the cells they overlap and nearest neighbour queries search outwards from the
+    cell of the query point.
+    """
+
+    def __init__(self, cell_size: float = CELL_SIZE) -> None:
+        if cell_size <= 0:
+            raise ValueError("'cell_size' must be positive")
+        self.cell_size = cell_size
+        self._cells: dict[Cell, dict[ViewItem, None]] = {}
+        self._entries: Dict[ViewItem, Entry] = {}
+        # Bounds of every cell ever occupied, only grows
+        self._bounds: Optional[tuple[int, int, int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _cell(self, x: float, y: float) -> Cell:
+        return floor(x / self.cell_size), floor(y / self.cell_size)
+
+    def insert(self, item: ViewItem) -> None:
+        x, y = item.absolute_position
+        cell = self._cell(x, y)
+        self._entries[item] = (x, y, cell)
+        self._cells.setdefault(cell, {})[item] = None
+        if self._bounds is None:
+            self._bounds = (cell[0], cell[1], cell[0], cell[1])
+        else:
+            x1, y1, x2, y2 = self._bounds
+            self._bounds = (
+                min(x1, cell[0]),
+                min(y1, cell[1]),
+                max(x2, cell[0]),
+                max(y2, cell[1]),
+            )
+
+    def remove(self, item: ViewItem) -> None:
+        _, _, cell = self._entries.pop(item)
+        items = self._cells[cell]
+        del items[item]
+        if not items:
+            del self._cells[cell]
+
+    def update(self, item: ViewItem) -> None:
+        """Reinsert `item`, and every item in it if it is a group."""
+        from .group import Group
+
+        if item in self._entries:
+            self.remove(item)
+        self.insert(item)
+        if isinstance(item, Group):
+            for obj in item._objects.values():
+                self.update(obj)
+            for group in item._groups.values():
+                self.update(group)
+
+    def query_rect(self, x1: float, y1: float, x2: float, y2: float) -> list[ViewItem]:
+        x1, x2 = min(x1, x2), max(x1, x2)
+        y1, y2 = min(y1, y2), max(y1, y2)
+        cx1, cy1 = self._cell(x1, y1)
+        cx2, cy2 = self._cell(x2, y2)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self._cells):
+            cells = [
+                items
+                for (cx, cy), items in self._cells.items()
+                if cx1 <= cx <= cx2 and cy1 <= cy <= cy2
+            ]
+        else:
+            cells = [
+                self._cells[(cx, cy)]
+                for cx in range(cx1, cx2 + 1)
+                for cy in range(cy1, cy2 + 1)
+                if (cx, cy) in self._cells
+            ]
+        entries = self._entries
+        result: list[ViewItem] = []
+        for items in cells:
+            for item in items:
+                x, y, _ = entries[item]
+                if x1 <= x <= x2 and y1 <= y <= y2:
+                    result.append(item)
+        return result
+
+    def nearest(
+        self, x: float, y: float, max_distance: Optional[float] = None
+    ) -> Optional[ViewItem]:
+        if self._bounds is None:
+            return None
+        cx, cy = self._cell(x, y)
+        bx1, by1, bx2, by2 = self._bounds
+        # Rings closer than the bounds are empty
+        min_ring = max(bx1 - cx, cx - bx2, by1 - cy, cy - by2, 0)
+        max_ring = max(cx - bx1, bx2 - cx, cy - by1, by2 - cy, 0)
+        best: Optional[ViewItem] = None
+        best_key: tuple[float, int] = (float("inf"), 0)
+        for ring in range(min_ring, max_ring + 1):
+            # Every item outside the rings searched so far is at least this far away
+            reach = (ring - 1) * self.cell_size
+            if best is not None and best_key[0] < reach:
+                break
+            if max_distance is not None and reach > max_distance:
+                break
+            for cell in _ring(cx, cy, ring, self._bounds):
+                for item in self._cells.get(cell, ()):
+                    ix, iy, _ = self._entries[item]
+                    key = (hypot(ix - x, iy - y), item.id)  # type: ignore
+                    if key < best_key:
+                        best, best_key = item, key
+        if best is not None and max_distance is not None:
+            if best_key[0] > max_distance:
+                return None
+        return best
+
+
+def _ring(cx: int, cy: int, ring: int, bounds: tuple[int, int, int, int]) -> list[Cell]:
+    """Return the cells of a ring around (cx, cy) that are within `bounds`."""
+    if ring == 0:
+        return [(cx, cy)]
+    bx1, by1, bx2, by2 = bounds
+    xs = range(max(cx - ring, bx1), min(cx + ring, bx2) + 1)
+    ys = range(max(cy - ring + 1, by1), min(cy + ring - 1, by2) + 1)
+    cells: list[Cell] = []
+    if by1 <= cy - ring <= by2:
+        cells += [(x, cy - ring) for x in xs]
+    if by1 <= cy + ring <= by2:
+        cells += [(x, cy + ring) for x in xs]
+    if bx1 <= cx - ring <= bx2:
+        cells += [(cx - ring, y) for y in ys]
+    if bx1 <= cx + ring <= bx2:
+        cells += [(cx + ring, y) for y in ys]
+    return cells
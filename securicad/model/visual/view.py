@@ -14,18 +14,89 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Optional
 
 from .container import Container
+from .spatial import CELL_SIZE, SpatialIndex
 
 if TYPE_CHECKING:  # pragma: no cover
     from ..model import Model
+    from .group import Group
+    from .viewitem import ViewItem
+    from .viewobject import ViewObject
 
 
 class View(Container):
     def __init__(self, meta: dict[str, Any], model: Model, name: str, id: int) -> None:
         super().__init__(meta, name, id)
         self._model = model
+        # Every object and group in the view, at any depth, by ID
+        self._object_index: dict[int, ViewObject] = {}
+        self._group_index: dict[int, Group] = {}
+        # Built on the first spatial query, then kept up to date
+        self._spatial: Optional[SpatialIndex] = None
+
+    def _index(self, group: Group) -> None:
+        self._group_index[group.id] = group
+        if self._spatial is not None:
+            self._spatial.insert(group)
+        for obj in group._objects.values():
+            self._object_index[obj.id] = obj
+            if self._spatial is not None:
+                self._spatial.insert(obj)
+        for sub_group in group._groups.values():
+            self._index(sub_group)
+
+    def _unindex(self, group: Group) -> None:
+        del self._group_index[group.id]
+        if self._spatial is not None:
+            self._spatial.remove(group)
+        for obj in group._objects.values():
+            del self._object_index[obj.id]
+            if self._spatial is not None:
+                self._spatial.remove(obj)
+        for sub_group in group._groups.values():
+            self._unindex(sub_group)
+
+    def spatial_index(self, cell_size: float = CELL_SIZE) -> SpatialIndex:
+        """
+        Return the spatial index of the view, building it on first use.
+
+        The index is updated incrementally as items are added, removed and moved. Pass a
+        different `cell_size` to rebuild it, a cell size close to the typical distance
+        between items works best.
+        """
+        if self._spatial is None or self._spatial.cell_size != cell_size:
+            spatial = SpatialIndex(cell_size)
+            for group in self._group_index.values():
+                spatial.insert(group)
+            for obj in self._object_index.values():
+                spatial.insert(obj)
+            self._spatial = spatial
+        return self._spatial
+
+    def query_rect(self, x1: float, y1: float, x2: float, y2: float) -> list[ViewItem]:
+        """
+        Return the objects and groups at any depth whose absolute position is inside
+        the rectangle with corners (`x1`, `y1`) and (`x2`, `y2`), edges included.
+        """
+        if self._spatial is None:
+            self.spatial_index()
+        assert self._spatial is not None
+        return self._spatial.query_rect(x1, y1, x2, y2)
+
+    def nearest(
+        self, x: float, y: float, *, max_distance: Optional[float] = None
+    ) -> Optional[ViewItem]:
+        """
+        Return the object or group at any depth whose absolute position is closest to
+        (`x`, `y`), or `None` if the view is empty or nothing is within `max_distance`.
+        Ties are broken by the lowest ID.
+        """
+        if self._spatial is None:
+            self.spatial_index()
+        assert self._spatial is not None
+        return self._spatial.nearest(x, y, max_distance)
 
     # inherited container
 
@@ -23,10 +23,51 @@ if TYPE_CHECKING:  # pragma: no cover
 
 class ViewItem:
     def __init__(self, x: float, y: float, parent: Container) -> None:
-        self.x = x
-        self.y = y
+        self._x = x
+        self._y = y
         self._parent = parent
 
+    @property
+    def x(self) -> float:
+        return self._x
+
+    @x.setter
+    def x(self, value: float) -> None:
+        self._set_position(value, self._y)
+
+    @property
+    def y(self) -> float:
+        return self._y
+
+    @y.setter
+    def y(self, value: float) -> None:
+        self._set_position(self._x, value)
+
+    def _set_position(self, x: float, y: float) -> None:
+        old_x, old_y = self._x, self._y
+        self._x = x
+        self._y = y
+        if self._view._spatial is not None:
+            self._view._spatial.update(self)
+        self._view._model._fingerprint.invalidate_view_item(self)
+        journal = self._view._model._journal
+        if journal.recording:
+            journal.record(
+                lambda: self._set_position(old_x, old_y),
+                lambda: self._set_position(x, y),
+            )
+
+    @property
+    def absolute_position(self) -> tuple[float, float]:
+        """The position in the view, including the positions of all parent groups."""
+        x, y = self._x, self._y
+        container = self._parent
+        while isinstance(container, ViewItem):
+            x += container._x
+            y += container._y
+            container = container._parent
+        return x, y
+
     @property
     def parent(self) -> Container:
         return self._parent
@@ -44,6 +44,6 @@ class ViewObject(ViewItem, Base):
 
     def move(self, target: Container) -> None:
         target._validate_can_move_here(obj=self)
-        del self._parent._objects[self.id]
-        target._objects[self.id] = self
-        self._parent = target
+        with self._view._model._journal.batch():
+            self._parent._remove_object(self)
+            target._add_object(self)
@@ -0,0 +1,385 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Streaming reader for `.sCAD` files.
+
+The XMI entries are read with `iterparse` and every top level element is discarded as
+soon as it has been turned into model objects. Attributes are decoded the same way as
+pyecore decodes them for `scad_serializer`, including the default value of every
+attribute that isn't in the file, so both readers create identical models.
+"""
+
+from __future__ import annotations
+
+import json
+from os import PathLike
+from typing import IO, TYPE_CHECKING, Any, Callable, Iterator, Optional
+from xml.etree.ElementTree import Element, iterparse
+from zipfile import ZipFile
+
+from securicad.langspec import AttackStepType, Lang, TtcDistribution, TtcFunction
+
+from . import json_serializer, utility
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .model import Model
+    from .object import Object
+    from .visual.container import Container
+
+XSI_TYPE = "{http://www.w3.org/2001/XMLSchema-instance}type"
+SECURILANG = "com.foreseeti.securilang"
+
+PARAMETERS_FROM_SCAD: dict[
+    TtcDistribution, Callable[[dict[str, float]], list[float]]
+] = {
+    TtcDistribution.EXPONENTIAL: lambda parameters: [1 / parameters["mean"]],
+    TtcDistribution.TRUNCATED_NORMAL: lambda parameters: [
+        parameters["mean"],
+        parameters["sd"],
+    ],
+    TtcDistribution.GAMMA: lambda parameters: [
+        parameters["shape"],
+        parameters["scale"],
+    ],
+    TtcDistribution.LOG_NORMAL: lambda parameters: [
+        parameters["scale"],
+        parameters["shape"],
+    ],
+    TtcDistribution.PARETO: lambda parameters: [
+        parameters["scale"],
+        parameters["shape"],
+    ],
+    TtcDistribution.BINOMIAL: lambda parameters: [
+        parameters["trials"],
+        parameters["p"],
+    ],
+    TtcDistribution.BERNOULLI: lambda parameters: [parameters["probability"]],
+    TtcDistribution.INFINITY: lambda parameters: [],
+}
+
+
+def local_name(name: str) -> str:
+    """Strip the namespace or prefix of a tag or `xsi:type` value."""
+    return name.rpartition("}")[2].rpartition(":")[2]
+
+
+def xsi_type(element: Element) -> Optional[str]:
+    value = element.get(XSI_TYPE)
+    return None if value is None else local_name(value)
+
+
+def iter_top_level(file: IO[bytes]) -> Iterator[Element]:
+    """
+    Yield the root element as soon as it starts, then every child of the root once it
+    has been parsed completely. Children are removed from the root after they have been
+    yielded.
+    """
+    depth = 0
+    root: Optional[Element] = None
+    for event, element in iterparse(file, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+                yield root
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            assert root is not None
+            yield element
+            del root[:]
+
+
+def children(element: Element, tag: str) -> Iterator[Element]:
+    return (child for child in element if local_name(child.tag) == tag)
+
+
+def child(element: Element, tag: str) -> Optional[Element]:
+    return next(children(element, tag), None)
+
+
+def read_float(element: Element, name: str) -> float:
+    value = element.get(name)
+    return 0.0 if value is None else float(value)
+
+
+def read_int(element: Element, name: str) -> int:
+    value = element.get(name)
+    return 0 if value is None else int(value)
+
+
+def read_bool(element: Element, name: str) -> bool:
+    return element.get(name) in {"True", "true"}
+
+
+def read_parameters(distribution: Element) -> dict[Optional[str], float]:
+    return {
+        parameter.get("name"): read_float(parameter, "value")
+        for parameter in children(distribution, "parameters")
+    }
+
+
+def read_probability(distribution: Element) -> float:
+    assert distribution.get("type") in {"Bernoulli", "FixedBoolean"}
+    parameters = list(children(distribution, "parameters"))
+    assert len(parameters) == 1  # only probability, or fixed
+    return read_float(parameters[0], "value")
+
+
+def read_description(element: Element, meta: dict[str, Any]) -> None:
+    if (description := element.get("description")) is not None:
+        meta["description"] = description
+
+
+def read_tags(element: Element, meta: dict[str, Any]) -> None:
+    tags = element.get("attributesJsonString")
+    if tags is not None and tags != "{}":
+        meta["tags"] = json.loads(tags)
+
+
+def read_object(
+    model: Model,
+    element: Element,
+    lowercase_attack_step: bool,
+    id_exported_id: dict[Optional[str], int],
+) -> None:
+    lang = model._lang
+    asset_type = element.get("metaConcept")
+    if lang and lang.defines["id"] == SECURILANG and asset_type == "Container":
+        return
+    exported_id = read_int(element, "exportedId")
+    id_exported_id[element.get("id")] = exported_id
+    obj: Object
+    if asset_type == "Attacker":
+        obj = model.create_attacker(element.get("name"), id=exported_id)  # type: ignore
+    else:
+        obj = model.create_object(
+            asset_type, element.get("name"), id=exported_id  # type: ignore
+        )
+    read_tags(element, obj.meta)
+    read_description(element, obj.meta)
+    for name in ["capex", "opex"]:
+        if (value := read_float(element, name)) != 0.0:
+            obj.meta[name] = value
+
+    if (existence := child(element, "existence")) is not None:
+        obj.meta["existence"] = read_probability(existence)
+
+    if asset_type == "Attacker":
+        return
+
+    attack_lookup: Callable[[str], str] = utility.attack_step_lookup(
+        asset_type,  # type: ignore
+        lang,
+        lowercase_attack_step,
+        (AttackStepType.AND, AttackStepType.OR),
+    )
+    defense_lookup: Callable[[str], str] = utility.attack_step_lookup(
+        asset_type,  # type: ignore
+        lang,
+        lowercase_attack_step,
+        (AttackStepType.DEFENSE,),
+    )
+    for attribute in children(element, "evidenceAttributes"):
+        name: str = attribute.get("metaConcept")  # type: ignore
+        if (distribution := child(attribute, "evidenceDistribution")) is not None:
+            defense = obj.defense(defense_lookup(name))
+            defense.probability = read_probability(distribution)
+            continue
+
+        if (distribution := child(attribute, "localTtcDistribution")) is not None:
+            attack_step = obj.attack_step(attack_lookup(name))
+            distribution_type = TtcDistribution(distribution.get("type"))
+            attack_step.ttc = TtcFunction(
+                distribution_type,
+                PARAMETERS_FROM_SCAD[distribution_type](
+                    read_parameters(distribution)  # type: ignore
+                ),
+            )
+
+        # the attribute can be without any distribution, e.g. when only setting consequence
+        meta: dict[str, Any] = {}
+        if (consequence := read_int(attribute, "consequence")) != 0:
+            meta["consequence"] = consequence
+        for cost in ["costLowerLimit", "costUpperLimit"]:
+            if (value := read_float(attribute, cost)) != 0.0:
+                meta[cost] = value
+        read_description(attribute, meta)
+        if meta:
+            obj.attack_step(attack_lookup(name)).meta.update(meta)
+
+
+def read_lang(file: str | PathLike[Any] | IO[bytes]) -> tuple[str, str]:
+    """Return the language ID and version of an sCAD file without reading the model."""
+    with ZipFile(file, "r") as zf:
+        names = [zi.filename for zi in zf.infolist() if not zi.is_dir()]
+        meta_file = next((name for name in names if name.endswith(".json")), None)
+        if meta_file is not None:
+            with zf.open(meta_file) as f:
+                meta = json.load(f)
+            return meta["langID"], meta["langVersion"]
+        eom_file = next(name for name in names if name.endswith(".eom"))
+        with zf.open(eom_file) as f:
+            root = next(iter_top_level(f))
+            return SECURILANG, root.get("xLang")  # type: ignore
+
+
+def read_model(
+    file: str | PathLike[Any] | IO[bytes],
+    *,
+    lang: Optional[Lang] = None,
+    lowercase_attack_step: bool = True,
+    validate_icons: bool = True,
+) -> Model:
+    from .model import Model
+
+    with ZipFile(file, "r") as zf:
+        names = [zi.filename for zi in zf.infolist() if not zi.is_dir()]
+        eom_file = next(name for name in names if name.endswith(".eom"))
+        canvas_file = next(
+            (name for name in names if name.endswith(".cmxCanvas")), None
+        )
+        meta_file = next((name for name in names if name.endswith(".json")), None)
+
+        meta: Optional[dict[str, Any]] = None
+        if meta_file is not None:
+            with zf.open(meta_file) as f:
+                meta = json.load(f)
+            assert meta["scadVersion"] == "1.0.0"
+        elif lang and lang.defines["id"] != SECURILANG:  # pragma: no cover
+            raise RuntimeError("MAL languages must have meta.json defined")
+
+        id_exported_id: dict[Optional[str], int] = {}
+        associations: list[dict[str, Any]] = []
+        object_groups: dict[Optional[str], Element] = {}
+        with zf.open(eom_file) as f:
+            elements = iter_top_level(f)
+            root = next(elements)
+            if meta is None:
+                meta = {"langID": SECURILANG, "langVersion": root.get("xLang")}
+            if lang:
+                utility.verify_lang(
+                    lang=lang, lang_id=meta["langID"], lang_version=meta["langVersion"]
+                )
+            model = Model(
+                lang=lang,
+                lang_id=meta["langID"],
+                lang_version=meta["langVersion"],
+                validate_icons=validate_icons,
+            )
+            samples = root.get("samples")
+            if samples is not None and int(samples) != 1000:
+                model.meta["samples"] = int(samples)
+            if (warning_threshold := read_int(root, "warningThreshold")) != 0:
+                model.meta["warningThreshold"] = warning_threshold
+
+            for element in elements:
+                tag = local_name(element.tag)
+                if tag == "objects":
+                    read_object(model, element, lowercase_attack_step, id_exported_id)
+                elif tag == "associations":
+                    associations.append(dict(element.attrib))
+                elif tag == "groups":
+                    object_groups[element.get("id")] = element
+
+        json_serializer.deserialize_associations(
+            model,
+            [
+                {
+                    "source_object_id": id_exported_id[association.get("sourceObject")],
+                    "source_field": association.get("sourceProperty"),
+                    "target_object_id": id_exported_id[association.get("targetObject")],
+                    "target_field": association.get("targetProperty"),
+                }
+                for association in associations
+            ],
+        )
+
+        if canvas_file is None:
+            return model
+
+        views: list[Element] = []
+        group_layouts: dict[int, Element] = {}
+        with zf.open(canvas_file) as f:
+            elements = iter_top_level(f)
+            next(elements)
+            for element in elements:
+                tag = local_name(element.tag)
+                if tag == "view" and xsi_type(element) != "ObjectView":
+                    views.append(element)
+                elif tag == "grouplayout":
+                    group_layouts[read_int(element, "id")] = element
+
+    def create_groups(container: Container, nodes: list[tuple[int, int, int]]) -> None:
+        layouts = [(object_groups[str(id)], group_layouts[id]) for id, _, _ in nodes]
+        groups = container.create_groups(
+            (
+                object_group.get("name"),  # type: ignore
+                group_layout.get("icon"),
+                x,
+                y,
+                abs(id),
+            )
+            for (object_group, group_layout), (id, x, y) in zip(layouts, nodes)
+        )
+        for group, (object_group, group_layout) in zip(groups, layouts):
+            if color := group_layout.get("color"):
+                group.meta["color"] = color
+            group.meta["expand"] = read_bool(object_group, "expand")
+            read_tags(object_group, group.meta)
+            read_description(object_group, group.meta)
+
+            objects: list[tuple[Object, float, float]] = []
+            sub_groups: list[tuple[int, int, int]] = []
+            for group_item in children(group_layout, "groupitem"):
+                item_id = read_int(group_item, "id")
+                x, y = read_int(group_item, "x"), read_int(group_item, "y")
+                if str(item_id) in id_exported_id:
+                    objects.append((model.object(id_exported_id[str(item_id)]), x, y))
+                else:
+                    sub_groups.append((item_id, x, y))
+            group.add_objects(objects)
+            create_groups(group, sub_groups)
+
+    def location(node: Element) -> tuple[int, int]:
+        point = child(node, "location")
+        if point is None:  # pragma: no cover
+            return 0, 0
+        return read_int(point, "x"), read_int(point, "y")
+
+    for xmi_view in views:
+        view = model.create_view(xmi_view.get("name"))  # type: ignore
+        if read_bool(xmi_view, "loadOnStart"):
+            view.meta["loadOnStart"] = True
+        objects: list[tuple[Object, float, float]] = []
+        for view_node in children(xmi_view, "viewItem"):
+            node_id = str(read_int(view_node, "id"))
+            if node_id not in id_exported_id:
+                continue
+            if xsi_type(view_node) == "ViewTextNode":
+                continue
+            objects.append(
+                (model.object(id_exported_id[node_id]), *location(view_node))
+            )
+        view.add_objects(objects)
+        create_groups(
+            view,
+            [
+                (read_int(group_node, "id"), *location(group_node))
+                for group_node in children(xmi_view, "groupNode")
+            ],
+        )
+
+    return model
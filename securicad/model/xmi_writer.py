@@ -0,0 +1,428 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Streaming writer for the XMI entries of `.sCAD` files.
+
+The output is byte for byte what pyecore's `XMIResource.save` produces for the
+instances built by `xmi_ecore`: attributes are written in the order pyecore sets
+them, attributes with default values are left out and everything is pretty-printed
+with two space indentation.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import IO, TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from securicad.langspec import TtcDistribution, TtcFunction
+
+from . import utility
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .association import Association
+    from .attackstep import AttackStep
+    from .defense import Defense
+    from .model import Model
+    from .object import Object
+    from .visual.group import Group
+    from .visual.view import View
+    from .visual.viewobject import ViewObject
+
+# (name, value, default), the attribute is left out if value is None or the default
+Attribute = Tuple[str, Any, Any]
+
+XMI = "http://www.omg.org/XMI"
+XSI = "http://www.w3.org/2001/XMLSchema-instance"
+OBJECT_MODEL = ("com.foreseeti.kernalCAD", "http:///com/foreseeti/ObjectModel.ecore")
+MODEL_VIEWS = ("com.foreseeti.securiCAD", "http:///com/foreseeti/ModelViews.ecore")
+
+DECLARATION = "<?xml version='1.0' encoding='UTF-8'?>\n"
+ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#9;"}
+BUFFER_SIZE = 64 * 1024
+
+PARAMETERS_TO_SCAD: dict[TtcDistribution, Callable[[list[float]], dict[str, float]]] = {
+    TtcDistribution.EXPONENTIAL: lambda parameters: {"mean": 1 / parameters[0]},
+    TtcDistribution.TRUNCATED_NORMAL: lambda parameters: {
+        "mean": parameters[0],
+        "sd": parameters[1],
+    },
+    TtcDistribution.GAMMA: lambda parameters: {
+        "shape": parameters[0],
+        "scale": parameters[1],
+    },
+    TtcDistribution.LOG_NORMAL: lambda parameters: {
+        "shape": parameters[1],
+        "scale": parameters[0],
+    },
+    TtcDistribution.PARETO: lambda parameters: {
+        "shape": parameters[1],
+        "scale": parameters[0],
+    },
+    TtcDistribution.BINOMIAL: lambda parameters: {
+        "trials": parameters[0],
+        "p": parameters[1],
+    },
+    TtcDistribution.BERNOULLI: lambda parameters: {"probability": parameters[0]},
+    TtcDistribution.INFINITY: lambda parameters: {},
+}
+
+
+def to_string(value: Any) -> str:
+    if isinstance(value, bool):
+        return str(value).lower()
+    return escape(str(value), ENTITIES)
+
+
+def attributes(*attributes: Attribute) -> str:
+    return "".join(
+        f' {name}="{to_string(value)}"'
+        for name, value, default in attributes
+        if value is not None and value != default
+    )
+
+
+def element(
+    indent: int,
+    tag: str,
+    xsi_type: str,
+    attrs: str,
+    children: Optional[Iterable[str]] = None,
+) -> Iterator[str]:
+    """Yield the lines of an element, `children` must already be indented."""
+    padding = "  " * indent
+    start = f'{padding}<{tag} xsi:type="{xsi_type}"{attrs}'
+    lines = iter(children or ())
+    first = next(lines, None)
+    if first is None:
+        yield f"{start}/>\n"
+        return
+    yield f"{start}>\n"
+    yield first
+    yield from lines
+    yield f"{padding}</{tag}>\n"
+
+
+def document(
+    package: tuple[str, str], root: str, attrs: str, children: Iterable[str]
+) -> Iterator[str]:
+    prefix, uri = package
+    namespaces = f' xmlns:xmi="{XMI}" xmlns:{prefix}="{uri}"'
+    lines = iter(children)
+    first = next(lines, None)
+    yield DECLARATION
+    if first is None:
+        yield f'<{prefix}:{root}{namespaces}{attrs} xmi:version="2.0"/>\n'
+        return
+    yield f'<{prefix}:{root}{namespaces} xmlns:xsi="{XSI}"{attrs} xmi:version="2.0">\n'
+    yield first
+    yield from lines
+    yield f"</{prefix}:{root}>\n"
+
+
+def write(fp: IO[bytes], lines: Iterable[str]) -> None:
+    buffer: list[str] = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            fp.write("".join(buffer).encode())
+            buffer.clear()
+            size = 0
+    fp.write("".join(buffer).encode())
+
+
+# eom
+
+
+def kernal(name: str) -> str:
+    return f"{OBJECT_MODEL[0]}:{name}"
+
+
+def distribution(
+    indent: int, tag: str, type: str, parameters: dict[str, Any]
+) -> Iterator[str]:
+    return element(
+        indent,
+        tag,
+        kernal("XMIDistribution"),
+        attributes(("type", type, None)),
+        (
+            line
+            for name, value in parameters.items()
+            for line in element(
+                indent + 1,
+                "parameters",
+                kernal("XMIDistributionParameter"),
+                attributes(("name", name, None), ("value", value, 0.0)),
+            )
+        ),
+    )
+
+
+def attack_step_lines(indent: int, attack_step: AttackStep) -> Iterator[str]:
+    cost_upper_limit = attack_step.meta.get("costUpperLimit", None)
+    if cost_upper_limit is not None:
+        cost_upper_limit = float(cost_upper_limit)
+    cost_lower_limit = attack_step.meta.get("costLowerLimit", None)
+    if cost_lower_limit is not None:
+        cost_lower_limit = float(cost_lower_limit)
+
+    children: Iterable[str] = ()
+    if attack_step.ttc is not None:
+        assert isinstance(attack_step.ttc, TtcFunction)
+        parameters = PARAMETERS_TO_SCAD[attack_step.ttc.distribution](
+            attack_step.ttc.arguments
+        )
+        children = distribution(
+            indent + 1,
+            "localTtcDistribution",
+            attack_step.ttc.distribution.value,
+            {name: float(value) for name, value in parameters.items()},
+        )
+    return element(
+        indent,
+        "evidenceAttributes",
+        kernal("XMIAttribute"),
+        attributes(
+            ("metaConcept", utility.uc_first(attack_step.name), None),
+            ("consequence", attack_step.meta.get("consequence", None), 0),
+            ("costLowerLimit", cost_lower_limit, 0.0),
+            ("costUpperLimit", cost_upper_limit, 0.0),
+            ("description", attack_step.meta.get("description", None), None),
+        ),
+        children,
+    )
+
+
+def defense_lines(indent: int, defense: Defense) -> Iterator[str]:
+    children: Iterable[str] = ()
+    if defense.probability is not None:
+        children = distribution(
+            indent + 1,
+            "evidenceDistribution",
+            "Bernoulli",
+            {"probability": defense.probability},
+        )
+    return element(
+        indent,
+        "evidenceAttributes",
+        kernal("XMIAttribute"),
+        attributes(("metaConcept", utility.uc_first(defense.name), None)),
+        children,
+    )
+
+
+def object_lines(indent: int, obj: Object) -> Iterator[str]:
+    capex = obj.meta.get("capex", None)
+    if capex is not None:
+        capex = float(capex)
+    opex = obj.meta.get("opex", None)
+    if opex is not None:
+        opex = float(opex)
+
+    def children() -> Iterator[str]:
+        yield from distribution(
+            indent + 1,
+            "existence",
+            "Bernoulli",
+            {"probability": float(obj.meta.get("existence", 1))},
+        )
+        for attack_step in obj._attack_steps.values():
+            yield from attack_step_lines(indent + 1, attack_step)
+        for defense in obj._defenses.values():
+            yield from defense_lines(indent + 1, defense)
+
+    return element(
+        indent,
+        "objects",
+        kernal("XMIObject"),
+        attributes(
+            ("id", str(utility.id_pad(obj.id)), None),
+            ("name", obj.name if obj.name else obj.asset_type, None),
+            ("metaConcept", obj.asset_type, None),
+            ("exportedId", obj.id, 0),
+            ("capex", capex, 0.0),
+            ("opex", opex, 0.0),
+            ("attributesJsonString", json.dumps(obj.meta.get("tags", {})), "{}"),
+            ("description", obj.meta.get("description", None), None),
+        ),
+        children(),
+    )
+
+
+def association_lines(indent: int, association: Association) -> Iterator[str]:
+    return element(
+        indent,
+        "associations",
+        kernal("XMIAssociation"),
+        attributes(
+            ("sourceObject", str(utility.id_pad(association.source_object.id)), None),
+            ("targetObject", str(utility.id_pad(association.target_object.id)), None),
+            ("sourceProperty", association.source_field, None),
+            ("targetProperty", association.target_field, None),
+        ),
+    )
+
+
+def object_group_lines(indent: int, group: Group) -> Iterator[str]:
+    item_ids = [obj.id for obj in group._objects.values()]
+    # The pyecore writer lists the parent group's ID for every sub group
+    item_ids += [group.id for _ in group._groups.values()]
+    yield from element(
+        indent,
+        "groups",
+        kernal("XMIObjectGroup"),
+        attributes(
+            ("id", str(utility.id_pad(group.id)), None),
+            ("name", group.name, None),
+            ("expand", group.meta.get("expand", False), False),
+            ("attributesJsonString", json.dumps(group.meta.get("tags", {})), "{}"),
+            ("description", group.meta.get("description", None), None),
+        ),
+        (
+            line
+            for id in item_ids
+            for line in element(
+                indent + 1,
+                "items",
+                kernal("XMIObjectGroupItem"),
+                attributes(("id", str(utility.id_pad(id)), None)),
+            )
+        ),
+    )
+    for sub_group in group._groups.values():
+        yield from object_group_lines(indent, sub_group)
+
+
+def eom_lines(model: Model) -> Iterator[str]:
+    def children() -> Iterator[str]:
+        for obj in model._objects.values():
+            yield from object_lines(1, obj)
+        for association in model._associations:
+            yield from association_lines(1, association)
+        for view in model._views.values():
+            for group in view._groups.values():
+                yield from object_group_lines(1, group)
+
+    return document(
+        OBJECT_MODEL,
+        "XMIObjectModel",
+        attributes(
+            ("samples", model.meta.get("samples", None), 1000),
+            ("warningThreshold", model.meta.get("warningThreshold", None), 0),
+        ),
+        children(),
+    )
+
+
+# cmxCanvas
+
+
+def securicad(name: str) -> str:
+    return f"{MODEL_VIEWS[0]}:{name}"
+
+
+def node_lines(
+    indent: int, tag: str, xsi_type: str, id: int, x: float, y: float
+) -> Iterator[str]:
+    return element(
+        indent,
+        tag,
+        securicad(xsi_type),
+        attributes(("id", utility.id_pad(id), 0)),
+        element(
+            indent + 1,
+            "location",
+            securicad("Location"),
+            attributes(("x", int(x), 0), ("y", int(y), 0)),
+        ),
+    )
+
+
+def view_lines(indent: int, view: View) -> Iterator[str]:
+    def children() -> Iterator[str]:
+        for obj in view._objects.values():
+            yield from node_lines(
+                indent + 1, "viewItem", "ViewNode", obj.id, obj.x, obj.y
+            )
+        for group in view._groups.values():
+            yield from node_lines(
+                indent + 1, "groupNode", "GroupNode", group.id, group.x, group.y
+            )
+
+    return element(
+        indent,
+        "view",
+        securicad("View"),
+        attributes(
+            ("name", view.name, None),
+            ("loadOnStart", view.meta.get("loadOnStart", True), False),
+        ),
+        children(),
+    )
+
+
+def group_layout_lines(indent: int, group: Group) -> Iterator[str]:
+    items: list[ViewObject | Group] = [
+        *group._objects.values(),
+        *group._groups.values(),
+    ]
+    yield from element(
+        indent,
+        "grouplayout",
+        securicad("GroupLayout"),
+        attributes(
+            ("id", utility.id_pad(group.id), 0),
+            ("icon", group.icon, None),
+            ("color", group.meta.get("color", None), None),
+        ),
+        (
+            line
+            for item in items
+            for line in element(
+                indent + 1,
+                "groupitem",
+                securicad("GroupItem"),
+                attributes(
+                    ("x", int(item.x), 0),
+                    ("y", int(item.y), 0),
+                    ("id", utility.id_pad(item.id), 0),
+                ),
+            )
+        ),
+    )
+    for sub_group in group._groups.values():
+        yield from group_layout_lines(indent, sub_group)
+
+
+def canvas_lines(model: Model) -> Iterator[str]:
+    def children() -> Iterator[str]:
+        for view in model._views.values():
+            yield from view_lines(1, view)
+        for view in model._views.values():
+            for group in view._groups.values():
+                yield from group_layout_lines(1, group)
+
+    return document(MODEL_VIEWS, "ModelViews", "", children())
+
+
+def write_eom(model: Model, fp: IO[bytes]) -> None:
+    write(fp, eom_lines(model))
+
+
+def write_canvas(model: Model, fp: IO[bytes]) -> None:
+    write(fp, canvas_lines(model))
@@ -0,0 +1,30 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from securicad.langspec import Lang
+
+
+@pytest.fixture(scope="session")
+def vehiclelang() -> Lang:
+    return Lang(
+        Path(__file__).parent.parent.joinpath(
+            "model", "org.mal-lang.vehiclelang-1.0.0.mar"
+        )
+    )
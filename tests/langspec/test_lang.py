@@ -0,0 +1,46 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from securicad.langspec import AttackStepType, Lang
+
+
+def test_step_names(vehiclelang: Lang):
+    ecu = vehiclelang.assets["ECU"]
+    attack_steps = vehiclelang.step_names(
+        "ECU", (AttackStepType.OR, AttackStepType.AND)
+    )
+    assert attack_steps["access"] == "access"
+    assert all(
+        ecu.attack_steps[name].type != AttackStepType.DEFENSE
+        for name in attack_steps.values()
+    )
+    defenses = vehiclelang.step_names("Firmware", [AttackStepType.DEFENSE])
+    assert defenses["firmwarevalidation"] == "firmwareValidation"
+    assert vehiclelang.step_names("Firmware", (AttackStepType.DEFENSE,)) is defenses
+    assert "ECU" in vehiclelang.subtypes("Machine")
+    assert set(vehiclelang.subtypes("ECU")) == {
+        "ECU",
+        "GatewayECU",
+        "EthernetGatewayECU",
+    }
+
+
+def test_link_names(vehiclelang: Lang):
+    links = vehiclelang.link_names()
+    assert links is vehiclelang.link_names()
+    for asset in vehiclelang.assets.values():
+        for name, field in asset.fields.items():
+            assert links[(asset.name, name)] == field.association.name
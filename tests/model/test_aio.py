@@ -0,0 +1,151 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import io
+import threading
+from pathlib import Path
+
+import pytest
+
+from securicad.langspec import Lang
+from securicad.model import Model, aio, es_serializer, json_serializer, scad_serializer
+
+VEHICLELANG = Path(__file__).parent / "org.mal-lang.vehiclelang-1.0.0.mar"
+
+
+def build_model(lang: Lang) -> Model:
+    model = Model("aio", lang=lang)
+    ecu = model.create_object("ECU", "ECU")
+    ecu.field("firmware").connect(model.create_object("Firmware").field("hardware"))
+    return model
+
+
+def dump(model: Model) -> dict:
+    # ES models get a random model ID in their meta
+    data = json_serializer.serialize_model(model, deterministic=True)
+    del data["meta"]
+    return data
+
+
+@pytest.mark.parametrize("serializer", [json_serializer, es_serializer])
+def test_json_roundtrip(serializer, vehiclelang: Lang, tmp_path: Path):
+    model = build_model(vehiclelang)
+
+    async def roundtrip() -> list[Model]:
+        await serializer.adump(model, tmp_path / "model.json")
+        buffer = io.StringIO()
+        await serializer.adump(model, buffer)
+        buffer.seek(0)
+        return await asyncio.gather(
+            serializer.aload(tmp_path / "model.json", lang=vehiclelang),
+            serializer.aload(buffer, lang=vehiclelang),
+        )
+
+    expected = serializer.deserialize_model(
+        serializer.serialize_model(model), lang=vehiclelang
+    )
+    for loaded in asyncio.run(roundtrip()):
+        assert dump(loaded) == dump(expected)
+
+
+def test_scad_thread_pool(vehiclelang: Lang, tmp_path: Path):
+    model = build_model(vehiclelang)
+    paths = [tmp_path / f"model{i}.sCAD" for i in range(4)]
+
+    async def roundtrip(runner: aio.Runner) -> tuple[Lang, list[Model]]:
+        await asyncio.gather(
+            *(scad_serializer.adump(model, path, runner=runner) for path in paths)
+        )
+        lang = await aio.load_lang(VEHICLELANG, runner=runner)
+        models = await asyncio.gather(
+            *(scad_serializer.aload(path, lang=lang, runner=runner) for path in paths)
+        )
+        return lang, models
+
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        lang, models = asyncio.run(roundtrip(aio.Runner(executor, max_concurrency=2)))
+    assert lang.defines == vehiclelang.defines
+    expected = scad_serializer.deserialize_model(paths[0], lang=vehiclelang)
+    for loaded in models:
+        assert dump(loaded) == dump(expected)
+
+    with concurrent.futures.ProcessPoolExecutor(1) as executor:
+        with pytest.raises(ValueError):
+            aio.Runner(executor)
+        with pytest.raises(ValueError):
+            aio.configure(executor)
+
+
+def test_bounded_concurrency():
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def work(i: int) -> int:
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        threading.Event().wait(0.01)
+        with lock:
+            running[0] -= 1
+        return i
+
+    async def main() -> list[int]:
+        runner = aio.Runner(max_concurrency=2)
+        return await asyncio.gather(
+            *(aio.run(work, i, runner=runner) for i in range(8))
+        )
+
+    assert asyncio.run(main()) == list(range(8))
+    assert peak[0] <= 2
+    with pytest.raises(ValueError):
+        aio.Runner(max_concurrency=0)
+
+
+def test_cancellation():
+    started: list[int] = []
+    release = threading.Event()
+
+    def work(i: int) -> int:
+        started.append(i)
+        release.wait(5)
+        return i
+
+    async def main() -> int:
+        runner = aio.Runner(max_concurrency=1)
+        first = asyncio.ensure_future(aio.run(work, 0, runner=runner))
+        second = asyncio.ensure_future(aio.run(work, 1, runner=runner))
+        await asyncio.sleep(0.05)
+        second.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        return await first
+
+    assert asyncio.run(main()) == 0
+    assert started == [0]
+
+
+def test_configure():
+    previous = aio.get_runner()
+    try:
+        runner = aio.configure(max_concurrency=3)
+        assert aio.get_runner() is runner and runner.max_concurrency == 3
+        assert asyncio.run(aio.run(sum, [1, 2])) == 3
+    finally:
+        aio.configure(previous.executor, max_concurrency=previous.max_concurrency)
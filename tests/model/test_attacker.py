@@ -19,6 +19,7 @@ from securicad.model import Attacker, Model, Object
 from securicad.model.exceptions import (
     DuplicateAttackStepException,
     DuplicateObjectException,
+    InvalidAssetException,
     MissingAttackStepException,
     MissingObjectException,
 )
@@ -97,3 +98,49 @@ def test_filter(model: Model):
     assert attacker1_name1 in name1
     assert attacker2_name1 in name1
     assert [attacker_name2] == model.attackers(name="name2")
+
+
+def test_connect_many(model: Model, attacker: Attacker, objects: list[Object]):
+    model.journal.enabled = True
+    attacker.connect(objects[0].attack_step("access"))
+    with pytest.raises(DuplicateAttackStepException):
+        attacker.connect_many(
+            [objects[1].attack_step("access"), objects[0].attack_step("access")]
+        )
+    with pytest.raises(DuplicateAttackStepException):
+        attacker.connect_many(
+            [objects[1].attack_step("access"), objects[1].attack_step("access")]
+        )
+    assert model._connection_count == 1
+
+    attacker.connect_many(obj.attack_step("read") for obj in objects)
+    assert model._connection_count == 11
+    model.undo()
+    assert model._connection_count == 1
+    model.redo()
+    assert model.clone()._connection_count == 11
+
+    objects[0].delete()
+    assert model._connection_count == 9
+    attacker.delete()
+    assert model._connection_count == 0
+    assert model.attacker_errors
+
+
+@pytest.mark.vehiclelang
+def test_connect_all(model: Model):
+    attacker = model.create_attacker()
+    networks = [
+        model.create_object(asset_type)
+        for asset_type in ["CANNetwork", "EthernetNetwork", "Network"]
+    ]
+    ecu = model.create_object("ECU")
+    attacker.connect(networks[0].attack_step("access"))
+
+    steps = attacker.connect_all("Network", "access")
+    assert [step._object for step in steps] == networks[1:]
+    assert set(attacker._first_steps) == set(networks)
+    assert attacker.connect_all("VehicleNetwork", "access") == []
+    assert ecu not in attacker._first_steps
+    with pytest.raises(InvalidAssetException):
+        attacker.connect_all("Networks", "access")
@@ -0,0 +1,99 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from securicad.langspec import Lang
+from securicad.model import Model, json_serializer, scad_serializer, utility
+from securicad.model.batch import ModelPool, load_models
+
+VEHICLELANG = Path(__file__).parent / "org.mal-lang.vehiclelang-1.0.0.mar"
+
+
+@pytest.fixture
+def paths(tmp_path: Path, vehiclelang: Lang) -> list[Path]:
+    paths: list[Path] = []
+    for i in range(4):
+        model = Model(f"model {i}", lang=vehiclelang)
+        for j in range(i + 1):
+            ecu = model.create_object("ECU", f"ECU {j}")
+            ecu.field("firmware").connect(
+                model.create_object("Firmware").field("hardware")
+            )
+        path = tmp_path / "in" / (f"model{i}.sCAD" if i % 2 else f"model{i}.json")
+        path.parent.mkdir(exist_ok=True)
+        if i % 2:
+            scad_serializer.serialize_model(model, path)
+        else:
+            utility.write_json(json_serializer.serialize_model(model), path)
+        paths.append(path)
+    return paths
+
+
+def dump(model: Model) -> dict[str, Any]:
+    return json_serializer.serialize_model(model, deterministic=True)
+
+
+def object_count(model: Model) -> int:
+    return len(model.objects())
+
+
+def expected(paths: list[Path]) -> list[dict[str, Any]]:
+    return [dump(model) for model in load_models(paths, [VEHICLELANG], workers=1)]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_load_models(paths: list[Path], workers: int):
+    models = load_models(paths, [VEHICLELANG], workers=workers)
+    assert [len(model.objects()) for model in models] == [2, 4, 6, 8]
+    assert all(model._lang is not None for model in models)
+    assert [dump(model) for model in models] == expected(paths)
+    # A single language file
+    models = load_models(map(str, paths), str(VEHICLELANG), workers=workers)
+    assert [dump(model) for model in models] == expected(paths)
+
+
+def test_model_pool(paths: list[Path], tmp_path: Path):
+    with ModelPool([VEHICLELANG], workers=2) as pool:
+        handles = pool.load(paths)
+        assert [handle.path for handle in handles] == paths
+        assert {handle.worker for handle in handles} == {0, 1}
+        assert pool.map(object_count, handles) == [2, 4, 6, 8]
+        errors = pool.validate(handles)
+        assert all(any("attacker" in error for error in e) for e in errors)
+        assert [dump(model) for model in pool.fetch(handles)] == expected(paths)
+
+        written = pool.serialize(handles, "es", output_dir=tmp_path / "out")
+        assert written == [tmp_path / "out" / f"model{i}.es.json" for i in range(4)]
+        assert all(path.exists() for path in written)
+
+        # Both on the same worker, and on different workers
+        for other in handles[1:]:
+            diff = pool.diff(handles[0], other)
+            assert len(diff["objects"]["added"]) == 2 * handles.index(other)
+        assert pool.diff(handles[0], handles[0]) == {}
+
+        loaded = list(pool._bytes)
+        pool.release(handles[:1])
+        with pytest.raises(KeyError):
+            pool.fetch(handles[:1])
+        worker = handles[0].worker
+        assert pool._bytes[worker] == loaded[worker] - paths[0].stat().st_size
+        pool.release(handles[1:])
+        assert pool._bytes == [0, 0]
@@ -0,0 +1,100 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from securicad.langspec import Lang
+from securicad.model import Model, json_serializer
+
+
+@pytest.mark.parametrize(
+    "name, lang_name",
+    [
+        ("model1", "vehiclelang"),
+        ("model2", "vehiclelang"),
+        ("model3", None),
+        ("model5", "securilang"),
+    ],
+)
+def test_serialized(name: str, lang_name: str | None, request: pytest.FixtureRequest):
+    data: dict[str, Any] = request.getfixturevalue(f"{name}_json")
+    lang = request.getfixturevalue(lang_name) if lang_name else None
+    model = json_serializer.deserialize_model(data, lang=lang, validate_icons=False)
+    clone = model.clone()
+    assert json_serializer.serialize_model(
+        clone, sort=True
+    ) == json_serializer.serialize_model(model, sort=True)
+    assert clone.fingerprint() == model.fingerprint()
+
+
+def test_shared(model1_json: dict[str, Any], vehiclelang: Lang):
+    model = json_serializer.deserialize_model(model1_json, lang=vehiclelang)
+    clone = model.clone()
+    assert clone._lang is model._lang
+    for icon in model._icons.values():
+        assert clone.icon(icon.name).data is icon.data
+        assert clone.icon(icon.name) is not icon
+
+
+def test_independent(model1_json: dict[str, Any], vehiclelang: Lang):
+    model = json_serializer.deserialize_model(model1_json, lang=vehiclelang)
+    before = json_serializer.serialize_model(model, sort=True)
+    fingerprint = model.fingerprint()
+
+    clone = model.clone()
+    for obj in clone.objects():
+        obj.name = "renamed"
+        obj.meta["changed"] = True
+        for defense in obj._defenses.values():
+            defense.probability = 0.5
+        for field in obj._associations.values():
+            for target in field.objects():
+                field.disconnect(target)
+    for attacker in clone.attackers():
+        for obj, steps in list(attacker._first_steps.items()):
+            for attack_step in list(steps):
+                attacker.disconnect(obj.attack_step(attack_step))
+    for view in clone.views():
+        for view_object in view.objects():
+            view_object.x += 1
+        view.create_group("group", "Icon")
+    clone.meta["changed"] = True
+
+    assert json_serializer.serialize_model(model, sort=True) == before
+    assert model.fingerprint() == fingerprint
+    assert clone.fingerprint() != fingerprint
+
+
+def test_multiplicity_errors(vehiclelang: Lang):
+    model = Model(lang=vehiclelang)
+    model.create_object("Firmware")
+    clone = model.clone()
+    assert clone.multiplicity_errors == model.multiplicity_errors
+    firmware = clone.objects()[0]
+    ecu = clone.create_object("ECU")
+    ecu.field("firmware").connect(firmware.field("hardware"))
+    assert len(clone.multiplicity_errors) < len(model.multiplicity_errors)
+
+
+def test_journal(model1_json: dict[str, Any], vehiclelang: Lang):
+    model = json_serializer.deserialize_model(model1_json, lang=vehiclelang)
+    model.journal.enabled = True
+    model.create_object("ECU")
+    clone = model.clone()
+    assert not clone.journal.can_undo
+    assert not clone.journal.enabled
@@ -39,6 +39,23 @@ def test_create_duplicated_nested_group(group: Group):
         group2 = group.create_group("group", "icon", id=group2.id)
 
 
+def test_create_duplicated_group_in_view(view: View, group: Group):
+    nested = group.create_group("nested", "icon")
+    # IDs are unique within the view, at any depth
+    with pytest.raises(DuplicateGroupException):
+        nested.create_group("inner", "icon", id=group.id)
+    with pytest.raises(DuplicateGroupException):
+        view.create_group("outer", "icon", id=nested.id)
+    with pytest.raises(DuplicateGroupException):
+        nested.create_groups([("inner", "icon", 0, 0, group.id)])
+    assert nested.groups() == [] and len(view.groups()) == 2
+
+    inner = nested.create_group("inner", "icon")
+    inner.delete()
+    assert view.group(group.id) is group
+    assert view.group(nested.id) is nested
+
+
 def test_move_object(view: View, objects: list[Object], group: Group):
     group2 = group.create_group("group", "icon")
     obj = group2.add_object(objects[0])
@@ -193,3 +210,92 @@ def test_group_filter(view: View):
     assert group1_name1 in name1
     assert group2_name1 in name1
     assert [group_name2] == view.groups(name="name2")
+
+
+def assert_index(view: View):
+    assert view._object_index == {obj.id: obj for obj in view.objects()}
+    assert view._group_index == {group.id: group for group in view.groups()}
+
+
+def test_index(model: Model, objects: list[Object]):
+    model.journal.enabled = True
+    v1 = model.create_view("v1")
+    v2 = model.create_view("v2")
+    outer = v1.create_group("outer", "icon")
+    inner = outer.create_group("inner", "icon")
+    inner.add_object(objects[0])
+    v1.add_object(objects[1])
+    assert_index(v1)
+    assert v1.object(objects[0]).parent is inner
+    assert outer.has_object(objects[0]) and not inner.has_object(objects[1])
+    with pytest.raises(MissingGroupException):
+        inner.group(outer.id)
+
+    inner.move(v2)
+    assert_index(v1)
+    assert_index(v2)
+    assert not v1.has_object(objects[0]) and v2.has_object(objects[0])
+    with pytest.raises(DuplicateViewObjectException):
+        v2.add_object(objects[0])
+
+    outer.delete()
+    model.object(objects[0].id).delete()
+    assert_index(v1)
+    assert_index(v2)
+
+    clone = model.clone()
+    clone_view = clone.view(v1.id)
+    clone_view.create_group("group", "icon").create_group("nested", "icon")
+    assert_index(clone_view)
+
+    while model.journal.can_undo:
+        model.undo()
+        assert_index(v1)
+        assert_index(v2)
+
+
+def test_add_objects(model: Model, view: View, group: Group, objects: list[Object]):
+    model.journal.enabled = True
+    view.add_object(objects[0])
+    with pytest.raises(DuplicateViewObjectException):
+        group.add_objects([(objects[1], 0, 0), (objects[0], 0, 0)])
+    with pytest.raises(DuplicateViewObjectException):
+        group.add_objects([(objects[1], 0, 0), (objects[1], 1, 1)])
+    assert not group.objects()
+
+    added = group.add_objects((obj, i, 2 * i) for i, obj in enumerate(objects[1:]))
+    assert [(obj.id, obj.x, obj.y) for obj in added] == [
+        (obj.id, i, 2 * i) for i, obj in enumerate(objects[1:])
+    ]
+    assert group.objects() == added
+    assert all(view.object(obj) is added[i] for i, obj in enumerate(objects[1:]))
+    assert group.add_objects([]) == []
+
+    model.undo()
+    assert not group.objects() and len(view.objects()) == 1
+    model.redo()
+    assert group.objects() == added
+
+
+def test_create_groups(model: Model, view: View, objects: list[Object]):
+    model.journal.enabled = True
+    with pytest.raises(DuplicateGroupException):
+        view.create_groups([("a", "icon", 0, 0, 100), ("b", "icon", 0, 0, 100)])
+    assert not view.groups()
+
+    groups = view.create_groups(
+        [("a", "icon", 1, 2), ("b", "icon", 3, 4, 100), ("c", "icon", 5, 6)]
+    )
+    assert [(g.name, g.x, g.y) for g in groups] == [
+        ("a", 1, 2),
+        ("b", 3, 4),
+        ("c", 5, 6),
+    ]
+    assert groups[1].id == 100
+    assert len({g.id for g in groups} | {obj.id for obj in objects}) == 13
+    assert view.groups() == groups
+    with pytest.raises(DuplicateGroupException):
+        view.create_groups([("d", "icon", 0, 0, groups[0].id)])
+
+    model.undo()
+    assert not view.groups()
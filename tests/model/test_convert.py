@@ -0,0 +1,166 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from securicad.langspec import Lang
+from securicad.model import Model, convert, json_serializer, scad_serializer
+from securicad.model.__main__ import main
+
+VEHICLELANG = Path(__file__).parent / "org.mal-lang.vehiclelang-1.0.0.mar"
+
+
+@pytest.fixture
+def scad_files(tmp_path: Path, vehiclelang: Lang) -> list[Path]:
+    paths: list[Path] = []
+    for i in range(3):
+        model = Model(f"model {i}", lang=vehiclelang)
+        ecu = model.create_object("ECU", f"ECU {i}")
+        ecu.field("firmware").connect(model.create_object("Firmware").field("hardware"))
+        path = tmp_path / "in" / f"model{i}.sCAD"
+        path.parent.mkdir(exist_ok=True)
+        scad_serializer.serialize_model(model, path)
+        paths.append(path)
+    return paths
+
+
+def test_detect_format():
+    assert convert.detect_format(Path("a.sCAD")).name == "scad"
+    assert convert.detect_format(Path("a.json")).name == "json"
+    assert convert.detect_format(Path("a.es.json")).name == "es"
+    with pytest.raises(ValueError):
+        convert.detect_format(Path("a.txt"))
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_convert_roundtrip(
+    scad_files: list[Path], tmp_path: Path, vehiclelang: Lang, max_workers: int
+):
+    out = tmp_path / "out"
+    results = list(
+        convert.convert(
+            convert.find_files([str(tmp_path / "in")]),
+            "json",
+            output_dir=out,
+            lang_paths=[VEHICLELANG],
+            max_workers=max_workers,
+        )
+    )
+    assert all(result.ok for result in results)
+    assert sorted(result.target for result in results) == [  # type: ignore
+        out / f"model{i}.json" for i in range(3)
+    ]
+    for i, path in enumerate(scad_files):
+        expected = scad_serializer.deserialize_model(path, lang=vehiclelang)
+        with open(out / f"model{i}.json", encoding="utf-8") as f:
+            actual = json_serializer.deserialize_model(json.load(f), lang=vehiclelang)
+        assert json_serializer.serialize_model(
+            actual, sort=True
+        ) == json_serializer.serialize_model(expected, sort=True)
+
+    results = list(
+        convert.convert(
+            [out / "model0.json"], "es", lang_paths=[VEHICLELANG], max_workers=1
+        )
+    )
+    assert results[0].ok and results[0].target == out / "model0.es.json"
+    results = list(convert.convert([out / "model0.es.json"], "scad", max_workers=1))
+    assert results[0].ok and results[0].target == out / "model0.sCAD"
+
+
+def test_convert_failures(scad_files: list[Path], tmp_path: Path):
+    broken = tmp_path / "in" / "broken.sCAD"
+    broken.write_bytes(b"not a zip")
+    securilang = Path(__file__).parent / "com.foreseeti.securilang-2.1.9.mar"
+    results = {
+        result.source: result
+        for result in convert.convert(
+            [scad_files[0], broken], "json", lang_paths=[securilang], max_workers=1
+        )
+    }
+    assert "No language loaded" in results[scad_files[0]].error  # type: ignore
+    assert results[broken].error.startswith("BadZipFile")  # type: ignore
+
+
+def test_main(
+    scad_files: list[Path], tmp_path: Path, capsys: pytest.CaptureFixture[str]
+):
+    pattern = str(tmp_path / "in" / "*.sCAD")
+    assert main(["convert", pattern, "--to", "es", "--json", "-j", "1"]) == 0
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["error"] for line in lines] == [None] * 3
+    assert all(Path(line["target"]).exists() for line in lines)
+
+    (tmp_path / "in" / "broken.sCAD").write_bytes(b"")
+    assert main(["convert", pattern, "--to", "json", "-j", "1"]) == 1
+    assert "failed" in capsys.readouterr().err
+
+
+def test_convert_subdirectories(tmp_path: Path, vehiclelang: Lang):
+    for name in ["a", "b"]:
+        model = Model(name, lang=vehiclelang)
+        model.create_object("ECU", name)
+        path = tmp_path / "in" / name / "model.sCAD"
+        path.parent.mkdir(parents=True)
+        scad_serializer.serialize_model(model, path)
+    out = tmp_path / "out"
+    results = list(
+        convert.convert(
+            convert.find_files([str(tmp_path / "in")]),
+            "json",
+            output_dir=out,
+            max_workers=1,
+        )
+    )
+    assert sorted(result.target for result in results) == [  # type: ignore
+        out / "a" / "model.json",
+        out / "b" / "model.json",
+    ]
+    for name in ["a", "b"]:
+        with open(out / name / "model.json", encoding="utf-8") as f:
+            assert json.load(f)["objects"][0]["name"] == name
+
+
+def test_read_once(
+    scad_files: list[Path], tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    out = tmp_path / "out"
+    results = list(
+        convert.convert(
+            scad_files[:1],
+            "json",
+            output_dir=out,
+            lang_paths=[VEHICLELANG],
+            max_workers=1,
+        )
+    )
+    assert results[0].ok
+    path = out / "model0.json"
+    loads = 0
+    load = json.load
+
+    def counting_load(fp, *args, **kwargs):
+        nonlocal loads
+        loads += fp.name == str(path)
+        return load(fp, *args, **kwargs)
+
+    monkeypatch.setattr(json, "load", counting_load)
+    converter = convert.Converter([VEHICLELANG])
+    assert converter.read(path).object(1).name == "ECU 0"
+    assert loads == 1
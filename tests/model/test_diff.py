@@ -0,0 +1,189 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import pytest
+
+from securicad.langspec import Lang
+from securicad.model import Model, diff, json_serializer
+from securicad.model.exceptions import MissingObjectException
+
+
+def serialize(model: Model) -> dict[str, Any]:
+    data = json_serializer.serialize_model(model, sort=True)
+    data["objects"].sort(key=lambda obj: obj["id"])
+    data["views"].sort(key=lambda view: view["id"])
+    data["icons"].sort(key=lambda icon: icon["name"])
+    return data
+
+
+def copy(model: Model) -> Model:
+    # Through JSON text, so that no meta is shared with `model`
+    return json_serializer.deserialize_model(
+        json.loads(json.dumps(json_serializer.serialize_model(model))),
+        lang=model._lang,
+    )
+
+
+def assert_roundtrip(a: Model, b: Model) -> dict[str, Any]:
+    delta = json.loads(json.dumps(diff.model_diff(a, b)))
+    diff.apply_diff(a, delta)
+    assert serialize(a) == serialize(b)
+    assert diff.model_diff(a, b) == {}
+    return delta
+
+
+def test_identical(model1_json: dict[str, Any], vehiclelang: Lang):
+    a = json_serializer.deserialize_model(model1_json, lang=vehiclelang)
+    b = json_serializer.deserialize_model(model1_json, lang=vehiclelang)
+    assert diff.model_diff(a, b) == {}
+
+
+def test_objects(model1_json: dict[str, Any], vehiclelang: Lang):
+    a = json_serializer.deserialize_model(model1_json, lang=vehiclelang)
+    b = copy(a)
+    ecu = b.objects(asset_type="ECU")[0]
+    ecu.name = "renamed"
+    ecu.defense("operationModeProtection").probability = None
+    ecu.defense("operationModeProtection").meta = {}
+    ecu.attack_step("shutdown").ttc = 5
+    ecu.attack_step("access").ttc = None
+    b.create_object("ECU", "new")
+    delta = assert_roundtrip(a, b)
+    assert [o_data["name"] for o_data in delta["objects"]["added"]] == ["new"]
+    [changed] = delta["objects"]["changed"]
+    assert changed["name"] == "renamed"
+    assert changed["defenses"] == {"reset": ["operationModeProtection"]}
+    assert "associations" not in delta
+
+
+def test_associations(model: Model, objects: list[Any]):
+    attacker = model.create_attacker()
+    objects[0].field("a").connect(objects[1].field("b"))
+    objects[1].field("c").connect(objects[2].field("d"))
+    attacker.connect(objects[0].attack_step("access"))
+    b = copy(model)
+    b.object(objects[1].id).field("c").disconnect(b.object(objects[2].id))
+    b.object(objects[3].id).field("a").connect(b.object(objects[4].id).field("b"))
+    b.object(attacker.id).connect(b.object(objects[5].id).attack_step("read"))
+    b.object(objects[0].id).field("a")._targets[objects[1].id].association.meta["x"] = 1
+    delta = assert_roundtrip(model, b)
+    assert len(delta["associations"]["added"]) == 2
+    assert len(delta["associations"]["removed"]) == 1
+    assert len(delta["associations"]["changed"]) == 1
+
+
+def test_flipped_association(model: Model, objects: list[Any]):
+    b = copy(model)
+    objects[0].field("a").connect(objects[1].field("b"))
+    b.object(objects[1].id).field("b").connect(b.object(objects[0].id).field("a"))
+    assert diff.model_diff(model, b) == {}
+
+
+def test_removed_object(model: Model, objects: list[Any]):
+    attacker = model.create_attacker()
+    objects[0].field("a").connect(objects[1].field("b"))
+    attacker.connect(objects[0].attack_step("access"))
+    model.create_view("view").add_object(objects[0])
+    b = copy(model)
+    b.object(objects[0].id).delete()
+    delta = assert_roundtrip(model, b)
+    assert delta["objects"] == {"removed": [objects[0].id]}
+    assert "associations" not in delta
+
+
+def test_replaced_object(model: Model, objects: list[Any]):
+    objects[0].field("a").connect(objects[1].field("b"))
+    model.create_view("view").add_object(objects[0], 1, 2)
+    b = copy(model)
+    b.object(objects[0].id).delete()
+    replacement = b.create_object("other", id=objects[0].id)
+    replacement.field("a").connect(b.object(objects[1].id).field("b"))
+    b.view(b.views()[0].id).add_object(replacement, 1, 2)
+    delta = assert_roundtrip(model, b)
+    assert delta["objects"]["removed"] == [objects[0].id]
+    assert len(delta["associations"]["added"]) == 1
+    assert len(delta["views"]["changed"]) == 1
+
+
+def test_views_and_icons(model: Model, objects: list[Any]):
+    view = model.create_view("view")
+    view.add_object(objects[0])
+    model.create_view("removed")
+    model.create_icon("icon", "png", b"1", "")
+    model.create_icon("removed", "png", b"", "")
+    b = copy(model)
+    b.view(view.id).create_group("group", "icon").add_object(b.object(objects[1].id))
+    b.view(model.views(name="removed")[0].id).delete()
+    b.create_view("added", id=100)
+    b.icon("icon").data = b"2"
+    b.icon("removed").delete()
+    b.create_icon("added", "svg", b"", "")
+    b.name = "b"
+    b.meta["tags"] = {"a": "b"}
+    delta = assert_roundtrip(model, b)
+    assert delta["name"] == "b"
+    assert set(delta["views"]) == {"added", "removed", "changed"}
+    assert set(delta["icons"]) == {"added", "removed", "changed"}
+
+
+def test_apply_rollback(model: Model, objects: list[Any]):
+    before = serialize(model)
+    b = copy(model)
+    b.object(objects[0].id).delete()
+    b.object(objects[1].id).name = "renamed"
+    delta = diff.model_diff(model, b)
+    delta["objects"]["changed"][0]["id"] = 1000
+    with pytest.raises(MissingObjectException):
+        diff.apply_diff(model, delta)
+    assert serialize(model) == before
+
+
+def test_apply_rollback_halfway(model: Model, objects: list[Any]):
+    attacker = model.create_attacker()
+    objects[0].field("a").connect(objects[1].field("b"))
+    attacker.connect(objects[0].attack_step("access"))
+    objects[0].defense("patched").probability = 0.5
+    model.create_view("view")
+    model.journal.enabled = True
+    before = serialize(model)
+    fingerprint = model.fingerprint()
+
+    b = copy(model)
+    b.name = "b"
+    b.meta["tags"] = {"a": "b"}
+    b.object(objects[0].id).meta["description"] = "changed"
+    b.object(objects[0].id).attack_step("access").meta["x"] = 1
+    b.object(objects[0].id).defense("patched").meta["x"] = 1
+    b.object(objects[0].id).field("a")._targets[objects[1].id].association.meta["x"] = 1
+    b.view(model.views()[0].id).name = "renamed"
+    delta = diff.model_diff(model, b)
+    # Views are added last, after everything else was changed
+    delta["views"]["changed"][0]["items"].append({"type": "object", "id": 1000})
+    with pytest.raises(MissingObjectException):
+        diff.apply_diff(model, delta)
+    assert serialize(model) == before
+    assert model.fingerprint() == fingerprint
+    assert not model.journal.can_undo
+
+    del delta["views"]
+    diff.apply_diff(model, delta)
+    assert model.name == "b"
+    model.undo()
+    assert serialize(model) == before
+    assert model.fingerprint() == fingerprint
@@ -70,3 +70,71 @@ def test_wrong_lang_version(securilang: Lang) -> None:
         match=r"^Unexpected language 'com\.foreseeti\.securilang@9\.9\.9', expected 'com\.foreseeti\.securilang@2\.1\.9'$",
     ):
         es_serializer.deserialize_model(es_model, lang=securilang)
+
+
+def test_distribution_string():
+    gamma = TtcDistribution.GAMMA
+    assert (
+        es_serializer.serialize_distribution(TtcFunction(gamma, [1, 2])) == "Gamma,1,2"
+    )
+    assert (
+        es_serializer.serialize_distribution(TtcFunction(gamma, [1.0, 2.5]))
+        == "Gamma,1.0,2.5"
+    )
+    assert (
+        es_serializer.serialize_distribution(
+            TtcFunction(TtcDistribution.EXPONENTIAL, [4])
+        )
+        == "Exponential,0.25"
+    )
+
+
+def test_padded_ids(vehiclelang: Lang):
+    model = Model(lang=vehiclelang)
+    ecu = model.create_object("ECU")
+    firmware = model.create_object("Firmware")
+    ecu.field("firmware").connect(firmware.field("hardware"))
+    model.create_attacker().connect(ecu.attack_step("access"))
+    data = es_serializer.serialize_model(model)
+    assert list(data["objects"]) == ["1000000001", "1000000002", "1000000003"]
+    links = {association["link"] for association in data["associations"]}
+    assert links == {None, vehiclelang.link_names()[("ECU", "firmware")]}
+    assert {
+        es_serializer.serialize_link(model, association)
+        for association in model._associations
+    } == links
+
+
+def test_mid_generator(vehiclelang: Lang):
+    model = Model(lang=vehiclelang)
+    model.create_object("ECU")
+    first = [
+        es_serializer.serialize_model(
+            model, mid_generator=es_serializer.MidGenerator(7)
+        )["mid"]
+        for _ in range(2)
+    ]
+    assert first[0] == first[1]
+    assert es_serializer.MID_MIN <= int(first[0]) <= es_serializer.MID_MAX
+
+    es_serializer.mids.seed(7)
+    assert es_serializer.serialize_model(model)["mid"] == first[0]
+
+    model.meta["mid"] = "1234567890"
+    assert (
+        es_serializer.serialize_model(model, deterministic=True)["mid"] == "1234567890"
+    )
+
+
+def test_fingerprint_mid(vehiclelang: Lang):
+    def build(name: str) -> Model:
+        model = Model(lang=vehiclelang)
+        model.create_object("ECU", name)
+        return model
+
+    mids = [
+        es_serializer.serialize_model(build(name), deterministic=True)["mid"]
+        for name in ["a", "a", "b"]
+    ]
+    assert mids[0] == mids[1] != mids[2]
+    assert es_serializer.fingerprint_mid(build("a")) == mids[0]
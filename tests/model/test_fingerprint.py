@@ -0,0 +1,227 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from random import Random
+from typing import Any
+
+import pytest
+
+from securicad.langspec import Lang, TtcDistribution, TtcFunction
+from securicad.model import Group, Model, fingerprint, json_serializer
+
+
+def copy(model: Model) -> Model:
+    return json_serializer.deserialize_model(
+        json_serializer.serialize_model(model, validate=False),
+        lang=model._lang,
+        validate=False,
+    )
+
+
+def test_order_independent(model1_json: dict[str, Any], vehiclelang: Lang):
+    a = json_serializer.deserialize_model(model1_json, lang=vehiclelang)
+    reordered = dict(model1_json)
+    reordered["objects"] = list(reversed(model1_json["objects"]))
+    reordered["associations"] = list(reversed(model1_json["associations"]))
+    b = json_serializer.deserialize_model(reordered, lang=vehiclelang)
+    assert a.fingerprint() == b.fingerprint()
+
+
+def test_changes(model1_json: dict[str, Any], vehiclelang: Lang):
+    model = json_serializer.deserialize_model(model1_json, lang=vehiclelang)
+    seen = {model.fingerprint()}
+
+    def check() -> None:
+        fingerprint = model.fingerprint()
+        assert fingerprint not in seen
+        seen.add(fingerprint)
+        # The incrementally maintained fingerprint matches a full recomputation
+        assert copy(model).fingerprint() == fingerprint
+
+    ecu = model.objects(asset_type="ECU")[0]
+    ecu.name = "renamed"
+    check()
+    ecu.attack_step("access").ttc = TtcFunction(TtcDistribution.EXPONENTIAL, [0.5])
+    check()
+    ecu.defense("operationModeProtection").probability = 0.25
+    check()
+    firmware = model.create_object("Firmware", "new")
+    check()
+    model.create_object("ECU", "new").field("firmware").connect(
+        firmware.field("hardware")
+    )
+    check()
+    model.create_attacker().connect(ecu.attack_step("access"))
+    check()
+    model.create_icon("custom", "png", b"data", "MIT")
+    check()
+    view = model.create_view("view")
+    check()
+    view.add_object(ecu, 1, 2)
+    check()
+    view.objects()[0].x = 3
+    check()
+    group = view.create_group("group", "custom")
+    check()
+    view.objects()[0].move(group)
+    check()
+    group.name = "renamed"
+    check()
+    ecu.delete()
+    check()
+
+
+def test_undo(model1_json: dict[str, Any], vehiclelang: Lang):
+    model = json_serializer.deserialize_model(model1_json, lang=vehiclelang)
+    model.journal.enabled = True
+    before = model.fingerprint()
+    with model.transaction():
+        obj = model.objects()[0]
+        obj.name = "renamed"
+        obj.delete()
+    assert model.fingerprint() != before
+    model.undo()
+    assert model.fingerprint() == before
+
+
+def test_containers(model1_json: dict[str, Any], vehiclelang: Lang):
+    model = json_serializer.deserialize_model(model1_json, lang=vehiclelang)
+    model.create_icon("custom", "png", b"data", "MIT")
+    view = model.create_view("view")
+    group = view.create_group("group", "custom")
+    other = view.create_group("other", "custom")
+    obj = model.objects()[0]
+    group.add_object(obj, 0, 0)
+
+    model_before = model.fingerprint()
+    view_before = view.fingerprint()
+    group_before = group.fingerprint()
+    other_before = other.fingerprint()
+
+    group.objects()[0].y = 10
+    assert model.fingerprint() != model_before
+    assert view.fingerprint() != view_before
+    assert group.fingerprint() != group_before
+    assert other.fingerprint() == other_before
+
+
+def test_invalidate_meta(model1_json: dict[str, Any], vehiclelang: Lang):
+    model = json_serializer.deserialize_model(model1_json, lang=vehiclelang)
+    before = model.fingerprint()
+    obj = model.objects()[0]
+    obj.meta["note"] = "changed"
+    # Meta dictionaries aren't observed
+    assert model.fingerprint() == before
+    model.invalidate_fingerprint(obj)
+    assert model.fingerprint() != before
+    assert model.fingerprint() == copy(model).fingerprint()
+
+    before = model.fingerprint()
+    association = next(iter(model._associations))
+    association.meta["note"] = "changed"
+    model.invalidate_fingerprint()
+    assert model.fingerprint() != before
+
+
+def test_group_icon(model1_json: dict[str, Any], vehiclelang: Lang):
+    model = json_serializer.deserialize_model(model1_json, lang=vehiclelang)
+    model.create_icon("a", "png", b"a", "MIT")
+    model.create_icon("b", "png", b"b", "MIT")
+    model.journal.enabled = True
+    group = model.create_view("view").create_group("group", "a")
+    before = model.fingerprint()
+    group_before = group.fingerprint()
+    group.icon = "b"
+    assert model.fingerprint() != before
+    assert group.fingerprint() != group_before
+    assert model.fingerprint() == copy(model).fingerprint()
+    model.undo()
+    assert group.icon == "a"
+    assert model.fingerprint() == before
+
+
+def test_view_edits():
+    model = Model(lang_id="null", lang_version="0.0.0")
+    model.journal.enabled = True
+    objects = [model.create_object("obj", f"obj {i}") for i in range(20)]
+    random = Random(1)
+    view = model.create_view("view")
+    model.fingerprint()
+    for step in range(200):
+        groups = view.groups()
+        items = [*view.objects(), *groups]
+        action = random.randrange(6)
+        if action == 0 and len(groups) < 8:
+            parent = random.choice([view, *groups])
+            parent.create_group(f"group {step}", "group", step, step)
+        elif action == 1:
+            missing = [obj for obj in objects if not view.has_object(obj)]
+            if missing:
+                random.choice([view, *groups]).add_object(random.choice(missing))
+        elif action == 2 and items:
+            item = random.choice(items)
+            item.x = random.randrange(1000)
+        elif action == 3 and items:
+            item = random.choice(items)
+            target = random.choice([view, *groups])
+            # groups can't be moved into themselves
+            if not (
+                isinstance(item, Group)
+                and isinstance(target, Group)
+                and (target is item or item._contains(target))
+            ):
+                item.move(target)
+        elif action == 4 and items:
+            random.choice(items).delete()
+        elif action == 5 and groups:
+            random.choice(groups).name = f"renamed {step}"
+        if step % 10 == 9:
+            model.undo()
+        copied = copy(model)
+        assert model.fingerprint() == copied.fingerprint()
+        for group in view.groups():
+            assert (
+                group.fingerprint()
+                == copied.view(view.id).group(group.id).fingerprint()
+            )
+
+    # A group replaced by another with the same ID before the fingerprint is updated
+    group = view.create_group("replaced", "group")
+    group.add_object(model.create_object("obj"))
+    model.fingerprint()
+    group.delete()
+    view.create_group("replacement", "group", id=group.id)
+    assert model.fingerprint() == copy(model).fingerprint()
+
+
+def test_view_edit_cost(vehiclelang: Lang, monkeypatch: pytest.MonkeyPatch):
+    model = Model(lang=vehiclelang)
+    model.create_icon("group", "png", b"", "MIT")
+    view = model.create_view("view")
+    group = view.create_group("group", "group")
+    for i in range(500):
+        (view if i % 2 else group).add_object(model.create_object("ECU"), i, i)
+    model.fingerprint()
+    calls: list[Any] = []
+    original = fingerprint.digest
+    monkeypatch.setattr(
+        fingerprint, "digest", lambda data: calls.append(data) or original(data)
+    )
+    group.objects()[0].x = -1
+    view.objects()[0].move(group)
+    model.fingerprint()
+    # the two items, the group twice, and the view and the model once each
+    assert len(calls) <= 8
@@ -0,0 +1,88 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import functools
+
+import pytest
+
+from securicad.langspec import Lang
+from securicad.model import ForceLayout, GridLayout, Model, json_serializer
+from securicad.model.generator import generate_model
+
+
+def assert_valid(model: Model, lang: Lang) -> None:
+    assert model.validation_errors == []
+    for obj in model.objects():
+        if obj.asset_type == "Attacker":
+            continue
+        asset = lang.assets[obj.asset_type]
+        assert not asset.is_abstract
+        for name, field in obj._associations.items():
+            assert len(field._targets) <= asset.fields[name].multiplicity.max
+    # Creating every association again goes through all validation
+    rebuilt = json_serializer.deserialize_model(
+        json_serializer.serialize_model(model, validate=False), lang=lang
+    )
+    assert rebuilt.validation_errors == []
+    assert len(rebuilt._associations) == len(model._associations)
+
+
+@pytest.mark.parametrize("lang_name", ["vehiclelang", "securilang"])
+def test_generate_model(lang_name: str, request: pytest.FixtureRequest):
+    lang: Lang = request.getfixturevalue(lang_name)
+    model = generate_model(lang, 500, associations=1500, seed=1)
+    assert len(model.objects()) >= 500
+    # every association plus the attacker's connection
+    assert len(model._associations) == 1501
+    assert len(model.attackers()) == 1
+    assert_valid(model, lang)
+
+
+def test_generate_seed(vehiclelang: Lang):
+    def generate(seed: int):
+        return json_serializer.serialize_model(
+            generate_model(vehiclelang, 200, seed=seed), sort=True, validate=False
+        )
+
+    assert generate(1) == generate(1)
+    assert generate(1) != generate(2)
+
+
+def test_generate_options(vehiclelang: Lang):
+    model = generate_model(
+        vehiclelang,
+        100,
+        weights={"ECU": 1, "CANNetwork": 1},
+        attackers=2,
+        attack_steps=3,
+        layout=GridLayout,
+    )
+    types = {obj.asset_type for obj in model.objects()}
+    # Firmware can't be asked for, but ECUs don't need it
+    assert types <= {"ECU", "CANNetwork", "Attacker"}
+    assert len(model.attackers()) == 2
+    assert sum(len(a._first_steps) for a in model.attackers()) >= 2
+    assert len(model.views()[0].objects()) == len(model.objects()) - 2
+
+    model = generate_model(
+        vehiclelang, 50, layout=functools.partial(ForceLayout, seed=1)
+    )
+    assert len(model.views()[0].objects()) == len(model.objects()) - 1
+
+    with pytest.raises(ValueError):
+        generate_model(vehiclelang, 10, weights={"Vehicle": 1})
+    with pytest.raises(ValueError):
+        generate_model(vehiclelang, 0)
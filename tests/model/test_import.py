@@ -0,0 +1,97 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+HEAVY_MODULES = [
+    "pyecore",
+    "lxml",
+    "securicad.model.ObjectModelPackage",
+    "securicad.model.ModelViewsPackage",
+    "securicad.model.xmi_ecore",
+]
+
+
+def import_times(code: str) -> dict[str, int]:
+    """Run `code` in a new interpreter and return the cumulative import time in
+    microseconds of every module it imported, as reported by `-X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def heavy_modules(times: dict[str, int]) -> list[str]:
+    return [
+        name
+        for name in times
+        if any(name == heavy or name.startswith(f"{heavy}.") for heavy in HEAVY_MODULES)
+    ]
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import securicad.model",
+        "from securicad.model import Model, json_serializer, es_serializer",
+        "from securicad.model import scad_serializer",
+    ],
+)
+def test_import_is_lazy(code: str):
+    times = import_times(code)
+    assert "securicad.model" in times
+    assert heavy_modules(times) == []
+
+
+def test_fast_engine_is_lazy(tmp_path: Path):
+    code = f"""
+from securicad.model import Model, scad_serializer
+model = Model(lang_id="org.mal-lang.vehiclelang", lang_version="1.0.0")
+model.create_object("ECU")
+scad_serializer.serialize_model(model, {str(tmp_path / "model.sCAD")!r})
+scad_serializer.deserialize_model({str(tmp_path / "model.sCAD")!r})
+"""
+    assert heavy_modules(import_times(code)) == []
+
+
+def test_pyecore_engine_imports_ecore():
+    times = import_times(
+        "from securicad.model import scad_serializer; scad_serializer.BytesURI"
+    )
+    assert "securicad.model.xmi_ecore" in heavy_modules(times)
+
+
+def test_scad_serializer_names():
+    from securicad.langspec import TtcDistribution
+    from securicad.model import scad_serializer, xmi_reader, xmi_writer
+
+    # Defined here before the XMI reader and writer were split out
+    assert scad_serializer.PARAMETERS_TO_SCAD is xmi_writer.PARAMETERS_TO_SCAD
+    assert scad_serializer.PARAMETERS_FROM_SCAD is xmi_reader.PARAMETERS_FROM_SCAD
+    assert TtcDistribution.EXPONENTIAL in scad_serializer.PARAMETERS_TO_SCAD
@@ -0,0 +1,192 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from securicad.model import Attacker, Model, Object, View, json_serializer
+from securicad.model.exceptions import JournalException, MultiplicityException
+
+
+def serialize(model: Model) -> dict[str, Any]:
+    # restored objects are re-inserted last, so compare independent of object order
+    data = json_serializer.serialize_model(model, sort=True)
+    data["objects"].sort(key=lambda obj: obj["id"])
+    return data
+
+
+def test_transaction_rollback(model: Model, objects: list[Object], view: View):
+    objects[0].field("a").connect(objects[1].field("b"))
+    view.add_object(objects[0], 10, 20)
+    before = serialize(model)
+    with pytest.raises(ValueError):
+        with model.transaction():
+            objects[0].delete()
+            objects[2].field("c").connect(objects[3].field("d"))
+            objects[4].defense("def").probability = 0.5
+            objects[5].attack_step("step").ttc = 3
+            model.create_object("new")
+            raise ValueError()
+    assert serialize(model) == before
+    assert model.object(objects[0].id) is objects[0]
+    assert view.object(objects[0]).x == 10
+    assert not model.journal.can_undo
+
+
+def test_transaction_commit(model: Model, objects: list[Object]):
+    with model.transaction():
+        objects[0].field("a").connect(objects[1].field("b"))
+    assert objects[1] in objects[0].field("a").objects()
+    assert not model.journal.can_undo
+
+
+def test_nested_transaction(model: Model, objects: list[Object]):
+    before = serialize(model)
+    with pytest.raises(ValueError):
+        with model.transaction():
+            with model.transaction():
+                objects[0].field("a").connect(objects[1].field("b"))
+            objects[2].delete()
+            raise ValueError()
+    assert serialize(model) == before
+
+
+def test_undo_redo(model: Model, objects: list[Object]):
+    model.journal.enabled = True
+    objects[0].field("a").connect(objects[1].field("b"))
+    connected = serialize(model)
+    objects[0].delete()
+    deleted = serialize(model)
+    model.undo()
+    assert serialize(model) == connected
+    model.undo()
+    assert not objects[0].field("a").objects()
+    model.redo()
+    assert serialize(model) == connected
+    model.redo()
+    assert serialize(model) == deleted
+    assert not model.journal.can_redo
+
+
+def test_undo_clears_redo(model: Model, objects: list[Object]):
+    model.journal.enabled = True
+    objects[0].name = "renamed"
+    objects[0].defense("def").probability = 0.5
+    model.undo()
+    assert model.journal.can_redo
+    objects[0].defense("def").probability = 0.2
+    assert not model.journal.can_redo
+
+
+def test_undo_transaction_as_one_step(model: Model, objects: list[Object]):
+    model.journal.enabled = True
+    before = serialize(model)
+    with model.transaction():
+        for obj in objects[1:]:
+            objects[0].field("a").connect(obj.field("b"))
+    model.undo()
+    assert serialize(model) == before
+    assert not model.journal.can_undo
+
+
+def test_undo_attacker(model: Model, attacker: Attacker, objects: list[Object]):
+    model.journal.enabled = True
+    attacker.connect(objects[0].attack_step("access"))
+    connected = serialize(model)
+    attacker.delete()
+    assert model.attacker_errors
+    model.undo()
+    assert serialize(model) == connected
+    assert not model.attacker_errors
+    objects[0].delete()
+    model.undo()
+    assert serialize(model) == connected
+    attacker.disconnect(objects[0].attack_step("access"))
+    model.undo()
+    assert serialize(model) == connected
+
+
+def test_undo_view(model: Model, view: View, objects: list[Object]):
+    model.journal.enabled = True
+    group = view.create_group("group", "icon", 5, 5)
+    obj = view.add_object(objects[0], 1, 2)
+    obj.move(group)
+    obj.x = 100
+    group.delete()
+    model.undo()
+    assert view.object(objects[0]).x == 100
+    model.undo()
+    assert obj.x == 1
+    model.undo()
+    assert obj.parent is view
+    view.delete()
+    model.undo()
+    assert model.view(view.id).object(objects[0]) is obj
+
+
+def test_undo_icon(model: Model):
+    model.journal.enabled = True
+    icon = model.create_icon("icon", "png", b"", "")
+    icon.delete()
+    model.undo()
+    assert model.icon("icon") is icon
+    model.undo()
+    assert not model._icons
+
+
+@pytest.mark.vehiclelang
+def test_rollback_validation_failure(model: Model):
+    ecu = model.create_object("ECU")
+    firmware1 = model.create_object("Firmware")
+    firmware2 = model.create_object("Firmware")
+    before = serialize(model)
+    errors = len(model.multiplicity_errors)
+    with pytest.raises(MultiplicityException):
+        with model.transaction():
+            firmware1.field("hardware").connect(ecu.field("firmware"))
+            firmware2.field("hardware").connect(ecu.field("firmware"))
+    assert serialize(model) == before
+    assert len(model.multiplicity_errors) == errors
+
+
+def test_empty_journal(model: Model):
+    with pytest.raises(JournalException):
+        model.undo()
+    with pytest.raises(JournalException):
+        model.redo()
+
+
+def test_undo_in_transaction(model: Model):
+    model.journal.enabled = True
+    model.create_object("obj")
+    with model.transaction():
+        with pytest.raises(JournalException):
+            model.undo()
+        with pytest.raises(JournalException):
+            model.redo()
+
+
+def test_clear(model: Model, objects: list[Object]):
+    model.journal.enabled = True
+    objects[0].delete()
+    model.journal.clear()
+    assert not model.journal.can_undo
+
+
+def test_disabled_by_default(model: Model, objects: list[Object]):
+    objects[0].delete()
+    assert not model.journal.can_undo
@@ -0,0 +1,200 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import math
+
+import pytest
+
+from securicad.model import (
+    ForceLayout,
+    GridLayout,
+    HorizontalLayout,
+    Model,
+    Object,
+    VerticalLayout,
+    View,
+)
+from securicad.model.visual.exceptions import DuplicateLayoutObjectException
+from securicad.model.visual.layout import OBJECT_RADIUS
+
+
+def build_chain(model: Model, count: int) -> list[Object]:
+    objects: list[Object] = []
+    for i in range(count):
+        ecu = model.create_object("ECU", f"ECU {i}")
+        firmware = model.create_object("Firmware", f"Firmware {i}")
+        ecu.field("firmware").connect(firmware.field("hardware"))
+        if objects:
+            ecu.field("vehiclenetworks").connect(
+                model.create_object("CANNetwork", f"CAN {i}").field("networkECUs")
+            )
+        objects += [ecu, firmware]
+    return objects
+
+
+def positions(view: View) -> dict[int, tuple[float, float]]:
+    return {obj.id: obj.absolute_position for obj in view.objects()}
+
+
+@pytest.mark.vehiclelang
+def test_force_layout(model: Model):
+    objects = build_chain(model, 50)
+    model.create_icon("group", "png", b"", "MIT")
+    layout = ForceLayout("view")
+    group = GridLayout("group", icon="group")
+    for obj in objects[:10]:
+        group.add_item(obj)
+    layout.add_item(group)
+    for obj in objects[10:]:
+        layout.add_item(obj)
+    view = layout.build(model)
+
+    assert len(view.objects()) == len(objects)
+    assert {obj.id for obj in view.group(view.groups()[0].id).objects()} == {
+        obj.id for obj in objects[:10]
+    }
+    top_level = [view.object(obj) for obj in objects[10:]]
+    assert min(obj.x for obj in top_level) >= 0
+    assert min(obj.y for obj in top_level) >= 0
+    for i, a in enumerate(top_level):
+        for b in top_level[i + 1 :]:
+            assert math.dist((a.x, a.y), (b.x, b.y)) >= 2 * OBJECT_RADIUS
+
+    # Connected objects end up closer than unconnected ones on average
+    connected = [
+        math.dist((a.x, a.y), (b.x, b.y))
+        for a, b in zip(top_level[::2], top_level[1::2])
+    ]
+    everything = [
+        math.dist((a.x, a.y), (b.x, b.y))
+        for a in top_level
+        for b in top_level
+        if a is not b
+    ]
+    assert sum(connected) / len(connected) < sum(everything) / len(everything)
+
+
+@pytest.mark.vehiclelang
+def test_force_layout_seed(model: Model):
+    objects = build_chain(model, 30)
+
+    def build(seed: int) -> dict[int, tuple[float, float]]:
+        layout = ForceLayout(f"seed {seed}", seed=seed)
+        for obj in objects:
+            layout.add_item(obj)
+        return positions(layout.build(model))
+
+    assert build(1) == build(1)
+    assert build(1) != build(2)
+
+
+@pytest.mark.vehiclelang
+def test_force_layout_single(model: Model):
+    layout = ForceLayout("view")
+    layout.add_item(model.create_object("ECU"))
+    assert list(positions(layout.build(model)).values()) == [(0, 0)]
+    with pytest.raises(ValueError):
+        ForceLayout("view", iterations=-1)
+
+
+@pytest.mark.vehiclelang
+def test_nested_object_ids(model: Model):
+    objects = build_chain(model, 3)
+    root = HorizontalLayout("root")
+    outer = VerticalLayout("outer", icon="group")
+    inner = VerticalLayout("inner", icon="group")
+    root.add_item(outer)
+    outer.add_item(inner)
+    inner.add_item(objects[0])
+    outer.add_item(objects[1])
+    assert root.has_object(objects[0]) and outer.has_object(objects[0])
+    assert not inner.has_object(objects[1])
+    assert not root.has_object(objects[2])
+
+    duplicate = VerticalLayout("duplicate", icon="group")
+    duplicate.add_item(objects[2])
+    duplicate.add_item(objects[0])
+    with pytest.raises(DuplicateLayoutObjectException):
+        root.add_item(duplicate)
+    with pytest.raises(DuplicateLayoutObjectException):
+        inner.add_item(objects[0])
+
+
+@pytest.mark.vehiclelang
+def test_incremental_layout(model: Model, monkeypatch: pytest.MonkeyPatch):
+    objects = build_chain(model, 6)
+    model.create_icon("group", "png", b"", "MIT")
+    root = HorizontalLayout("root")
+    groups = [GridLayout(f"group {i}", icon="group") for i in range(3)]
+    for i, group in enumerate(groups):
+        root.add_item(group)
+        for obj in objects[i * 3 : i * 3 + 3]:
+            group.add_item(obj)
+    root.build(model)
+
+    laid_out: list[str] = []
+    original = GridLayout._layout
+
+    def spy(self: GridLayout) -> None:
+        laid_out.append(self.name)
+        original(self)
+
+    monkeypatch.setattr(GridLayout, "_layout", spy)
+    groups[1].add_item(objects[9])
+    incremental = positions(root.build(model))
+    assert laid_out == ["group 1"]
+
+    groups[2].columns = 1
+    assert positions(root.build(model)) != incremental
+    assert laid_out == ["group 1", "group 2"]
+    groups[2].columns = None
+    assert positions(root.build(model)) == incremental
+
+
+@pytest.mark.vehiclelang
+def test_force_layout_associations(model: Model, monkeypatch: pytest.MonkeyPatch):
+    objects = build_chain(model, 10)
+    model.create_icon("group", "png", b"", "MIT")
+    root = HorizontalLayout("root")
+    group = ForceLayout("group", icon="group", seed=1)
+    root.add_item(group)
+    for obj in objects:
+        group.add_item(obj)
+    before = positions(root.build(model))
+    laid_out: list[str] = []
+    original = ForceLayout._layout
+
+    def spy(self: ForceLayout) -> None:
+        laid_out.append(self.name)
+        original(self)
+
+    monkeypatch.setattr(ForceLayout, "_layout", spy)
+    assert positions(root.build(model)) == before
+    assert laid_out == []
+
+    # Laid out again when the associations change, as a new layout would be
+    objects[0].field("firmware").disconnect(objects[1])
+    objects[2].field("firmware").disconnect(objects[3])
+    objects[0].field("firmware").connect(objects[3].field("hardware"))
+    objects[2].field("firmware").connect(objects[1].field("hardware"))
+    after = positions(root.build(model))
+    assert after != before and laid_out == ["group"]
+    fresh = HorizontalLayout("fresh")
+    fresh_group = ForceLayout("group", icon="group", seed=1)
+    fresh.add_item(fresh_group)
+    for obj in objects:
+        fresh_group.add_item(obj)
+    assert positions(fresh.build(model)) == after
@@ -14,11 +14,12 @@
 from __future__ import annotations
 
 from io import BytesIO
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Optional
+from zipfile import ZIP_BZIP2, ZIP_DEFLATED, ZIP_LZMA, ZIP_STORED, ZipFile
 
 import pytest
 
-from securicad.langspec import Lang
+from securicad.langspec import Lang, TtcDistribution, TtcFunction
 from securicad.model import Model, json_serializer, scad_serializer
 from securicad.model.exceptions import InvalidLangException
 
@@ -102,3 +103,114 @@ def test_wrong_lang_version(securilang: Lang, simple_wrong_version_scad: bytes)
         scad_serializer.deserialize_model(
             BytesIO(simple_wrong_version_scad), lang=securilang
         )
+
+
+def read_engines(data: bytes, **kwargs: Any) -> tuple[Any, Any]:
+    return tuple(
+        json_serializer.serialize_model(
+            scad_serializer.deserialize_model(BytesIO(data), engine=engine, **kwargs),
+            sort=True,
+        )
+        for engine in ["fast", "pyecore"]
+    )
+
+
+def scad_entries(model: Model, engine: str) -> dict[str, bytes]:
+    scad = BytesIO()
+    scad_serializer.serialize_model(model, scad, engine=engine)
+    with ZipFile(scad) as zf:
+        return {name: zf.read(name) for name in zf.namelist()}
+
+
+@pytest.mark.parametrize(
+    "name", ["simple_scad", "text_scad", "model_scad", "defense_description_scad"]
+)
+def test_fast_engine_golden(name: str, request: pytest.FixtureRequest):
+    data: bytes = request.getfixturevalue(name)
+    model = scad_serializer.deserialize_model(BytesIO(data))
+    assert scad_entries(model, "fast") == scad_entries(model, "pyecore")
+    fast, pyecore = read_engines(data)
+    assert fast == pyecore
+
+
+def test_fast_engine_all_attributes(vehiclelang: Lang):
+    model = Model("all attributes", lang=vehiclelang)
+    model.meta.update(samples=500, warningThreshold=7)
+    ecu = model.create_object("ECU", "quotes \" ' & <tags>\n\ttabs\r")
+    ecu.meta.update(
+        capex=1, opex=2.5, description="ÅÄÖ", tags={"a": "b"}, existence=0.25
+    )
+    firmware = model.create_object("Firmware")
+    firmware.meta["existence"] = 0
+    ecu.field("firmware").connect(firmware.field("hardware"))
+    ecu.attack_step("access").ttc = TtcFunction(TtcDistribution.GAMMA, [1.5, 2])
+    ecu.attack_step("connect").meta.update(
+        consequence=3, costLowerLimit=0, costUpperLimit=5, description="d"
+    )
+    ecu.defense("operationModeProtection").probability = 0.0
+    firmware.defense("firmwareValidation").probability = 0.5
+    model.create_attacker().connect(ecu.attack_step("access"))
+    model.create_icon("icon", "png", b"", "")
+    view = model.create_view("view")
+    view.meta["loadOnStart"] = False
+    view.add_object(ecu, 1.5, -2)
+    group = view.create_group("group", "icon", 3, 4)
+    group.meta.update(color="#fff", description="gd", expand=True, tags={"t": 1})
+    group.add_object(firmware)
+    group.create_group("sub group", "icon", 0, 5).create_group("leaf", "icon")
+    model.create_view("empty")
+    assert scad_entries(model, "fast") == scad_entries(model, "pyecore")
+    data = BytesIO()
+    scad_serializer.serialize_model(model, data)
+    fast, pyecore = read_engines(
+        data.getvalue(), lang=vehiclelang, validate_icons=False
+    )
+    assert fast == pyecore
+    assert scad_entries(Model(lang=vehiclelang), "fast") == scad_entries(
+        Model(lang=vehiclelang), "pyecore"
+    )
+
+
+def test_unknown_engine(model: Model):
+    with pytest.raises(ValueError):
+        scad_serializer.serialize_model(model, BytesIO(), engine="other")
+    with pytest.raises(ValueError):
+        scad_serializer.deserialize_model(BytesIO(), engine="other")
+
+
+@pytest.mark.parametrize("engine", ["fast", "pyecore"])
+@pytest.mark.parametrize(
+    "compression, compresslevel, compress_type",
+    [
+        ("stored", None, ZIP_STORED),
+        ("deflated", 9, ZIP_DEFLATED),
+        ("bzip2", None, ZIP_BZIP2),
+        ("lzma", None, ZIP_LZMA),
+    ],
+)
+def test_compression(
+    model_scad: bytes,
+    engine: str,
+    compression: str,
+    compresslevel: Optional[int],
+    compress_type: int,
+):
+    model = scad_serializer.deserialize_model(BytesIO(model_scad))
+    scad = BytesIO()
+    scad_serializer.serialize_model(
+        model,
+        scad,
+        engine=engine,
+        compression=compression,
+        compresslevel=compresslevel,
+    )
+    with ZipFile(scad) as zf:
+        assert {info.compress_type for info in zf.infolist()} == {compress_type}
+    assert json_serializer.serialize_model(
+        scad_serializer.deserialize_model(scad), sort=True
+    ) == json_serializer.serialize_model(model, sort=True)
+
+
+def test_unknown_compression(model: Model):
+    with pytest.raises(ValueError):
+        scad_serializer.serialize_model(model, BytesIO(), compression="zstd")
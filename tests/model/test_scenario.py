@@ -0,0 +1,132 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from securicad.langspec import Lang, TtcDistribution, TtcFunction
+from securicad.model import Model, Scenario, Scenarios, es_serializer, json_serializer
+from securicad.model.exceptions import (
+    InvalidAttackStepException,
+    InvalidDefenseException,
+    MissingObjectException,
+)
+
+SERIALIZERS = {"es": es_serializer, "json": json_serializer}
+
+
+@pytest.fixture
+def base(vehiclelang: Lang) -> Model:
+    model = Model(lang=vehiclelang)
+    model.meta["mid"] = "1234567890"
+    for i in range(3):
+        ecu = model.create_object("ECU", f"ecu{i}")
+        firmware = model.create_object("Firmware", f"firmware{i}")
+        ecu.field("firmware").connect(firmware.field("hardware"))
+        ecu.attack_step("connect").meta["consequence"] = 5
+    model.create_attacker().connect(ecu.attack_step("access"))
+    view = model.create_view("view")
+    view.add_object(ecu, 10, 20)
+    return model
+
+
+def scenarios(model: Model) -> list[Scenario]:
+    ecu = model.objects(asset_type="ECU")[0]
+    result = [Scenario("base")]
+    for i in range(5):
+        scenario = Scenario(f"scenario{i}")
+        scenario.set_probability(ecu.defense("operationModeProtection"), i / 5)
+        scenario.set_ttc(
+            ecu.attack_step("access"),
+            TtcFunction(TtcDistribution.EXPONENTIAL, [i + 1]),
+        )
+        scenario.set_ttc(
+            ecu.attack_step("connect"),
+            None if i % 2 else TtcFunction(TtcDistribution.GAMMA, [1, 2]),
+        )
+        result.append(scenario)
+    return result
+
+
+def apply(model: Model, scenario: Scenario) -> Model:
+    model = model.clone()
+    for (id, name), probability in scenario.probabilities.items():
+        model.object(id).defense(name).probability = probability
+    for (id, name), ttc in scenario.ttcs.items():
+        model.object(id).attack_step(name).ttc = ttc
+    return model
+
+
+@pytest.mark.parametrize("format", ["es", "json"])
+def test_documents(base: Model, format: str):
+    before = json_serializer.serialize_model(base, sort=True)
+    generator = Scenarios(base, format=format, sort=True)
+    for scenario in scenarios(base):
+        document = generator.document(scenario)
+        expected = SERIALIZERS[format].serialize_model(apply(base, scenario), sort=True)
+        assert document == expected
+        assert generator.dumps(scenario) == json.dumps(document)
+    assert json_serializer.serialize_model(base, sort=True) == before
+
+
+def test_shared(base: Model):
+    generator = Scenarios(base)
+    ecu = base.objects(asset_type="ECU")[0]
+    scenario = Scenario(probabilities={(ecu.id, "operationModeProtection"): 1.0})
+    document = generator.document(scenario)
+    base_document = generator.document(Scenario())
+    for key, section in document["objects"].items():
+        if section["eid"] == ecu.id:
+            assert section != base_document["objects"][key]
+        else:
+            assert section is base_document["objects"][key]
+    assert document["associations"] is base_document["associations"]
+
+
+def test_invalid(base: Model):
+    generator = Scenarios(base)
+    ecu = base.objects(asset_type="ECU")[0]
+    with pytest.raises(MissingObjectException):
+        generator.document(Scenario(probabilities={(1000, "name"): 1.0}))
+    with pytest.raises(InvalidDefenseException):
+        generator.document(Scenario(probabilities={(ecu.id, "missing"): 1.0}))
+    with pytest.raises(InvalidAttackStepException):
+        generator.document(Scenario(ttcs={(ecu.id, "missing"): 1.0}))
+    with pytest.raises(ValueError):
+        Scenarios(base, format="xml")
+
+
+def test_stream_parallel(base: Model):
+    generator = Scenarios(base)
+    expected = list(generator.stream(scenarios(base)))
+    assert list(generator.stream(scenarios(base), max_workers=2)) == expected
+
+
+def test_deterministic_documents(base: Model):
+    del base.meta["mid"]
+    base.invalidate_fingerprint()
+    first, second = (
+        list(Scenarios(model, deterministic=True).stream(scenarios(model)))
+        for model in [base, base.clone()]
+    )
+    assert first == second
+    assert len(set(first)) == len(first)
+    mid = json.loads(first[0])["mid"]
+    assert mid == es_serializer.fingerprint_mid(base)
+    assert json.loads(first[0]) == es_serializer.serialize_model(
+        base, deterministic=True
+    )
@@ -13,13 +13,14 @@
 # limitations under the License.
 from __future__ import annotations
 
+import json
 from typing import Any
 
 import pytest
 from jsonschema.exceptions import ValidationError
 
 from securicad.langspec import Lang, TtcDistribution, TtcFunction
-from securicad.model import Model, json_serializer
+from securicad.model import Model, es_serializer, json_serializer
 from securicad.model.exceptions import InvalidLangException
 
 
@@ -124,3 +125,44 @@ def test_wrong_lang_version(securilang: Lang) -> None:
         match=r"^Unexpected language 'com\.foreseeti\.securilang@9\.9\.9', expected 'com\.foreseeti\.securilang@2\.1\.9'$",
     ):
         json_serializer.deserialize_model(json_model, lang=securilang)
+
+
+def build_shuffled(lang: Lang, reverse: bool) -> Model:
+    model = Model("deterministic", lang=lang)
+    model.meta["mid"] = "1234567890"
+    ids = [3, 1, 2] if reverse else [1, 2, 3]
+    assets = {1: "ECU", 2: "Firmware", 3: "ECU"}
+    for id in ids:
+        model.create_object(assets[id], f"object {id}", id=id)
+    steps = ["access", "connect"]
+    for name in reversed(steps) if reverse else steps:
+        model.object(1).attack_step(name).meta["consequence"] = 1
+    pairs = [(1, 2), (3, 4)]
+    model.create_object("Firmware", "object 4", id=4)
+    for ecu, firmware in reversed(pairs) if reverse else pairs:
+        ecu_field = model.object(ecu).field("firmware")
+        firmware_field = model.object(firmware).field("hardware")
+        # Connected from the other side when reversed
+        if reverse:
+            firmware_field.connect(ecu_field)
+        else:
+            ecu_field.connect(firmware_field)
+    for name in ["b", "a"] if reverse else ["a", "b"]:
+        view = model.create_view(name, id=10 if name == "a" else 11)
+        for id in ids:
+            view.add_object(model.object(id), id, id)
+    return model
+
+
+@pytest.mark.parametrize("serializer", [json_serializer, es_serializer])
+def test_deterministic(vehiclelang: Lang, serializer: Any):
+    forward, backward = (
+        json.dumps(
+            serializer.serialize_model(
+                build_shuffled(vehiclelang, reverse), deterministic=True
+            ),
+            sort_keys=True,
+        )
+        for reverse in [False, True]
+    )
+    assert forward == backward
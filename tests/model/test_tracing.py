@@ -0,0 +1,170 @@
+# Copyright 2021-2022 Foreseeti AB <https://foreseeti.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from securicad.langspec import Lang
+from securicad.model import (
+    Model,
+    es_serializer,
+    json_serializer,
+    scad_serializer,
+    tracing,
+    utility,
+)
+from securicad.model.validator import Validator
+
+MODELS = Path(__file__).parent
+
+
+@pytest.fixture
+def recorder() -> Iterator[tracing.Recorder]:
+    recorder = tracing.Recorder()
+    tracing.configure(tracer=recorder, meter=recorder)
+    yield recorder
+    tracing.configure()
+
+
+def test_disabled():
+    original = Validator.validate_association
+    recorder = tracing.Recorder()
+    tracing.configure(tracer=recorder)
+    assert Validator.validate_association is not original
+    tracing.configure()
+    assert Validator.validate_association is original
+    assert Model._create_association.__name__ == "_create_association"
+
+    with tracing.span("test"):
+        tracing.add("test")
+    assert recorder.calls == {} and recorder.counters == {}
+
+
+def test_json(recorder: tracing.Recorder, vehiclelang: Lang):
+    data = utility.read_json(MODELS / "model1.json")
+    json_serializer.deserialize_model(data, lang=vehiclelang)
+
+    assert recorder.calls["json.schema_validation"] == 1
+    assert recorder.calls["json.associations"] == 1
+    assert recorder.counters == {"json.association_passes": 1}
+    # Attackers are connected without creating associations
+    assert recorder.calls["model.create_association"] == 1
+    assert recorder.calls["validator.validate_association"] == 1
+    assert recorder.seconds["json.associations"] >= (
+        recorder.seconds["model.create_association"]
+    )
+
+
+def test_retries(recorder: tracing.Recorder, securilang: Lang):
+    model = Model("retries", lang=securilang)
+    keystore = model.create_object("Keystore")
+    dataflow = model.create_object("Dataflow")
+    protocol = model.create_object("Protocol")
+    protocol.defense("encrypted").probability = 1.0
+    # The keystore can only be connected to the dataflow once it's encrypted
+    data = json_serializer.serialize_model(model)
+    data["associations"] = [
+        {
+            "meta": {},
+            "source_object_id": keystore.id,
+            "source_field": "encryptedDataflows",
+            "target_object_id": dataflow.id,
+            "target_field": "keystore",
+        },
+        {
+            "meta": {},
+            "source_object_id": dataflow.id,
+            "source_field": "protocol",
+            "target_object_id": protocol.id,
+            "target_field": "dataflows",
+        },
+    ]
+    json_serializer.deserialize_model(data, lang=securilang)
+    assert recorder.counters["json.association_passes"] == 2
+    assert recorder.counters["json.association_retries"] == 1
+    assert recorder.calls["securilang_validator.validate_association"] == 3
+    assert recorder.calls["model.create_association"] == 3
+
+    model = json_serializer.deserialize_model(data, lang=securilang)
+    es_data = es_serializer.serialize_model(model)
+    # Keystore first, as above
+    es_data["associations"].sort(
+        key=lambda association: "keystore"
+        not in (association["type1"], association["type2"])
+    )
+    es_serializer.deserialize_model(es_data, lang=securilang)
+    assert recorder.counters["es.association_passes"] == 2
+    assert recorder.counters["es.association_retries"] == 1
+
+
+def test_scad(recorder: tracing.Recorder, tmp_path: Path):
+    model = scad_serializer.deserialize_model(MODELS / "simple.sCAD")
+    scad_serializer.serialize_model(model, tmp_path / "model.sCAD")
+    assert recorder.calls["scad.load.fast"] == 1
+    assert recorder.calls["scad.save.fast"] == 1
+    assert recorder.calls["scad.save.eom"] == 1
+    assert recorder.calls["scad.save.canvas"] == 1
+    assert recorder.calls["meta.schema_validation"] == 1
+    assert recorder.calls["validator.validate_multiplicity"] > 0
+
+    scad_serializer.deserialize_model(MODELS / "simple.sCAD", engine="pyecore")
+    assert recorder.counters["scad.association_passes"] == 1
+    assert "scad.association_retries" not in recorder.counters
+
+
+def test_scope():
+    original = Validator.validate_association
+    recorders = [tracing.Recorder() for _ in range(2)]
+    barrier = threading.Barrier(2)
+
+    def run(recorder: tracing.Recorder, count: int) -> None:
+        with tracing.scope(tracer=recorder, meter=recorder):
+            barrier.wait()
+            for _ in range(count):
+                with tracing.span("test"):
+                    tracing.add("test")
+            barrier.wait()
+
+    threads = [
+        threading.Thread(target=run, args=(recorder, i + 1))
+        for i, recorder in enumerate(recorders)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [recorder.calls for recorder in recorders] == [{"test": 1}, {"test": 2}]
+    assert [recorder.counters for recorder in recorders] == [{"test": 1}, {"test": 2}]
+    assert Validator.validate_association is original
+
+    # Spans outside of the scope go to the configured tracer
+    configured, scoped = tracing.Recorder(), tracing.Recorder()
+    tracing.configure(tracer=configured)
+    with tracing.scope(tracer=scoped):
+        with tracing.span("scoped"):
+            pass
+        with tracing.scope():
+            with tracing.span("disabled"):
+                pass
+    with tracing.span("configured"):
+        pass
+    assert Validator.validate_association is not original
+    tracing.configure()
+    assert Validator.validate_association is original
+    assert scoped.calls == {"scoped": 1} and configured.calls == {"configured": 1}
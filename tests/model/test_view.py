@@ -13,9 +13,12 @@
 # limitations under the License.
 from __future__ import annotations
 
+import math
+import random
+
 import pytest
 
-from securicad.model import Model, Object, View
+from securicad.model import Model, Object, View, ViewItem
 from securicad.model.exceptions import DuplicateViewException, MissingViewException
 
 
@@ -87,3 +90,79 @@ def test_filter(model: Model):
     assert view1_name1 in name1
     assert view2_name1 in name1
     assert [view_name2] == model.views(name="name2")
+
+
+def brute_nearest(view: View, x: float, y: float) -> ViewItem:
+    items: list[ViewItem] = [*view.objects(), *view.groups()]
+    return min(
+        items,
+        key=lambda item: (
+            math.dist(item.absolute_position, (x, y)),
+            item.id,  # type: ignore
+        ),
+    )
+
+
+def test_query_rect(view: View, objects: list[Object]):
+    outer = view.create_group("outer", "icon", 100, 100)
+    inner = outer.create_group("inner", "icon", 50, 50)
+    a = view.add_object(objects[0], 10, 10)
+    b = outer.add_object(objects[1], 10, 10)
+    c = inner.add_object(objects[2], 10, 10)
+    assert c.absolute_position == (160, 160)
+    assert set(view.query_rect(0, 0, 20, 20)) == {a}
+    assert set(view.query_rect(200, 200, 0, 0)) == {a, b, c, outer, inner}
+    assert set(view.query_rect(110, 110, 160, 160)) == {b, c, inner}
+    assert not view.query_rect(-100, -100, -1, -1)
+
+
+def test_nearest(view: View, objects: list[Object]):
+    assert view.nearest(0, 0) is None
+    rng = random.Random(0)
+    group = view.create_group("group", "icon", 500, -300)
+    for obj in objects:
+        container = group if obj.id % 2 else view
+        container.add_object(obj, rng.uniform(-2000, 2000), rng.uniform(-2000, 2000))
+    view.spatial_index(cell_size=100)
+    for _ in range(200):
+        x, y = rng.uniform(-3000, 3000), rng.uniform(-3000, 3000)
+        assert view.nearest(x, y) is brute_nearest(view, x, y)
+    # Far outside the bounds, the search starts at the bounds
+    for x, y in [(1e9, 0), (-1e9, 1e9), (0, -1e9), (3000, 1e8)]:
+        assert view.nearest(x, y) is brute_nearest(view, x, y)
+    assert view.nearest(1e9, 1e9, max_distance=1000) is None
+    item = view.nearest(0, 0)
+    assert item is not None
+    distance = math.dist(item.absolute_position, (0, 0))
+    assert view.nearest(0, 0, max_distance=distance) is item
+    assert view.nearest(0, 0, max_distance=distance - 1) is None
+
+
+def test_spatial_updates(model: Model, view: View, objects: list[Object]):
+    model.journal.enabled = True
+    assert not view.query_rect(-1000, -1000, 1000, 1000)
+    group = view.create_group("group", "icon", 0, 0)
+    obj = group.add_object(objects[0], 10, 10)
+    sub_group = group.create_group("sub group", "icon", 20, 20)
+    sub_obj = sub_group.add_object(objects[1], 10, 10)
+    assert view.nearest(31, 31) is sub_obj
+
+    group.x = 1000
+    assert set(view.query_rect(1000, 0, 1030, 30)) == {group, obj, sub_group, sub_obj}
+    assert not view.query_rect(0, 0, 999, 999)
+
+    sub_obj.move(view)
+    assert sub_obj.absolute_position == (10, 10)
+    assert view.query_rect(0, 0, 20, 20) == [sub_obj]
+
+    other = model.create_view("other")
+    other.query_rect(0, 0, 0, 0)
+    group.move(other)
+    assert set(view.query_rect(-5000, -5000, 5000, 5000)) == {sub_obj}
+    assert set(other.query_rect(-5000, -5000, 5000, 5000)) == {group, obj, sub_group}
+
+    sub_group.delete()
+    assert set(other.query_rect(-5000, -5000, 5000, 5000)) == {group, obj}
+
+    model.undo()
+    assert set(other.query_rect(-5000, -5000, 5000, 5000)) == {group, obj, sub_group}